@@ -0,0 +1,223 @@
+import json
+import math
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Optional import for approximate nearest-neighbour search
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+load_dotenv()
+
+# ---------------------------
+# Config
+# ---------------------------
+# "exact" (brute force), "hnsw" or "ivfpq"
+ANN_INDEX = os.getenv("ANN_INDEX", "exact").strip().lower()
+
+# Recall-vs-latency knobs
+ANN_PARAMS: Dict[str, Any] = {
+    # HNSW graph: more links / wider search -> better recall, slower
+    "hnsw_m": int(os.getenv("ANN_HNSW_M", "32")),
+    "hnsw_ef_construction": int(os.getenv("ANN_HNSW_EF_CONSTRUCTION", "200")),
+    "hnsw_ef_search": int(os.getenv("ANN_HNSW_EF_SEARCH", "128")),
+    # IVF-PQ: more lists probed / more PQ bytes -> better recall, slower
+    "ivf_nlist": int(os.getenv("ANN_IVF_NLIST", "0")),  # 0 = 4 * sqrt(N)
+    "ivf_nprobe": int(os.getenv("ANN_IVF_NPROBE", "16")),
+    "pq_m": int(os.getenv("ANN_PQ_M", "64")),
+    "pq_nbits": int(os.getenv("ANN_PQ_NBITS", "8")),
+}
+
+# Dense candidates fetched from the ANN index before hybrid fusion
+ANN_CANDIDATES = int(os.getenv("ANN_CANDIDATES", "2000"))
+
+ANN_FILE = "ann.faiss"
+ANN_META_FILE = "ann_meta.json"
+
+
+class AnnIndex:
+    """
+    Inner-product nearest-neighbour index over normalized embeddings.
+    Ids are row positions in the dense matrix. Falls back to exact search
+    when faiss is not installed or `kind` is "exact".
+    """
+
+    def __init__(self, kind: str, dim: int, params: Optional[Dict[str, Any]] = None, index: Any = None):
+        self.kind = kind if FAISS_AVAILABLE else "exact"
+        self.dim = dim
+        self.params = {**ANN_PARAMS, **(params or {})}
+        self.index = index
+        # Set while `index` is a read-only memory map of this file
+        self._mapped_path: Optional[str] = None
+        self._exact: Optional[np.ndarray] = None
+        self._exact_ids: Optional[np.ndarray] = None
+
+    @property
+    def ntotal(self) -> int:
+        if self.kind == "exact":
+            return 0 if self._exact_ids is None else len(self._exact_ids)
+        return int(self.index.ntotal)
+
+    # ---------- construction ----------
+    def _new_faiss_index(self, n_train: int):
+        if self.kind == "hnsw":
+            base = faiss.IndexHNSWFlat(self.dim, self.params["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+            base.hnsw.efConstruction = self.params["hnsw_ef_construction"]
+            return faiss.IndexIDMap2(base)
+        if self.kind == "ivfpq":
+            nlist = self.params["ivf_nlist"] or int(4 * math.sqrt(max(n_train, 1)))
+            # k-means needs ~39 points per centroid
+            nlist = max(1, min(nlist, n_train // 39 or 1))
+            pq_m = self.params["pq_m"]
+            while self.dim % pq_m:
+                pq_m -= 1
+            # PQ codebooks need ~39 points per code as well
+            nbits = self.params["pq_nbits"]
+            while nbits > 4 and (1 << nbits) * 39 > n_train:
+                nbits -= 1
+            quantizer = faiss.IndexFlatIP(self.dim)
+            return faiss.IndexIVFPQ(quantizer, self.dim, nlist, pq_m, nbits, faiss.METRIC_INNER_PRODUCT)
+        raise ValueError(f"Unknown ANN index kind: {self.kind!r}")
+
+    def _make_writable(self) -> None:
+        """Replace a read-only memory-mapped index by an in-memory copy before mutating it."""
+        if self._mapped_path is not None:
+            self.index = faiss.read_index(self._mapped_path)
+            self._mapped_path = None
+            self.set_search_params()
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, kind: str = ANN_INDEX, params: Optional[Dict[str, Any]] = None) -> "AnnIndex":
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        ann = cls(kind, vectors.shape[1], params)
+        if ann.kind != "exact":
+            ann.index = ann._new_faiss_index(len(vectors))
+            if not ann.index.is_trained:
+                ann.index.train(vectors)
+        ann.add(vectors, np.arange(len(vectors), dtype=np.int64))
+        ann.set_search_params()
+        return ann
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        """Incrementally add `vectors` under row ids `ids`."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.kind == "exact":
+            self._exact = vectors if self._exact is None else np.vstack([self._exact, vectors])
+            self._exact_ids = ids if self._exact_ids is None else np.concatenate([self._exact_ids, ids])
+            return
+        self._make_writable()
+        self.index.add_with_ids(vectors, ids)
+
+    def remove(self, ids: np.ndarray) -> bool:
+        """Remove row ids. Returns False when the index type needs a rebuild instead (HNSW)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.kind == "exact":
+            keep = ~np.isin(self._exact_ids, ids)
+            self._exact, self._exact_ids = self._exact[keep], self._exact_ids[keep]
+            return True
+        if self.kind == "hnsw":
+            return False
+        self._make_writable()
+        self.index.remove_ids(ids)
+        return True
+
+    def set_search_params(self, ef_search: Optional[int] = None, nprobe: Optional[int] = None) -> None:
+        """Tune recall vs latency at query time."""
+        if ef_search is not None:
+            self.params["hnsw_ef_search"] = ef_search
+        if nprobe is not None:
+            self.params["ivf_nprobe"] = nprobe
+        if self.kind == "hnsw":
+            faiss.downcast_index(self.index.index).hnsw.efSearch = self.params["hnsw_ef_search"]
+        elif self.kind == "ivfpq":
+            self.index.nprobe = self.params["ivf_nprobe"]
+
+    # ---------- search ----------
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-`k` (scores, row ids) for one query vector, best first."""
+        query = np.ascontiguousarray(np.asarray(query, dtype=np.float32).reshape(1, -1))
+        k = min(k, self.ntotal)
+        if k <= 0:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+        if self.kind == "exact":
+            scores = self._exact @ query[0]
+            part = np.argpartition(-scores, k - 1)[:k]
+            order = part[np.argsort(-scores[part], kind="stable")]
+            return scores[order], self._exact_ids[order]
+        scores, ids = self.index.search(query, k)
+        valid = ids[0] >= 0
+        return scores[0][valid], ids[0][valid]
+
+    # ---------- persistence ----------
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        if self.kind != "exact":
+            faiss.write_index(self.index, os.path.join(directory, ANN_FILE))
+        with open(os.path.join(directory, ANN_META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"kind": self.kind, "dim": self.dim, "params": self.params, "ntotal": self.ntotal}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> Optional["AnnIndex"]:
+        meta_path = os.path.join(directory, ANN_META_FILE)
+        index_path = os.path.join(directory, ANN_FILE)
+        if not (FAISS_AVAILABLE and os.path.exists(meta_path) and os.path.exists(index_path)):
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        index, mapped = None, False
+        if mmap:
+            try:
+                index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                mapped = True
+            except RuntimeError:
+                index = None  # this index type cannot be memory-mapped
+        if index is None:
+            index = faiss.read_index(index_path)
+        ann = cls(meta["kind"], meta["dim"], meta["params"], index)
+        if mapped:
+            ann._mapped_path = index_path
+        ann.set_search_params()
+        return ann
+
+
+def load_or_build_ann(
+    directory: str,
+    vectors: np.ndarray,
+    kind: str = ANN_INDEX,
+    params: Optional[Dict[str, Any]] = None,
+) -> Optional[AnnIndex]:
+    """
+    Load the ANN index saved in `directory` and bring it up to date with
+    `vectors`: new trailing rows are added incrementally; a kind/dimension
+    change or removed rows trigger a full rebuild. None for "exact".
+
+    The saved index is memory-mapped read-only (shared page cache, no copy
+    per process); `add` / `remove` reload it into memory first.
+    """
+    if kind == "exact" or not FAISS_AVAILABLE:
+        if kind != "exact":
+            print("[WARN] faiss not installed; using exact dense search.")
+        return None
+
+    ann = AnnIndex.load(directory, mmap=True)
+    if ann is not None and ann.kind == kind and ann.dim == vectors.shape[1] and ann.ntotal <= len(vectors):
+        if ann.ntotal < len(vectors):
+            new_ids = np.arange(ann.ntotal, len(vectors), dtype=np.int64)
+            ann.add(vectors[ann.ntotal:], new_ids)
+            ann.save(directory)
+            print(f"[INFO] ANN index: added {len(new_ids)} new vectors.")
+        if params:
+            ann.set_search_params(params.get("hnsw_ef_search"), params.get("ivf_nprobe"))
+        return ann
+
+    print(f"[INFO] Building {kind} ANN index over {len(vectors)} vectors ...")
+    ann = AnnIndex.build(vectors, kind, params)
+    ann.save(directory)
+    return ann
@@ -0,0 +1,180 @@
+"""
+HTTP/JSON API around the property workflow.
+
+One long-lived event loop per process (uvicorn) serves every request, so
+LLM clients, connection pools and provider limiters are shared instead of
+being rebuilt by a fresh `asyncio.run` per search. Concurrent identical
+combined extractions share one in-flight LLM call (see inflight_dedup.py);
+others are dispatched at once, each with its own call. Processes are
+stateless apart from their local caches: run several behind a load
+balancer.
+
+    uvicorn api:app --host 0.0.0.0 --port 8000
+    python api.py [--host 0.0.0.0] [--port 8000]
+
+Endpoints:
+    POST /search         {"query": ..., "limit": 50, "extraction_mode": "combined"}
+                         -> result_type, rows (best first), scores (one per row),
+                            count (rows returned), total_matches, timings
+    POST /search/stream  same body -> NDJSON: partial snapshots, then the final result
+    GET  /health         dataset size and retriever readiness
+    GET  /metrics        Prometheus text format: per-stage latency histograms,
+                         LLM calls / tokens, cache hits, rows per filter stage
+"""
+
+import argparse
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Literal, Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from dataset_store import get_dataset
+from extraction_agent import arun_extraction
+from llm_cache import acached_call, normalize_query
+from llm_models import LLAMA_MODEL_NAME, aclose_loop_clients
+from inflight_dedup import InflightDeduplicator
+from models import CombinedExtraction
+from parser_and_prompts import combined_extraction_prompt
+from ranking import SCORE_COLUMNS
+from telemetry import render_metrics
+from workflow import async_workflow, async_workflow_stream, retriever_status, warm_retriever
+
+load_dotenv()
+
+# ---------------------------
+# Config
+# ---------------------------
+# The API defaults to one extraction call per query
+API_EXTRACTION_MODE = os.getenv("API_EXTRACTION_MODE", "combined").strip().lower()
+API_MAX_ROWS = int(os.getenv("API_MAX_ROWS", "500"))
+API_PARTIAL_ROWS = int(os.getenv("API_PARTIAL_ROWS", "20"))
+
+
+_extraction_dedup = InflightDeduplicator(arun_extraction, key=normalize_query)
+
+
+async def adeduplicated_extract_all(user_query: str) -> CombinedExtraction:
+    """`aextract_all` with concurrent identical cache misses sharing one LLM call."""
+    return await acached_call(
+        combined_extraction_prompt,
+        LLAMA_MODEL_NAME,
+        user_query,
+        lambda: _extraction_dedup.submit(user_query),
+        CombinedExtraction,
+    )
+
+
+class SearchRequest(BaseModel):
+    query: str = Field(..., min_length=1, description="User message")
+    limit: int = Field(50, ge=1, le=API_MAX_ROWS, description="Max rows returned")
+    extraction_mode: Optional[Literal["multi", "combined"]] = Field(None, description="Overrides API_EXTRACTION_MODE")
+
+
+def _rows(frame: Optional[pd.DataFrame], limit: int) -> list:
+    """First `limit` rows as JSON records (NaN -> null, numpy / Arrow values -> JSON)."""
+    if frame is None or len(frame) == 0:
+        return []
+    return json.loads(frame.head(limit).to_json(orient="records", force_ascii=False, double_precision=6))
+
+
+def _payload(result: Dict[str, Any], limit: int) -> Dict[str, Any]:
+    """JSON body of a workflow result."""
+    payload: Dict[str, Any] = {
+        "result_type": result.get("result_type"),
+        "partial": bool(result.get("partial", False)),
+        "timings": {k: round(v, 4) for k, v in (result.get("timings") or {}).items()},
+    }
+    if "stage" in result:
+        payload["stage"] = result["stage"]
+    if result.get("result_type") == "property":
+        final_df = result.get("final_df")
+        if final_df is None:
+            final_df = pd.DataFrame()
+        score_columns = [col for col in SCORE_COLUMNS if col in final_df.columns]
+        payload["rows"] = _rows(final_df.drop(columns=score_columns), limit)
+        id_columns = ["property_id"] if "property_id" in final_df.columns else []
+        payload["scores"] = _rows(final_df[id_columns + score_columns], limit) if score_columns else []
+        payload["count"] = len(payload["rows"])
+        payload["total_matches"] = int(result.get("total_matches", len(final_df)))
+        if not payload["partial"]:
+            payload["search_data"] = result.get("search_data")
+            # Best hybrid hits only: the full candidate list can be ~1000 ids
+            payload["hybrid_ids"] = list(result.get("hybrid_result") or [])[:limit]
+    else:
+        payload["result"] = result.get("result")
+    return payload
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Dataset + column index up front; the retriever loads in the background
+    from csv_agent import get_property_index
+
+    get_property_index(get_dataset().listings)
+    warm_retriever()
+    yield
+    await aclose_loop_clients()
+
+
+app = FastAPI(title="Property Advisor API", lifespan=lifespan)
+
+
+@app.post("/search")
+async def search(request: SearchRequest) -> Dict[str, Any]:
+    result = await async_workflow(
+        request.query,
+        get_dataset().listings,
+        extraction_mode=request.extraction_mode or API_EXTRACTION_MODE,
+        combined_extractor=adeduplicated_extract_all,
+    )
+    return _payload(result, request.limit)
+
+
+@app.post("/search/stream")
+async def search_stream(request: SearchRequest) -> StreamingResponse:
+    async def lines():
+        try:
+            async for update in async_workflow_stream(
+                request.query,
+                get_dataset().listings,
+                extraction_mode=request.extraction_mode or API_EXTRACTION_MODE,
+                combined_extractor=adeduplicated_extract_all,
+            ):
+                limit = min(request.limit, API_PARTIAL_ROWS) if update.get("partial") else request.limit
+                yield json.dumps(_payload(update, limit), default=str) + "\n"
+        except Exception as e:
+            # Headers are already sent: report the failure in-band
+            yield json.dumps({"error": repr(e)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.get("/health")
+async def health() -> Dict[str, Any]:
+    return {
+        "status": "ok",
+        "listings": len(get_dataset()),
+        "retriever": retriever_status(),
+        "extraction_dedup": dict(_extraction_dedup.stats),
+    }
+
+
+@app.get("/metrics")
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the property workflow over HTTP.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
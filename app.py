@@ -1,43 +1,29 @@
 import streamlit as st  
 import pandas as pd
-import asyncio
 import os
-import re
 import ast
-from langchain_community.document_loaders import CSVLoader
+import html
+import numpy as np
 
-DATA_PATH = "dataset/Real_Description.csv"
+from background_loop import iterate_in_background_loop, run_in_background_loop
+from dataset_store import get_dataset
+
+def _fmt_float32(value):
+    """Shortest text of a float32 store value (a row read back gives 1.2000000476837158 for 1.2)."""
+    if isinstance(value, (float, np.floating)) and not np.isnan(value):
+        return str(np.float32(value))
+    return value
 
 # ---------------------------
-# Load Data
+# Load Data (one shared dataset per process, see dataset_store.py)
 # ---------------------------
 @st.cache_resource
-def load_data():
-    loader = CSVLoader(file_path=DATA_PATH, metadata_columns=["property_id"])
-    docs = loader.load()
-    return pd.DataFrame([{"property_id": d.metadata["property_id"], "description": d.page_content} for d in docs])
-
-df = load_data()
-# Build a fast lookup from property_id -> description (from df)
-try:
-    _desc_by_id = {str(r["property_id"]): r.get("description", "") for _, r in df.iterrows()}
-except Exception:
-    _desc_by_id = {}
-
-# Helper to clean odd prefixes like "90:" or "Description:"
-def _clean_description(text: str) -> str:
-    if text is None:
-        return ""
-    s = str(text).strip()
-    # Remove leading colon/dash and numbers like ": 90" or "90"
-    s = re.sub(r'^\s*[:\-]*\s*\d+\s*', '', s)
-    # Remove leading "Description:" label (case-insensitive)
-    s = re.sub(r'^description\s*[:\-]*\s*', '', s, flags=re.IGNORECASE)
-    return s.strip()
-
-@st.cache_data
 def csv_load_data():
-    return pd.read_csv("/Users/slimshady/Documents/Property Advisor /Property-Advisor-Agent/dataset/real_property_data.csv")
+    from csv_agent import get_property_index
+
+    data = get_dataset().listings
+    get_property_index(data)  # column index built once for the shared frame
+    return data
 
 df1 = csv_load_data()
 
@@ -68,13 +54,30 @@ with st.sidebar:
     if pinecone_key:
         os.environ["PINECONE_API_KEY"] = pinecone_key
 
+    st.subheader("Search Options")
+    stream_results = st.toggle("Show partial results while searching", value=False)
+
 # Import after keys are possibly set so models read fresh env vars
 try:
-    from workflow import async_workflow
+    from workflow import async_workflow, async_workflow_stream, retriever_status, warm_retriever
 except ImportError as e:
     st.error(f"Failed to import main module: {e}")
     st.stop()
 
+# Load the embedding model / hybrid index in the background; the first
+# hybrid query waits for it if it is not ready yet
+warm_retriever()
+_status = retriever_status()
+_status_labels = {
+    "not_started": "⏳ Hybrid search: starting",
+    "loading": "⏳ Hybrid search: loading models…",
+    "ready": "✅ Hybrid search: ready",
+    "unavailable": "⚪ Hybrid search: unavailable (filters only)",
+    "failed": "⚠️ Hybrid search: failed to load (filters only)",
+}
+with st.sidebar:
+    st.caption(_status_labels.get(_status["state"], _status["state"]))
+
 # ---------------------------
 # State management
 # ---------------------------
@@ -85,6 +88,19 @@ if "selected_property" not in st.session_state:
 if "search_df" not in st.session_state:
     st.session_state.search_df = None
 
+def run_streaming_search(query: str, df: pd.DataFrame, placeholder):
+    """Consume async_workflow_stream, showing each partial candidate set."""
+    result = None
+    for update in iterate_in_background_loop(async_workflow_stream(query, df)):
+        result = update
+        if update.get("partial"):
+            partial_df = update["final_df"]
+            with placeholder.container():
+                st.caption(f"Refining… {len(partial_df)} candidate properties so far ({update['stage']})")
+                st.dataframe(partial_df.head(50), use_container_width=True)
+    placeholder.empty()
+    return result
+
 # Always show search interface
 st.subheader("🔍 Search Properties")
 query = st.text_input("Enter your query:", key="search_query")
@@ -95,12 +111,18 @@ else:
     search_clicked = st.button("Search", type="primary")
 
     if search_clicked and query.strip():
-        with st.spinner("Processing your query..."):
-            result = asyncio.run(async_workflow(query, df1))
+        if stream_results:
+            partial_placeholder = st.empty()
+            with st.spinner("Processing your query..."):
+                result = run_streaming_search(query, df1, partial_placeholder)
+        else:
+            with st.spinner("Processing your query..."):
+                result = run_in_background_loop(async_workflow(query, df1))
 
         if isinstance(result, dict) and result.get("result_type") == "property":
             st.session_state.search_df = result["final_df"]
             st.session_state.page = "home"
+            st.session_state.result_page = 1
         elif isinstance(result, dict) and result.get("result_type") == "chat":
             st.subheader("Answer")
             st.write(result["result"])
@@ -110,62 +132,101 @@ else:
 # ---------------------------
 # Render Results (persist across reruns)
 # ---------------------------
+PAGE_SIZES = [12, 24, 48, 96]
+
+def _html_column(frame: pd.DataFrame, col: str, limit=None) -> pd.Series:
+    """HTML-escaped display text of `col` for every row of `frame` ("N/A" when missing)."""
+    if col not in frame.columns:
+        return pd.Series("N/A", index=frame.index)
+    values = frame[col]
+    text = values.astype(object)
+    if pd.api.types.is_float_dtype(values.dtype):
+        text = values.map(_fmt_float32, na_action="ignore").astype(object)
+    text = text.where(values.notna(), "N/A").astype(str)
+    if limit is not None:
+        text = text.str.slice(0, limit)
+    return text.map(html.escape)
+
+def _near_match_badge(frame: pd.DataFrame) -> pd.Series:
+    """Badge for rows that only match within the soft-constraint tolerance (see ranking.py)."""
+    if "exact_match" not in frame.columns:
+        return pd.Series("", index=frame.index)
+    badge = " <span style=\"font-size:0.6em; color:#f0ad4e;\">≈ near match</span>"
+    return frame["exact_match"].map(lambda exact: "" if exact else badge)
+
+def _cards_html(page: pd.DataFrame, first: int) -> str:
+    """One HTML block for the whole page of cards."""
+    numbers = pd.Series(np.arange(first + 1, first + 1 + len(page)), index=page.index).astype(str)
+    cards = (
+        "<div style=\"border:1px solid #444; border-radius:10px; padding:15px; margin-bottom:10px; background-color:#111;\">"
+        "<h3 style=\"margin:0;\">🏡 " + numbers + ". " + _html_column(page, "property_name") + _near_match_badge(page) + "</h3>"
+        "<p style=\"margin:5px 0;\"><b>BHK:</b> " + _html_column(page, "bedRoom") + " BHK</p>"
+        "<p style=\"margin:5px 0;\"><b>Price:</b> " + _html_column(page, "Price_in_Crore") + " Cr</p>"
+        "<p style=\"margin:5px 0;\"><b>Society:</b> " + _html_column(page, "society") + "</p>"
+        "<p style=\"margin:5px 0; color:#ccc;\"><b>Description:</b> " + _html_column(page, "description") + "...</p>"
+        "</div>"
+    )
+    return "".join(cards)
+
+def _grid_html(page: pd.DataFrame, first: int) -> str:
+    """One HTML block laying the page out as a 3-column grid."""
+    numbers = pd.Series(np.arange(first + 1, first + 1 + len(page)), index=page.index).astype(str)
+    cells = (
+        "<div style=\"border:1px solid #333; border-radius:10px; padding:15px; background:#1a1a1a;\">"
+        "<h4 style=\"margin:0;\">🏡 " + numbers + ". " + _html_column(page, "property_name") + _near_match_badge(page) + "</h4>"
+        "<p><b>BHK:</b> " + _html_column(page, "bedRoom") + "</p>"
+        "<p><b>Price:</b> " + _html_column(page, "Price_in_Crore") + " Cr</p>"
+        "<p><b>Society:</b> " + _html_column(page, "society") + "</p>"
+        "<p style=\"color:#ccc;\"><b>Description:</b> " + _html_column(page, "description", limit=150) + "...</p>"
+        "</div>"
+    )
+    return (
+        "<div style=\"display:grid; grid-template-columns:repeat(3, 1fr); gap:20px; margin:10px 0;\">"
+        + "".join(cells)
+        + "</div>"
+    )
+
 if st.session_state.search_df is not None:
     final_df = st.session_state.search_df
-    
-    # Tabs for view (only show if there are results)
-    tabs = st.tabs(["📋 Cards", "📊 Table", "🎨 Beautiful Grid"])
 
     if st.session_state.page == "home":
-        # ✅ Cards View
-        with tabs[0]:
+        # Only the selected view is rendered, one page at a time
+        view_col, size_col, page_col = st.columns([3, 1, 1])
+        view = view_col.radio("View", ["📋 Cards", "📊 Table", "🎨 Beautiful Grid"], horizontal=True, key="result_view")
+        page_size = size_col.selectbox("Per page", PAGE_SIZES, index=1, key="page_size")
+        n_pages = max(1, -(-len(final_df) // page_size))
+        if st.session_state.get("result_page", 1) > n_pages:
+            st.session_state.result_page = 1
+        page_number = page_col.number_input("Page", min_value=1, max_value=n_pages, step=1, key="result_page")
+        first = (int(page_number) - 1) * page_size
+        page = final_df.iloc[first:first + page_size]
+        st.caption(f"Showing {first + 1 if len(page) else 0}–{first + len(page)} of {len(final_df)} properties")
+
+        if view == "📋 Cards":
             st.subheader("Properties (Cards View)")
-            for idx, row in final_df.iterrows():
-                with st.container():
-                    st.markdown(
-                        f"""
-                        <div style=\"border:1px solid #444; border-radius:10px; padding:15px; margin-bottom:10px; background-color:#111;\">
-                            <h3 style=\"margin:0;\">🏡 {row['property_name']}</h3>
-                            <p style=\"margin:5px 0;\"><b>BHK:</b> {row.get('bedRoom', 'N/A')} BHK</p>
-                            <p style=\"margin:5px 0;\"><b>Price:</b> {row.get('Price_in_Crore', 'N/A')} Cr</p>
-                            <p style=\"margin:5px 0;\"><b>Society:</b> {row.get('society', 'N/A')}</p>
-                            <p style=\"margin:5px 0; color:#ccc;\"><b>Description:</b> {str(row.get('description', 'N/A'))}...</p>
-                        </div>
-                        """,
-                        unsafe_allow_html=True,
-                    )
-                    if st.button("Let's Explore →", key=f"explore_{idx}"):
-                        st.session_state.page = "details"
-                        st.session_state.selected_property = row.to_dict() if hasattr(row, 'to_dict') else dict(row)
-                        st.rerun()
-
-        # ✅ Table View
-        with tabs[1]:
+            st.markdown(_cards_html(page, first), unsafe_allow_html=True)
+        elif view == "📊 Table":
             st.subheader("Properties (Table View)")
-            st.dataframe(final_df, use_container_width=True)
-
-        # ✅ Grid View
-        with tabs[2]:
+            st.dataframe(page, use_container_width=True)
+        else:
             st.subheader("Properties (Grid View)")
-            cols = st.columns(3)
-            for idx, row in final_df.iterrows():
-                with cols[idx % 3]:
-                    st.markdown(
-                        f"""
-                        <div style=\"border:1px solid #333; border-radius:10px; padding:15px; margin:10px; background:#1a1a1a;\">
-                            <h4 style=\"margin:0;\">🏡 {row['property_name']}</h4>
-                            <p><b>BHK:</b> {row.get('bedRoom', 'N/A')}</p>
-                            <p><b>Price:</b> {row.get('Price_in_Crore', 'N/A')} Cr</p>
-                            <p><b>Society:</b> {row.get('society', 'N/A')}</p>
-                            <p style=\"color:#ccc;\"><b>Description:</b> {str(row.get('description', 'N/A'))[:150]}...</p>
-                        </div>
-                        """,
-                        unsafe_allow_html=True,
-                    )
-                    if st.button("Let's Explore →", key=f"grid_explore_{idx}"):
-                        st.session_state.page = "details"
-                        st.session_state.selected_property = row.to_dict() if hasattr(row, 'to_dict') else dict(row)
-                        st.rerun()
+            st.markdown(_grid_html(page, first), unsafe_allow_html=True)
+
+        # One explore control per page instead of a button per row
+        if len(page):
+            names = _html_column(page, "property_name").map(html.unescape).tolist()
+            pick_col, button_col = st.columns([4, 1])
+            picked = pick_col.selectbox(
+                "Property",
+                range(len(page)),
+                format_func=lambda i: f"{first + i + 1}. {names[i]}",
+                key=f"explore_pick_{first}",
+                label_visibility="collapsed",
+            )
+            if button_col.button("Let's Explore →", key="explore"):
+                st.session_state.page = "details"
+                st.session_state.selected_property = page.iloc[picked].to_dict()
+                st.rerun()
 
     elif st.session_state.page == "details":
         row = st.session_state.selected_property
@@ -195,9 +256,9 @@ if st.session_state.search_df is not None:
             )
 
             # Quick metrics chips
-            price_cr = row.get("Price_in_Crore", "N/A")
+            price_cr = _fmt_float32(row.get("Price_in_Crore", "N/A"))
             bhk = row.get("bedRoom", "N/A")
-            area_sqft = row.get("Area_in_sq_meter", "N/A")
+            area_sqft = _fmt_float32(row.get("Area_in_sq_meter", "N/A"))
 
             c1, c2, c3 = st.columns(3)
             c1.markdown(f"""
@@ -253,7 +314,7 @@ if st.session_state.search_df is not None:
             # Facilities in flat from features column
             features_raw = row.get('features', [])
             features_list = []
-            if isinstance(features_raw, list):
+            if isinstance(features_raw, (list, np.ndarray)):
                 features_list = [str(x).strip() for x in features_raw if str(x).strip()]
             elif isinstance(features_raw, str):
                 try:
@@ -287,7 +348,7 @@ if st.session_state.search_df is not None:
             # Additional Rooms from additionalRooms column
             add_rooms_raw = row.get('additionalRoom', [])
             add_rooms_list = []
-            if isinstance(add_rooms_raw, list):
+            if isinstance(add_rooms_raw, (list, np.ndarray)):
                 add_rooms_list = [str(x).strip() for x in add_rooms_raw if str(x).strip()]
             elif isinstance(add_rooms_raw, str):
                 try:
@@ -319,14 +380,12 @@ if st.session_state.search_df is not None:
 
             # Description: combine df (by property_id) and row's Description if both exist
             _prop_id = str(row.get("property_id", "")).strip()
-            raw_df_desc = _desc_by_id.get(_prop_id)
+            raw_df_desc = get_dataset().description(_prop_id)
             raw_row_desc = row.get("Description", row.get("description", ""))
             cleaned_parts = []
-            # Clean ONLY the df description (remove leading numbers/labels)
+            # Store description is already clean text
             if raw_df_desc is not None and str(raw_df_desc).strip():
-                cleaned_df_desc = _clean_description(raw_df_desc)
-                if cleaned_df_desc:
-                    cleaned_parts.append(cleaned_df_desc)
+                cleaned_parts.append(str(raw_df_desc).strip())
             # Keep the row description AS-IS (except trimming whitespace)
             if raw_row_desc is not None and str(raw_row_desc).strip():
                 cleaned_parts.append(str(raw_row_desc).strip())
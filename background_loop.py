@@ -0,0 +1,62 @@
+import asyncio
+import atexit
+import threading
+from typing import Any, AsyncIterator, Awaitable, Iterator, Optional
+
+# One event loop per process, on a daemon thread, for synchronous callers
+# (Streamlit scripts). `asyncio.run` per search would start a fresh loop and
+# rebuild the pooled HTTP client and LLM clients (see llm_models.py) every
+# time; work submitted here reuses the loop's warm connections instead.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def background_loop() -> asyncio.AbstractEventLoop:
+    """The shared loop, started on first use."""
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="async-workflow-loop", daemon=True)
+            thread.start()
+            _loop = loop
+            atexit.register(_shutdown)
+        return _loop
+
+
+def run_in_background_loop(coro: Awaitable[Any]) -> Any:
+    """Run `coro` on the shared loop and block until its result."""
+    future = asyncio.run_coroutine_threadsafe(coro, background_loop())
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def iterate_in_background_loop(agen: AsyncIterator[Any]) -> Iterator[Any]:
+    """
+    Drive an async generator on the shared loop, yielding its items in the
+    calling thread (so Streamlit elements can be updated between items).
+    """
+    try:
+        while True:
+            try:
+                yield run_in_background_loop(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        run_in_background_loop(agen.aclose())
+
+
+def _shutdown() -> None:
+    from llm_models import aclose_loop_clients
+
+    loop = _loop
+    if loop is None or loop.is_closed():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(aclose_loop_clients(), loop).result(timeout=5)
+    except Exception:
+        pass
+    loop.call_soon_threadsafe(loop.stop)
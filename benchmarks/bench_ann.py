@@ -0,0 +1,100 @@
+"""
+Recall-vs-latency benchmark of the ANN index against exact search.
+
+Uses the dense embeddings of the local hybrid index when present
+(LOCAL_INDEX_DIR/dense.npy), otherwise synthetic normalized vectors.
+
+    python benchmarks/bench_ann.py --queries 200 --k 100
+    python benchmarks/bench_ann.py --synthetic 1000000 --dim 1024
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ann_index import FAISS_AVAILABLE, AnnIndex  # noqa: E402
+
+
+def load_vectors(args) -> np.ndarray:
+    path = os.path.join(args.index_dir, "dense.npy")
+    if not args.synthetic and os.path.exists(path):
+        print(f"Embeddings: {path}")
+        return np.load(path, mmap_mode="r")
+    n = args.synthetic or 100_000
+    print(f"Embeddings: synthetic {n} x {args.dim}")
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, args.dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def make_queries(vectors: np.ndarray, count: int) -> np.ndarray:
+    # Perturbed corpus rows: realistic neighbourhoods, not exact duplicates
+    rng = np.random.default_rng(1)
+    rows = rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)
+    queries = np.asarray(vectors[rows], dtype=np.float32) + 0.05 * rng.standard_normal((len(rows), vectors.shape[1]), dtype=np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def run(ann: AnnIndex, queries: np.ndarray, truth, k: int):
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        _, ids = ann.search(query, k)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len(set(ids.tolist()) & expected) / len(expected))
+    latencies = np.array(latencies) * 1000
+    return float(np.mean(recalls)), float(np.mean(latencies)), float(np.percentile(latencies, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-dir", default=os.getenv("LOCAL_INDEX_DIR", os.path.join("dataset", "local_index")))
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of the index")
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=100)
+    args = parser.parse_args()
+
+    vectors = load_vectors(args)
+    queries = make_queries(vectors, args.queries)
+    dense = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    exact = AnnIndex.build(dense, "exact")
+    truth = [set(exact.search(q, args.k)[1].tolist()) for q in queries]
+    _, exact_ms, exact_p95 = run(exact, queries, truth, args.k)
+
+    print(f"\n{'index':<10}{'knob':<18}{'recall@' + str(args.k):>12}{'mean ms':>10}{'p95 ms':>10}{'build s':>10}")
+    print(f"{'exact':<10}{'-':<18}{1.0:>12.3f}{exact_ms:>10.2f}{exact_p95:>10.2f}{0.0:>10.1f}")
+
+    if not FAISS_AVAILABLE:
+        print("\nfaiss not installed (pip install faiss-cpu); only exact search measured.")
+        return
+
+    for kind, knob, values in (
+        ("hnsw", "ef_search", [16, 32, 64, 128, 256, 512]),
+        ("ivfpq", "nprobe", [1, 4, 8, 16, 32, 64]),
+    ):
+        start = time.perf_counter()
+        ann = AnnIndex.build(dense, kind)
+        build_s = time.perf_counter() - start
+        # Round-trip through disk so the numbers reflect the loaded index
+        with tempfile.TemporaryDirectory() as tmp:
+            ann.save(tmp)
+            ann = AnnIndex.load(tmp, mmap=True)
+            for value in values:
+                if knob == "ef_search":
+                    ann.set_search_params(ef_search=max(value, args.k))
+                else:
+                    ann.set_search_params(nprobe=value)
+                recall, mean_ms, p95_ms = run(ann, queries, truth, args.k)
+                print(f"{kind:<10}{knob + '=' + str(value):<18}{recall:>12.3f}{mean_ms:>10.2f}{p95_ms:>10.2f}{build_s:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Document-embedding throughput (docs/sec) of the embedding backends.
+
+Embeds the property descriptions from the dataset store (repeated or
+truncated to --docs) with each backend, in the same calls ingestion makes
+(`embedding_chunk_size` texts per call for --ingest-batch-size upsert
+batches), and checks every backend's vectors against the first one's
+(mean cosine similarity).
+
+    python benchmarks/bench_embeddings.py --docs 2000
+    python benchmarks/bench_embeddings.py --docs 4000 --ingest-batch-size 64 --embed-chunk 512
+    python benchmarks/bench_embeddings.py --backends default cpu onnx --workers 4 --quantize avx512_vnni
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_backends import (  # noqa: E402
+    EMBEDDING_BATCH_SIZE,
+    CPUThroughputEmbeddings,
+    embed_array,
+    embedding_chunk_size,
+    make_embeddings,
+)
+
+
+def load_texts(count: int) -> list:
+    from dataset_store import get_dataset
+
+    texts = get_dataset().doc_texts()["doc_text"].tolist()
+    if not texts:
+        raise SystemExit("No descriptions in the dataset store.")
+    return (texts * (count // len(texts) + 1))[:count]
+
+
+def make_backend(name: str, args):
+    if name == "default":
+        return make_embeddings("default")
+    workers = 1 if name == "cpu-single" else args.workers
+    return CPUThroughputEmbeddings(
+        onnx=name == "onnx",
+        quantize=args.quantize,
+        batch_size=args.batch_size,
+        workers=workers,
+    )
+
+
+def embed_like_ingest(backend, texts: list, chunk: int) -> np.ndarray:
+    """Embed `texts` in the `chunk`-sized calls `pinecone_add_document_retriever.ingest` makes."""
+    return np.concatenate([embed_array(backend, texts[start:start + chunk]) for start in range(0, len(texts), chunk)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--backends", nargs="+", default=["default", "cpu-single", "cpu", "onnx"],
+                        choices=["default", "cpu-single", "cpu", "onnx"])
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=0, help="pool size of the cpu / onnx backends (0 = auto)")
+    parser.add_argument("--quantize", default="none", help="int8 quantization of the onnx backend (e.g. avx512_vnni)")
+    parser.add_argument("--ingest-batch-size", type=int, default=64, help="ingestion's --batch-size")
+    parser.add_argument("--embed-chunk", type=int, default=0, help="ingestion's --embed-chunk (0 = auto)")
+    args = parser.parse_args()
+
+    texts = load_texts(args.docs)
+    print(f"{len(texts)} documents, mean {np.mean([len(t) for t in texts]):.0f} chars, {os.cpu_count()} cores")
+    print(f"\n{'backend':<12}{'load s':>10}{'chunk':>8}{'pool':>6}{'docs/s':>10}{'total s':>10}{'cos vs first':>14}")
+
+    reference = None
+    for name in args.backends:
+        try:
+            start = time.perf_counter()
+            backend = make_backend(name, args)
+            load_s = time.perf_counter() - start
+        except (ImportError, OSError, ValueError) as e:
+            print(f"{name:<12}unavailable: {e}")
+            continue
+        # Warm-up (and pool start-up) outside the timed run
+        backend.embed_documents(texts[: min(len(texts), 2 * args.batch_size)])
+        if isinstance(backend, CPUThroughputEmbeddings) and backend.workers > 1:
+            backend._get_pool()
+        chunk = embedding_chunk_size(backend, args.ingest_batch_size, args.embed_chunk)
+        pooled = (
+            isinstance(backend, CPUThroughputEmbeddings) and backend.workers > 1
+            and min(chunk, len(texts)) >= backend.pool_min_texts
+        )
+        start = time.perf_counter()
+        vectors = embed_like_ingest(backend, texts, chunk)
+        total_s = time.perf_counter() - start
+        if reference is None:
+            reference = vectors
+        cosine = float(np.mean(np.sum(vectors * reference, axis=1)))
+        print(
+            f"{name:<12}{load_s:>10.1f}{chunk:>8}{'yes' if pooled else 'no':>6}"
+            f"{len(texts) / total_s:>10.1f}{total_s:>10.1f}{cosine:>14.4f}"
+        )
+        if hasattr(backend, "close"):
+            backend.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Per-query encoding latency of the hybrid search: dense model (document model
+vs QUERY_EMBEDDING_MODEL / --query-model), BM25 and the query LRU.
+
+Queries are synthesized from the listing columns, the way query_maker_hybrid
+phrases them; --repeat replays each one to measure cache hits.
+
+    python benchmarks/bench_query_encoding.py --queries 200
+    python benchmarks/bench_query_encoding.py --query-model BAAI/bge-small-en-v1.5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_backends import (  # noqa: E402
+    EMBEDDING_MODEL,
+    QUERY_EMBEDDING_MODEL,
+    CachedQueryEmbeddings,
+    CachedSparseEncoder,
+    make_embeddings,
+)
+
+
+def make_queries(count: int) -> list:
+    from dataset_store import get_dataset
+
+    listings = get_dataset().listings
+    rng = np.random.default_rng(0)
+    rows = listings.iloc[rng.integers(0, len(listings), size=count)]
+    return [
+        f"{row.get('bedRoom', 2)} bedroom property in {row.get('City', 'Delhi')} facing {row.get('facing', 'East')} "
+        f"with {rng.choice(['park view', 'modular kitchen', 'gym', 'swimming pool', 'metro nearby'])}"
+        for _, row in rows.iterrows()
+    ]
+
+
+def timed(fn, queries: list) -> np.ndarray:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000
+
+
+def report(name: str, latencies: np.ndarray) -> None:
+    print(f"{name:<34}{latencies.mean():>10.2f}{np.percentile(latencies, 50):>10.2f}{np.percentile(latencies, 95):>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-model", default=QUERY_EMBEDDING_MODEL or "BAAI/bge-small-en-v1.5")
+    parser.add_argument("--repeat", type=int, default=2, help="passes over the queries (all but the first hit the cache)")
+    args = parser.parse_args()
+
+    queries = make_queries(args.queries)
+    print(f"{len(queries)} queries, e.g. {queries[0]!r}")
+    print(f"\n{'encoder':<34}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+
+    models = [(EMBEDDING_MODEL, make_embeddings(model_name=EMBEDDING_MODEL))]
+    if args.query_model and args.query_model != EMBEDDING_MODEL:
+        models.append((args.query_model, make_embeddings(model_name=args.query_model)))
+    for name, model in models:
+        model.embed_query("warm up")
+        report(f"{name.split('/')[-1]} (uncached)", timed(model.embed_query, queries))
+        cached = CachedQueryEmbeddings(model)
+        timed(cached.embed_query, queries)
+        report(f"{name.split('/')[-1]} (cached)", timed(cached.embed_query, queries * (args.repeat - 1)))
+
+    try:
+        from hybrid_search import load_bm25
+
+        bm25 = load_bm25()
+    except ImportError as e:
+        print(f"BM25 unavailable: {e}")
+        return
+    report("bm25 (uncached)", timed(bm25.encode_queries, queries))
+    cached_bm25 = CachedSparseEncoder(bm25)
+    timed(cached_bm25.encode_queries, queries)
+    report("bm25 (cached)", timed(cached_bm25.encode_queries, queries * (args.repeat - 1)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Versioned on-disk artifact for the fitted BM25 encoder.
+#
+# The encoder is fitted once, at ingestion / index-build time, and saved as
+# `bm25_params.json` (pinecone_text's own dump format) plus a `manifest.json`:
+#     {"format_version": 1, "version": "<sha256 of the params>", "n_docs": ...,
+#      "corpus_fingerprint": "<sha256 of the fitted corpus>", "created_at": ...}
+#
+# Indexes record the `version` they were encoded with (`record_bm25_version`),
+# and query time loads the artifact only when it matches, so query-time and
+# index-time sparse statistics cannot drift apart.
+BM25_FORMAT_VERSION = 1
+BM25_DIR = os.getenv("BM25_DIR", os.path.join("dataset", "bm25"))
+PARAMS_FILE = "bm25_params.json"
+MANIFEST_FILE = "manifest.json"
+VERSION_FILE = "bm25_version"
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def corpus_fingerprint(corpus: Iterable[str]) -> str:
+    digest = hashlib.sha256()
+    for text in corpus:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def fit_bm25(corpus: list) -> Any:
+    """Fit a BM25 encoder (default tokenizer settings) on `corpus`."""
+    from pinecone_text.sparse import BM25Encoder
+
+    bm25 = BM25Encoder().default()
+    bm25.fit(corpus)
+    return bm25
+
+
+def save_bm25(encoder: Any, corpus: list, directory: str = BM25_DIR) -> Dict[str, Any]:
+    """Write the fitted encoder and its manifest; returns the manifest."""
+    os.makedirs(directory, exist_ok=True)
+    params_path = os.path.join(directory, PARAMS_FILE)
+    tmp_path = params_path + ".tmp"
+    encoder.dump(tmp_path)
+    os.replace(tmp_path, params_path)
+
+    manifest = {
+        "format_version": BM25_FORMAT_VERSION,
+        "version": _sha256_file(params_path),
+        "n_docs": len(corpus),
+        "corpus_fingerprint": corpus_fingerprint(corpus),
+        "created_at": time.time(),
+    }
+    tmp_path = os.path.join(directory, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_FILE))
+    return manifest
+
+
+def read_manifest(directory: str = BM25_DIR) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_bm25_artifact(
+    directory: str = BM25_DIR,
+    expected_version: Optional[str] = None,
+) -> Optional[Tuple[Any, Dict[str, Any]]]:
+    """
+    (encoder, manifest) from `directory`, or None when the artifact is
+    missing, has another format version, does not match `expected_version`
+    or its params file was modified after it was written.
+    """
+    manifest = read_manifest(directory)
+    params_path = os.path.join(directory, PARAMS_FILE)
+    if manifest is None or not os.path.exists(params_path):
+        return None
+    if manifest.get("format_version") != BM25_FORMAT_VERSION:
+        print(f"[WARN] BM25 artifact in {directory} has format {manifest.get('format_version')}, expected {BM25_FORMAT_VERSION}.")
+        return None
+    if expected_version is not None and manifest.get("version") != expected_version:
+        print(f"[WARN] BM25 artifact version {manifest.get('version')} does not match the index ({expected_version}).")
+        return None
+    if _sha256_file(params_path) != manifest.get("version"):
+        print(f"[WARN] BM25 params in {directory} do not match their manifest.")
+        return None
+
+    from pinecone_text.sparse import BM25Encoder
+
+    encoder = BM25Encoder()
+    encoder.load(params_path)
+    return encoder, manifest
+
+
+def record_bm25_version(directory: str, version: str) -> None:
+    """Note next to an index which BM25 artifact its sparse vectors were encoded with."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, VERSION_FILE), "w", encoding="utf-8") as f:
+        f.write(version)
+
+
+def recorded_bm25_version(directory: str) -> Optional[str]:
+    try:
+        with open(os.path.join(directory, VERSION_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
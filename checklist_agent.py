@@ -1,14 +1,27 @@
-from llm_models import get_deepseek_model, initialize_models
+from llm_models import get_deepseek_model, initialize_models, DEEPSEEK_MODEL_NAME
 from parser_and_prompts import field_to_set_parser,field_extraction_prompt
+from llm_cache import cached_call, acached_call
+from streaming_parser import arun_chain
+from models import FieldToSearch
 
 def field_to_set_agent(user_query):
-    # Initialize models if not already done
-    initialize_models()
-    deepseek_model = get_deepseek_model()
-    field_set_chain=field_extraction_prompt|deepseek_model|field_to_set_parser
-    result=field_set_chain.invoke(user_query)
+    def _invoke():
+        # Initialize models if not already done
+        initialize_models()
+        deepseek_model = get_deepseek_model()
+        field_set_chain=field_extraction_prompt|deepseek_model|field_to_set_parser
+        return field_set_chain.invoke(user_query)
+
+    result=cached_call(field_extraction_prompt, DEEPSEEK_MODEL_NAME, user_query, _invoke, FieldToSearch)
     # print(result)
     return result
 
-# print(field_to_set_agent(input("Enter User Query")))
 
+async def afield_to_set_agent(user_query):
+    async def _ainvoke():
+        deepseek_model = get_deepseek_model()
+        return await arun_chain("groq", field_extraction_prompt, deepseek_model, user_query, field_to_set_parser, "fields")
+
+    return await acached_call(field_extraction_prompt, DEEPSEEK_MODEL_NAME, user_query, _ainvoke, FieldToSearch)
+
+# print(field_to_set_agent(input("Enter User Query")))
@@ -1,10 +1,17 @@
 import os
-from typing import Any, Dict, List, Optional, Union
+import threading
+import weakref
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 
 # LLM only for parsing user query → search_data + comparison operators
-from llm_models import get_deepseek_model, initialize_models
+from llm_models import get_deepseek_model, initialize_models, DEEPSEEK_MODEL_NAME
+from llm_cache import cached_call, acached_call
+from streaming_parser import arun_chain
+from models import ApplyFilterToColumn, SearchData
 from parser_and_prompts import (
     search_prompt_template,
     filter_prompt_template,
@@ -14,14 +21,8 @@ from parser_and_prompts import (
 
 load_dotenv()
 
-
-# Assuming your repo structure:
-# ├── app.py
-# ├── dataset/
-# │   └── properties.csv
-
-CSV_PATH = os.path.join("dataset", "real_property_data.csv")
-df = pd.read_csv(CSV_PATH)
+# The listings frame is passed in by the caller (loaded from the Parquet
+# store, see dataset_store.py); nothing is read at import.
 
 # =========================
 # Parsers from LLM (unchanged)
@@ -32,11 +33,14 @@ def get_filter_for_columns(user_query: str):
     Returns an ApplyFilterToColumn pydantic model (or equivalent) with
     fields set to 'Greater than' / 'Lesser than' or None.
     """
-    # Initialize models if not already done
-    initialize_models()
-    deepseek_model = get_deepseek_model()
-    filter_chain = filter_prompt_template |deepseek_model| filter_column_parser
-    result = filter_chain.invoke({'user_query': user_query})
+    def _invoke():
+        # Initialize models if not already done
+        initialize_models()
+        deepseek_model = get_deepseek_model()
+        filter_chain = filter_prompt_template |deepseek_model| filter_column_parser
+        return filter_chain.invoke({'user_query': user_query})
+
+    result = cached_call(filter_prompt_template, DEEPSEEK_MODEL_NAME, user_query, _invoke, ApplyFilterToColumn)
     return result  # keep pydantic model; we handle model_dump later
 
 
@@ -45,11 +49,35 @@ def get_search_data(user_query: str) -> Dict[str, Any]:
     Returns a dict of extracted search values based on the user's query.
     Values may be singular or lists (for ranges).
     """
-    # Initialize models if not already done
-    initialize_models()
-    deepseek_model = get_deepseek_model()
-    search_chain = search_prompt_template |deepseek_model| search_parser
-    result = search_chain.invoke(user_query)
+    def _invoke():
+        # Initialize models if not already done
+        initialize_models()
+        deepseek_model = get_deepseek_model()
+        search_chain = search_prompt_template |deepseek_model| search_parser
+        return search_chain.invoke(user_query)
+
+    result = cached_call(search_prompt_template, DEEPSEEK_MODEL_NAME, user_query, _invoke, SearchData)
+    return result.model_dump(exclude_none=True)
+
+
+async def aget_filter_for_columns(user_query: str):
+    """Async variant of `get_filter_for_columns` built on `ainvoke`."""
+    async def _ainvoke():
+        deepseek_model = get_deepseek_model()
+        return await arun_chain(
+            "groq", filter_prompt_template, deepseek_model, {'user_query': user_query}, filter_column_parser, "filter_on_columns"
+        )
+
+    return await acached_call(filter_prompt_template, DEEPSEEK_MODEL_NAME, user_query, _ainvoke, ApplyFilterToColumn)
+
+
+async def aget_search_data(user_query: str) -> Dict[str, Any]:
+    """Async variant of `get_search_data` built on `ainvoke`."""
+    async def _ainvoke():
+        deepseek_model = get_deepseek_model()
+        return await arun_chain("groq", search_prompt_template, deepseek_model, user_query, search_parser, "search_data")
+
+    result = await acached_call(search_prompt_template, DEEPSEEK_MODEL_NAME, user_query, _ainvoke, SearchData)
     return result.model_dump(exclude_none=True)
 
 
@@ -83,10 +111,31 @@ TEXT_COLS = {
 
 
 def _normalize_series_str(s: pd.Series) -> pd.Series:
+    # List cells (e.g. additionalRoom in the Parquet store) compare as their CSV form "A,B"
+    if isinstance(s.dtype, pd.ArrowDtype):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if pa.types.is_list(s.dtype.pyarrow_dtype):
+            s = pd.Series(pc.binary_join(pa.array(s.array), ",").to_pylist(), index=s.index, dtype=object)
+    elif s.dtype == object:
+        s = s.map(lambda v: ",".join(map(str, v)) if isinstance(v, (list, tuple, np.ndarray)) else v)
     return s.astype(str).str.strip().str.casefold()
 
 
+def _numeric_values(s: pd.Series) -> np.ndarray:
+    """Column as float64 (NaN for missing). float32 values are widened via
+    their shortest decimal form, so a stored 1.2 still equals 1.2."""
+    values = pd.to_numeric(s, errors="coerce")
+    if values.dtype == np.float32:
+        values = values.astype(str).astype(np.float64)
+    return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
 def _normalize_value_str(v: Any) -> str:
+    # str() of a (str, Enum) member is "ClassName.member", not its value
+    if isinstance(v, Enum):
+        v = v.value
     return str(v).strip().casefold()
 
 
@@ -96,64 +145,291 @@ def _ensure_list(v: Any) -> List[Any]:
     return v if isinstance(v, list) else [v]
 
 
-def _apply_numeric_filter(
-    df: pd.DataFrame,
-    col: str,
+def numeric_interval(
     value: Optional[Union[int, float, List[Union[int, float]]]],
-    comparator: Optional[str],  # "Greater than" | "Lesser than" | None
-) -> pd.DataFrame:
-    if value is None or col not in df.columns:
-        return df
-
+    comparator: Optional[str],
+) -> Optional[Tuple[float, float]]:
+    """
+    Closed [lo, hi] interval of one numeric predicate: a list of 2+ values
+    without comparator is a range, otherwise the (first) value is compared
+    with `comparator` or matched exactly. None when there is no value;
+    raises ValueError / TypeError for non-numeric values.
+    """
     if isinstance(value, list):
         vals = [x for x in value if x is not None]
         if len(vals) == 0:
-            return df
+            return None
         if len(vals) >= 2 and comparator is None:
-            lo, hi = min(vals), max(vals)
-            return df[df[col].between(lo, hi)]
-        # fall through with single value
+            return float(min(vals)), float(max(vals))
+        # else fall through with single value
         value = vals[0]
-
-    # Single numeric value
-    try:
-        series = pd.to_numeric(df[col], errors="coerce")
-    except Exception:
-        series = df[col]
-
+    if value is None:
+        return None
     if comparator == "Greater than":
-        return df[series >= value]
-    elif comparator == "Lesser than":
-        return df[series <= value]
-    else:
-        return df[series == value]
-
+        return float(value), np.inf
+    if comparator == "Lesser than":
+        return -np.inf, float(value)
+    return float(value), float(value)
 
-def _apply_categorical_filter(
-    df: pd.DataFrame,
-    col: str,
-    value: Optional[Union[str, List[str]]],
-) -> pd.DataFrame:
-    if value is None or col not in df.columns:
-        return df
-
-    series_norm = _normalize_series_str(df[col])
-    values = _ensure_list(value)
-    if len(values) == 0:
-        return df
-
-    norm_values = {_normalize_value_str(v) for v in values}
-    mask = series_norm.isin(norm_values)
-    return df[mask]
 
+class PropertyIndex:
+    """
+    Column indexes over a listings frame, built once per frame:
+      - numeric columns: values sorted once, so range / comparator / equality
+        filters are two binary searches (NaN sorts last and never matches)
+      - enum / text columns: normalized once and factorized to integer codes
+        with a posting list (row positions) per distinct value
+      - top floor: precomputed boolean column
+      - property_id -> row position map, for joins with hybrid search ids
+    Predicates become boolean row bitmaps that are AND-ed together; the
+    result is an array of row positions, the frame itself is never copied.
+    """
 
-def _apply_enum_filter(
-    df: pd.DataFrame,
-    col: str,
-    value: Optional[Union[str, List[str]]],
-) -> pd.DataFrame:
-    # Enums typically stored as strings in the CSV
-    return _apply_categorical_filter(df, col, value)
+    def __init__(self, df: pd.DataFrame):
+        self.n_rows = len(df)
+        self._sorted: Dict[str, Any] = {}
+        self._rank: Dict[str, np.ndarray] = {}
+        self._postings: Dict[str, Any] = {}
+        self._codes: Dict[str, np.ndarray] = {}
+
+        for col in NUMERIC_COLS:
+            if col in df.columns:
+                values = _numeric_values(df[col])
+                order = np.argsort(values, kind="stable")
+                n_valid = int(np.count_nonzero(~np.isnan(values)))
+                self._sorted[col] = (values[order], order, n_valid)
+                rank = np.empty(self.n_rows, dtype=np.uint32)
+                rank[order] = np.arange(self.n_rows, dtype=np.uint32)
+                self._rank[col] = rank
+
+        for col in ENUM_COLS | TEXT_COLS:
+            if col in df.columns:
+                codes, uniques = pd.factorize(_normalize_series_str(df[col]), use_na_sentinel=False)
+                order = np.argsort(codes, kind="stable")
+                bounds = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(uniques)))])
+                lookup = {value: code for code, value in enumerate(uniques)}
+                self._postings[col] = (lookup, order, bounds)
+                self._codes[col] = codes
+
+        self.top_floor = None
+        if "Totalfloor" in df.columns and "floorNum" in df.columns:
+            self.top_floor = _numeric_values(df["Totalfloor"]) == _numeric_values(df["floorNum"])
+
+        # None when there is no property_id column or an id repeats
+        self._position_by_id: Optional[Dict[str, int]] = None
+        if "property_id" in df.columns:
+            ids = df["property_id"].astype(str)
+            if ids.is_unique:
+                self._position_by_id = dict(zip(ids, range(self.n_rows)))
+
+    @property
+    def has_id_positions(self) -> bool:
+        return self._position_by_id is not None
+
+    def id_positions(self, property_ids: Iterable) -> np.ndarray:
+        """Row positions of `property_ids`, in order (-1 for ids not in the frame)."""
+        lookup = self._position_by_id or {}
+        return np.fromiter((lookup.get(str(pid), -1) for pid in property_ids), dtype=np.int64)
+
+    def numeric_bounds(
+        self,
+        col: str,
+        value: Optional[Union[int, float, List[Union[int, float]]]],
+        comparator: Optional[str],  # "Greater than" | "Lesser than" | None
+    ) -> Optional[Tuple[int, int]]:
+        """
+        [start, stop) slice of the column's sorted order matching one numeric
+        predicate; None when the predicate does not apply.
+        """
+        if value is None or col not in self._sorted:
+            return None
+        try:
+            interval = numeric_interval(value, comparator)
+        except (TypeError, ValueError):
+            return 0, 0
+        if interval is None:
+            return None
+        lo, hi = interval
+
+        sorted_values, _, n_valid = self._sorted[col]
+        valid = sorted_values[:n_valid]
+        return (
+            int(np.searchsorted(valid, lo, side="left")),
+            int(np.searchsorted(valid, hi, side="right")),
+        )
+
+    def numeric_mask(
+        self,
+        col: str,
+        value: Optional[Union[int, float, List[Union[int, float]]]],
+        comparator: Optional[str],
+    ) -> Optional[np.ndarray]:
+        """Row bitmap for one numeric predicate; None when it does not apply."""
+        bounds = self.numeric_bounds(col, value, comparator)
+        if bounds is None:
+            return None
+        _, order, _ = self._sorted[col]
+        return self._mask(order[bounds[0]:bounds[1]])
+
+    def categorical_codes(self, col: str, value: Optional[Union[str, List[str]]]) -> Optional[List[int]]:
+        """Codes of the requested values present in the column; None when the predicate does not apply."""
+        if value is None or col not in self._postings:
+            return None
+        values = _ensure_list(value)
+        if len(values) == 0:
+            return None
+        lookup = self._postings[col][0]
+        codes = (lookup.get(_normalize_value_str(v)) for v in values)
+        return sorted({code for code in codes if code is not None})
+
+    def categorical_mask(
+        self,
+        col: str,
+        value: Optional[Union[str, List[str]]],
+    ) -> Optional[np.ndarray]:
+        """Row bitmap for an enum / text predicate (union of posting lists)."""
+        codes = self.categorical_codes(col, value)
+        if codes is None:
+            return None
+        _, order, bounds = self._postings[col]
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for code in codes:
+            mask[order[bounds[code]:bounds[code + 1]]] = True
+        return mask
+
+    def _mask(self, rows: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def filter_positions(
+        self,
+        fields: Dict[str, bool],
+        search_data: Dict[str, Any],
+        filter_on_columns: Dict[str, Any],
+        categorical_only: bool = False,
+    ) -> np.ndarray:
+        """Row positions passing every enabled predicate (see `filter_dataframe_manual`)."""
+        mask = np.ones(self.n_rows, dtype=bool)
+
+        # 1) Handle top-floor first if requested
+        if fields.get("top_floor", False) and self.top_floor is not None:
+            mask &= self.top_floor
+
+        # 2) Apply filters only for fields explicitly marked True (except top_floor handled above)
+        for key, enabled in fields.items():
+            if not enabled or key == "top_floor":
+                continue
+
+            value = search_data.get(key, None)
+            if key in NUMERIC_COLS:
+                if categorical_only:
+                    continue
+                predicate = self.numeric_mask(key, value, filter_on_columns.get(key, None))
+            elif key in ENUM_COLS or key in TEXT_COLS:
+                predicate = self.categorical_mask(key, value)
+            else:
+                predicate = None
+
+            if predicate is not None:
+                mask &= predicate
+                # Early exit if empty
+                if not mask.any():
+                    break
+
+        return np.flatnonzero(mask)
+
+    def filter_positions_batch(
+        self,
+        queries: Sequence[Tuple[Dict[str, bool], Dict[str, Any], Dict[str, Any]]],
+        categorical_only: bool = False,
+    ) -> np.ndarray:
+        """
+        (len(queries) x n_rows) bitmap for many (fields, search_data,
+        filter_on_columns) queries at once. Each column is scanned once for
+        the whole batch: numeric predicates become per-query [start, stop)
+        windows compared against the rows' sorted ranks, categorical ones a
+        (queries x distinct values) lookup table indexed by the row codes.
+        Row i of the result equals `filter_positions` for query i.
+        """
+        n_queries = len(queries)
+        mask = np.ones((n_queries, self.n_rows), dtype=bool)
+
+        if self.top_floor is not None:
+            wants_top = np.array([q[0].get("top_floor", False) for q in queries], dtype=bool)
+            if wants_top.any():
+                mask[wants_top] &= self.top_floor
+
+        active = {
+            key
+            for fields, _, _ in queries
+            for key, enabled in fields.items()
+            if enabled and key != "top_floor"
+        }
+
+        numeric_cols = set() if categorical_only else active & set(self._sorted)
+        for col in numeric_cols:
+            starts = np.zeros(n_queries, dtype=np.uint32)
+            widths = np.full(n_queries, self.n_rows, dtype=np.uint32)
+            restricted = np.zeros(n_queries, dtype=bool)
+            for i, (fields, search_data, filter_on_columns) in enumerate(queries):
+                if fields.get(col, False):
+                    bounds = self.numeric_bounds(col, search_data.get(col, None), filter_on_columns.get(col, None))
+                    if bounds is not None:
+                        starts[i], widths[i] = bounds[0], bounds[1] - bounds[0]
+                        restricted[i] = True
+            if restricted.any():
+                # start <= rank < stop as one unsigned compare (rank - start wraps when below)
+                rank = self._rank[col]
+                mask[restricted] &= (rank - starts[restricted, None]) < widths[restricted, None]
+
+        for col in active & set(self._codes):
+            lookup = self._postings[col][0]
+            allowed = np.ones((n_queries, len(lookup)), dtype=bool)
+            restricted = np.zeros(n_queries, dtype=bool)
+            for i, (fields, search_data, _) in enumerate(queries):
+                if fields.get(col, False):
+                    codes = self.categorical_codes(col, search_data.get(col, None))
+                    if codes is not None:
+                        allowed[i] = False
+                        allowed[i, codes] = True
+                        restricted[i] = True
+            if restricted.any():
+                mask[restricted] &= allowed[restricted][:, self._codes[col]]
+
+        return mask
+
+
+# Indexes are cached per frame object; the frames passed in are treated as
+# read-only (the dataset is loaded once and never mutated in place).
+_property_indexes: Dict[int, Any] = {}
+_property_indexes_lock = threading.Lock()
+
+
+def get_property_index(df: pd.DataFrame) -> PropertyIndex:
+    """The `PropertyIndex` for `df`, built on first use."""
+    key = id(df)
+    with _property_indexes_lock:
+        entry = _property_indexes.get(key)
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+
+    index = PropertyIndex(df)
+    with _property_indexes_lock:
+        _property_indexes[key] = (
+            weakref.ref(df, lambda _, key=key: _property_indexes.pop(key, None)),
+            index,
+        )
+    return index
+
+
+def _filter_on_columns_dict(filter_on_columns_model: Any) -> Dict[str, Any]:
+    """ApplyFilterToColumn pydantic model or dict -> {column: comparator}."""
+    if hasattr(filter_on_columns_model, "model_dump"):
+        return filter_on_columns_model.model_dump(exclude_none=True)
+    if isinstance(filter_on_columns_model, dict):
+        return {k: v for k, v in filter_on_columns_model.items() if v is not None}
+    return {}
 
 
 def filter_dataframe_manual(
@@ -161,50 +437,22 @@ def filter_dataframe_manual(
     fields: Dict[str, bool],
     search_data: Dict[str, Any],
     filter_on_columns_model: Any,  # ApplyFilterToColumn pydantic model or dict
+    categorical_only: bool = False,
 ) -> pd.DataFrame:
     """
     Deterministically filter `df` using:
       - `fields`: which columns the user cares about (bool flags, including optional 'top_floor')
       - `search_data`: values to filter on (single or list/range)
       - `filter_on_columns_model`: per-column comparator ('Greater than' / 'Lesser than') for numeric fields
+    With `categorical_only`, numeric columns are skipped: the result is a
+    superset of the full filter that does not depend on the comparators.
+    Lookups go through the frame's cached `PropertyIndex`.
     """
-    df_filtered = df.copy()
-
-    # Convert pydantic model -> dict if needed
-    if hasattr(filter_on_columns_model, "model_dump"):
-        filter_on_columns = filter_on_columns_model.model_dump(exclude_none=True)
-    elif isinstance(filter_on_columns_model, dict):
-        filter_on_columns = {k: v for k, v in filter_on_columns_model.items() if v is not None}
-    else:
-        filter_on_columns = {}
-
-    # 1) Handle top-floor first if requested
-    if fields.get("top_floor", False):
-        if "Totalfloor" in df_filtered.columns and "floorNum" in df_filtered.columns:
-            df_filtered = df_filtered[df_filtered["Totalfloor"] == df_filtered["floorNum"]]
-
-    # 2) Apply filters only for fields explicitly marked True (except top_floor handled above)
-    for key, enabled in fields.items():
-        if not enabled or key == "top_floor":
-            continue
-
-        value = search_data.get(key, None)
-        comparator = filter_on_columns.get(key, None)
-
-        if key in NUMERIC_COLS and key in df_filtered.columns:
-            df_filtered = _apply_numeric_filter(df_filtered, key, value, comparator)
-
-        elif key in ENUM_COLS and key in df_filtered.columns:
-            df_filtered = _apply_enum_filter(df_filtered, key, value)
-
-        elif key in TEXT_COLS and key in df_filtered.columns:
-            df_filtered = _apply_categorical_filter(df_filtered, key, value)
-
-        # Early exit if empty
-        if df_filtered.empty:
-            break
-
-    return df_filtered
+    filter_on_columns = _filter_on_columns_dict(filter_on_columns_model)
+    positions = get_property_index(df).filter_positions(
+        fields, search_data, filter_on_columns, categorical_only
+    )
+    return df.iloc[positions]
 
 
 def run_csv_agent(
@@ -219,3 +467,139 @@ def run_csv_agent(
     """
     result = filter_dataframe_manual(df, fields, search_data, filter_on_columns)
     return result
+
+
+def run_csv_agent_partial(
+    fields: Dict[str, bool],
+    df: pd.DataFrame,
+    search_data: Dict[str, Any],
+) -> pd.DataFrame:
+    """
+    Speculative narrowing before the comparators are known: applies the
+    top-floor, enum and text filters only. `run_csv_agent` on the result
+    gives the same rows as on the full frame.
+    """
+    return filter_dataframe_manual(df, fields, search_data or {}, {}, categorical_only=True)
+
+
+# Bound on the (queries x rows) bitmap materialized per batch chunk
+BATCH_MAX_CELLS = int(os.getenv("CSV_BATCH_MAX_CELLS", str(1 << 26)))
+
+
+def run_csv_agent_batch(
+    queries: Sequence[Tuple[Any, Any, Any]],
+    df: pd.DataFrame,
+) -> List[np.ndarray]:
+    """
+    Evaluate many stored queries against `df` in one go, e.g. for
+    saved-search alerts. Each query is a (fields, search_data,
+    filter_on_columns) triple as taken by `run_csv_agent`; pydantic models
+    (FieldToSearch, SearchData, ApplyFilterToColumn) are accepted as-is.
+    Returns, per query, the matching row positions in `df` (use
+    `df.iloc[positions]` or `df["property_id"].to_numpy()[positions]`).
+    """
+    if len(queries) == 0:
+        return []
+    index = get_property_index(df)
+    normalized = [
+        (
+            fields.model_dump() if hasattr(fields, "model_dump") else dict(fields),
+            search_data.model_dump(exclude_none=True) if hasattr(search_data, "model_dump") else dict(search_data or {}),
+            _filter_on_columns_dict(filter_on_columns),
+        )
+        for fields, search_data, filter_on_columns in queries
+    ]
+
+    chunk = max(1, BATCH_MAX_CELLS // max(1, len(df)))
+    results: List[np.ndarray] = []
+    for start in range(0, len(normalized), chunk):
+        mask = index.filter_positions_batch(normalized[start:start + chunk])
+        results.extend(np.flatnonzero(row) for row in mask)
+    return results
+
+
+# =========================
+# Retriever-side metadata filters
+# =========================
+# Listings are indexed with these columns as metadata (categoricals
+# normalized like `_normalize_value_str`) so the structured filters can be
+# applied inside the retriever before similarity scoring.
+
+def listing_metadata(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Per-row metadata dicts (property_id, numeric, categorical, is_top_floor)."""
+    rows: List[Dict[str, Any]] = []
+    numeric = {c: _numeric_values(df[c]) for c in NUMERIC_COLS if c in df.columns}
+    categorical = {
+        c: _normalize_series_str(df[c]).where(df[c].notna())
+        for c in (ENUM_COLS | TEXT_COLS) if c in df.columns
+    }
+    top_floor = None
+    if "Totalfloor" in numeric and "floorNum" in numeric:
+        top_floor = numeric["Totalfloor"] == numeric["floorNum"]
+
+    for i in range(len(df)):
+        meta: Dict[str, Any] = {}
+        if "property_id" in df.columns:
+            meta["property_id"] = str(df["property_id"].iat[i])
+        for col, values in numeric.items():
+            value = values[i]
+            if not np.isnan(value):
+                meta[col] = float(value)
+        for col, series in categorical.items():
+            value = series.iat[i]
+            if isinstance(value, str):
+                meta[col] = value
+        if top_floor is not None:
+            meta["is_top_floor"] = bool(top_floor[i])
+        rows.append(meta)
+    return rows
+
+
+def build_metadata_filter(
+    fields: Dict[str, bool],
+    search_data: Dict[str, Any],
+    filter_on_columns_model: Any,
+) -> Dict[str, Any]:
+    """
+    Translate the same inputs as `filter_dataframe_manual` into a
+    Pinecone-style metadata filter ($eq/$gte/$lte/$in) with identical
+    semantics. Returns {} when nothing can be pushed down.
+    """
+    filter_on_columns = _filter_on_columns_dict(filter_on_columns_model)
+
+    metadata_filter: Dict[str, Any] = {}
+    if fields.get("top_floor", False):
+        metadata_filter["is_top_floor"] = {"$eq": True}
+
+    for key, enabled in fields.items():
+        if not enabled or key == "top_floor":
+            continue
+        value = search_data.get(key, None)
+        if value is None:
+            continue
+
+        if key in NUMERIC_COLS:
+            comparator = filter_on_columns.get(key, None)
+            if isinstance(comparator, Enum):
+                comparator = comparator.value
+            if isinstance(value, list):
+                vals = [x for x in value if x is not None]
+                if len(vals) == 0:
+                    continue
+                if len(vals) >= 2 and comparator is None:
+                    metadata_filter[key] = {"$gte": float(min(vals)), "$lte": float(max(vals))}
+                    continue
+                value = vals[0]
+            if comparator == "Greater than":
+                metadata_filter[key] = {"$gte": float(value)}
+            elif comparator == "Lesser than":
+                metadata_filter[key] = {"$lte": float(value)}
+            else:
+                metadata_filter[key] = {"$eq": float(value)}
+
+        elif key in ENUM_COLS or key in TEXT_COLS:
+            values = _ensure_list(value)
+            if values:
+                metadata_filter[key] = {"$in": sorted({_normalize_value_str(v) for v in values})}
+
+    return metadata_filter
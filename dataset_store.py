@@ -0,0 +1,232 @@
+"""
+Columnar store for the property dataset.
+
+`dataset/real_property_data.csv` (listings) and `dataset/Real_Description.csv`
+(free-text descriptions) are converted once into a single Parquet file keyed
+by `property_id`, with a typed schema:
+  - categoricals for City / Country / facing / AreaType
+  - float32 for prices, rates and areas; nullable Int16 for counts and floors
+  - list<string> columns for `features` and `additionalRoom`
+  - `description` (raw text) and `doc_text` (the text the hybrid index
+    embeds, formatted exactly like LangChain's CSVLoader page_content)
+
+Readers project only the columns they need and memory-map the file.
+`get_dataset()` is the process-wide, load-once view used by the app and
+the agents.
+
+Build (or rebuild) the store:
+    python dataset_store.py [--listings CSV] [--descriptions CSV] [--out PARQUET]
+"""
+
+import argparse
+import ast
+import csv
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+LISTINGS_CSV = os.path.join("dataset", "real_property_data.csv")
+DESCRIPTIONS_CSV = os.path.join("dataset", "Real_Description.csv")
+STORE_PATH = os.getenv("DATASET_STORE", os.path.join("dataset", "properties.parquet"))
+
+CATEGORY_COLS = ["City", "Country", "facing", "AreaType"]
+FLOAT32_COLS = ["Price_in_Crore", "Rate_rs_sqft", "Area_in_sq_meter"]
+INT16_COLS = ["bedRoom", "bathroom", "balcony", "floorNum", "Totalfloor"]
+LIST_COLS = ["features", "additionalRoom"]
+
+
+def _parse_list(value) -> Optional[List[str]]:
+    """"['a', 'b']" or "a,b" -> ["a", "b"]; missing -> None."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [str(x).strip() for x in value if str(x).strip()]
+    text = str(value).strip()
+    if text.startswith("["):
+        try:
+            parsed = ast.literal_eval(text)
+            if isinstance(parsed, (list, tuple)):
+                return [str(x).strip() for x in parsed if str(x).strip()]
+        except (ValueError, SyntaxError):
+            pass
+    return [s.strip() for s in text.split(",") if s.strip()]
+
+
+def _typed_listings(listings: pd.DataFrame) -> pd.DataFrame:
+    listings = listings.copy()
+    for col in FLOAT32_COLS:
+        if col in listings.columns:
+            listings[col] = pd.to_numeric(listings[col], errors="coerce").astype(np.float32)
+    for col in INT16_COLS:
+        if col in listings.columns:
+            values = pd.to_numeric(listings[col], errors="coerce")
+            present = values.dropna()
+            fits_int16 = bool(
+                present.eq(present.round()).all()
+                and present.abs().le(np.iinfo(np.int16).max).all()
+            )
+            listings[col] = values.astype("Int16") if fits_int16 else values.astype(np.float32)
+    for col in CATEGORY_COLS:
+        if col in listings.columns:
+            listings[col] = listings[col].astype("category")
+    for col in LIST_COLS:
+        if col in listings.columns:
+            listings[col] = listings[col].map(_parse_list)
+    return listings
+
+
+def _read_descriptions(path: str) -> pd.DataFrame:
+    """property_id, description and doc_text (CSVLoader page_content, metadata_columns=["property_id"])."""
+    rows = []
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            doc_text = "\n".join(
+                f"{k.strip() if k is not None else k}: {v.strip() if isinstance(v, str) else v}"
+                for k, v in row.items()
+                if k != "property_id"
+            )
+            rows.append({
+                "property_id": str(row["property_id"]),
+                "description": (row.get("Description") or "").strip(),
+                "doc_text": doc_text,
+            })
+    return pd.DataFrame(rows, columns=["property_id", "description", "doc_text"])
+
+
+def build_store(
+    listings_csv: str = LISTINGS_CSV,
+    descriptions_csv: str = DESCRIPTIONS_CSV,
+    out_path: str = STORE_PATH,
+) -> str:
+    """Convert the CSVs into the typed Parquet store; returns its path."""
+    listings = pd.read_csv(listings_csv)
+    listings = listings.loc[:, [c for c in listings.columns if not c.startswith("Unnamed:")]]
+    listings["property_id"] = listings["property_id"].astype(str)
+    listings["is_listing"] = True
+    if os.path.exists(descriptions_csv):
+        descriptions = _read_descriptions(descriptions_csv).drop_duplicates("property_id")
+        merged = listings.merge(descriptions, on="property_id", how="left")
+        # Descriptions for ids missing from the listings are kept (the hybrid index embeds them all)
+        extra = descriptions[~descriptions["property_id"].isin(listings["property_id"])]
+        listings = pd.concat([merged, extra.assign(is_listing=False)], ignore_index=True)
+    else:
+        print(f"[WARN] {descriptions_csv} not found; store built without descriptions.")
+    listings = _typed_listings(listings)
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    listings.to_parquet(tmp_path, engine="pyarrow", index=False, compression="zstd")
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def ensure_store(path: str = STORE_PATH) -> str:
+    """Path of the store, building it from the CSVs on first use (or when they are newer)."""
+    sources = [p for p in (LISTINGS_CSV, DESCRIPTIONS_CSV) if os.path.exists(p)]
+    stale = os.path.exists(path) and any(os.path.getmtime(p) > os.path.getmtime(path) for p in sources)
+    if not os.path.exists(path) or stale:
+        print(f"[INFO] Building dataset store {path} ...")
+        build_store(out_path=path)
+    return path
+
+
+def _types_mapper(arrow_type):
+    # List columns stay Arrow-backed (one buffer, cells read back as lists)
+    # instead of a numpy array object per row
+    import pyarrow as pa
+
+    return pd.ArrowDtype(arrow_type) if pa.types.is_list(arrow_type) else None
+
+
+def read_store(columns: Optional[List[str]] = None, path: str = STORE_PATH) -> pd.DataFrame:
+    """Memory-mapped read of the store, projected to `columns` (all when None)."""
+    import pyarrow.parquet as pq
+
+    ensure_store(path)
+    if columns is not None:
+        available = set(pq.read_schema(path).names)
+        columns = [c for c in columns if c in available]
+    table = pq.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas(types_mapper=_types_mapper)
+
+
+def load_listings(columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Listing rows projected to `columns` (default: every listing column, no description text)."""
+    import pyarrow.parquet as pq
+
+    path = ensure_store()
+    if columns is None:
+        columns = [c for c in pq.read_schema(path).names if c not in ("description", "doc_text", "is_listing")]
+    frame = read_store(list(dict.fromkeys(columns + ["is_listing"])), path)
+    frame = frame[frame["is_listing"]].drop(columns="is_listing").reset_index(drop=True)
+    return frame
+
+
+def load_descriptions() -> pd.DataFrame:
+    """property_id, description and doc_text for every described property."""
+    frame = read_store(["property_id", "description", "doc_text"])
+    if "doc_text" not in frame.columns:
+        return frame.iloc[0:0].reindex(columns=["property_id", "description", "doc_text"])
+    return frame[frame["doc_text"].notna()].reset_index(drop=True)
+
+
+class PropertyDataset:
+    """
+    The listings and their descriptions, loaded once per process.
+
+    `listings` is shared by every caller and must be treated as read-only
+    (take views rather than mutating it), so per-frame caches such as
+    csv_agent's PropertyIndex, which also maps property_id to row
+    position for the hybrid-search joins, stay valid. The long
+    `doc_text` column is only needed to build search indexes and is read
+    from the store on demand (`doc_texts`).
+    """
+
+    def __init__(self, listings: pd.DataFrame, descriptions: pd.DataFrame):
+        self.listings = listings
+        self.descriptions = descriptions
+        self._description_by_id: Dict[str, str] = dict(
+            zip(descriptions["property_id"].astype(str), descriptions["description"].fillna(""))
+        )
+
+    @classmethod
+    def load(cls) -> "PropertyDataset":
+        return cls(load_listings(), load_descriptions()[["property_id", "description"]])
+
+    def __len__(self) -> int:
+        return len(self.listings)
+
+    def description(self, property_id) -> str:
+        """Description text for `property_id` ("" when there is none)."""
+        return self._description_by_id.get(str(property_id), "")
+
+    def doc_texts(self) -> pd.DataFrame:
+        """property_id and doc_text (the hybrid-index page content) for every described property."""
+        return load_descriptions()[["property_id", "doc_text"]]
+
+
+_dataset: Optional[PropertyDataset] = None
+_dataset_lock = threading.Lock()
+
+
+def get_dataset() -> PropertyDataset:
+    """Process-wide dataset, loaded from the store on first use."""
+    global _dataset
+    if _dataset is None:
+        with _dataset_lock:
+            if _dataset is None:
+                _dataset = PropertyDataset.load()
+    return _dataset
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the Parquet property store from the CSVs.")
+    parser.add_argument("--listings", default=LISTINGS_CSV)
+    parser.add_argument("--descriptions", default=DESCRIPTIONS_CSV)
+    parser.add_argument("--out", default=STORE_PATH)
+    args = parser.parse_args()
+    path = build_store(args.listings, args.descriptions, args.out)
+    print(f"[INFO] Wrote {path}")
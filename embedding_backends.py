@@ -0,0 +1,272 @@
+import atexit
+import copy
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+# ---------------------------
+# Config
+# ---------------------------
+EMBEDDING_MODEL = "BAAI/bge-large-en-v1.5"
+
+# "default"  -> langchain HuggingFaceEmbeddings, single process (mps when available)
+# "cpu"      -> CPUThroughputEmbeddings: length-bucketed batches, a multi-process
+#               pool of CPU workers for large inputs (ingestion)
+# "onnx"     -> "cpu" running the ONNX export of the model (needs optimum[onnxruntime])
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "default").strip().lower()
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+# Worker processes for large inputs (0 = one per 4 cores, 1 = never start a pool)
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "0"))
+# ONNX backend only: "none", "avx512_vnni", "avx512", "avx2" or "arm64" dynamic int8 quantization
+EMBEDDING_QUANTIZE = os.getenv("EMBEDDING_QUANTIZE", "none").strip().lower()
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", os.path.join("dataset", "onnx_embeddings"))
+# Texts per embedding call during ingestion (0 = auto: large enough for the worker pool)
+EMBEDDING_CHUNK = int(os.getenv("EMBEDDING_CHUNK", "0"))
+
+# Query side: a smaller model for embed_query (must embed into the index's
+# space, e.g. a model distilled from bge-large; checked against the index
+# dimension) and an LRU of encoded queries ("" / 0 = off)
+QUERY_EMBEDDING_MODEL = os.getenv("QUERY_EMBEDDING_MODEL", "").strip()
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+
+
+def _default_workers() -> int:
+    return max(1, (os.cpu_count() or 1) // 4)
+
+
+def length_buckets(texts: List[str], batch_size: int) -> List[np.ndarray]:
+    """
+    Positions of `texts` grouped into batches of similar length (longest
+    first), so each batch is padded to about its own length rather than to
+    the longest text of the corpus.
+    """
+    order = np.argsort([-len(t) for t in texts], kind="stable")
+    return [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+
+
+class CPUThroughputEmbeddings(Embeddings):
+    """
+    sentence-transformers embeddings tuned for CPU-only throughput.
+
+    Inputs are sorted into length buckets before batching. Inputs of at
+    least `pool_min_texts` texts are sharded across a pool of worker
+    processes (each with its own copy of the model and cores / workers
+    threads); smaller inputs and queries run in-process, so the pool is only
+    started by ingestion-sized calls. Vectors are normalized, as with
+    HuggingFaceEmbeddings(normalize_embeddings=True).
+    """
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        onnx: bool = False,
+        quantize: str = "none",
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        workers: int = EMBEDDING_WORKERS,
+        pool_min_texts: Optional[int] = None,
+    ):
+        self.model_name = model_name
+        self.onnx = onnx
+        self.quantize = quantize if onnx else "none"
+        self.batch_size = batch_size
+        self.workers = workers or _default_workers()
+        self.pool_min_texts = pool_min_texts if pool_min_texts is not None else 4 * batch_size * self.workers
+        self._model = self._load_model()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _load_model(self) -> Any:
+        from sentence_transformers import SentenceTransformer
+
+        if not self.onnx:
+            return SentenceTransformer(self.model_name, device="cpu")
+        if self.quantize == "none":
+            # Exported on first load when the model repo ships no ONNX file
+            return SentenceTransformer(self.model_name, device="cpu", backend="onnx")
+
+        file_name = f"onnx/model_qint8_{self.quantize}.onnx"
+        local_dir = os.path.join(EMBEDDING_ONNX_DIR, self.model_name.replace("/", "__"))
+        if not os.path.exists(os.path.join(local_dir, file_name)):
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            print(f"[INFO] Exporting int8 ({self.quantize}) ONNX model to {local_dir} ...")
+            model = SentenceTransformer(self.model_name, device="cpu", backend="onnx")
+            model.save(local_dir)
+            export_dynamic_quantized_onnx_model(model, self.quantize, local_dir)
+        return SentenceTransformer(local_dir, device="cpu", backend="onnx", model_kwargs={"file_name": file_name})
+
+    # ---------- multi-process pool ----------
+    def _get_pool(self) -> Any:
+        with self._pool_lock:
+            if self._pool is None:
+                # Split the cores between the workers instead of oversubscribing them
+                threads = str(max(1, (os.cpu_count() or 1) // self.workers))
+                previous = {k: os.environ.get(k) for k in ("OMP_NUM_THREADS", "MKL_NUM_THREADS")}
+                os.environ.update({k: threads for k in previous})
+                try:
+                    self._pool = self._model.start_multi_process_pool(["cpu"] * self.workers)
+                finally:
+                    for key, value in previous.items():
+                        if value is None:
+                            os.environ.pop(key, None)
+                        else:
+                            os.environ[key] = value
+                atexit.register(self.close)
+            return self._pool
+
+    def close(self) -> None:
+        """Stop the worker processes (if started)."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._model.stop_multi_process_pool(self._pool)
+                self._pool = None
+
+    # ---------- Embeddings interface ----------
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self._model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+
+    def encode_array(self, texts: List[str]) -> np.ndarray:
+        """(len(texts) x D) float32 embeddings, in input order."""
+        if not texts:
+            return np.zeros((0, self._model.get_sentence_embedding_dimension()), dtype=np.float32)
+        buckets = length_buckets(texts, self.batch_size)
+        order = np.concatenate(buckets)
+        ordered = [texts[i] for i in order]
+        if self.workers > 1 and len(texts) >= self.pool_min_texts:
+            # Each worker gets whole length buckets
+            vectors = self._model.encode_multi_process(
+                ordered,
+                self._get_pool(),
+                batch_size=self.batch_size,
+                chunk_size=self.batch_size * 4,
+                normalize_embeddings=True,
+            )
+        else:
+            vectors = self._encode(ordered)
+        result = np.empty_like(vectors, dtype=np.float32)
+        result[order] = vectors
+        return result
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode_array(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
+
+
+def embedding_chunk_size(embeddings: Embeddings, batch_size: int, chunk: int = 0) -> int:
+    """
+    Texts per embedding call when ingesting in `batch_size` upsert batches:
+    `chunk` (or EMBEDDING_CHUNK), or by default at least 1024 and at least the `pool_min_texts`
+    of a CPUThroughputEmbeddings (so its worker pool and length buckets see
+    the whole call), rounded up to whole batches.
+    """
+    size = chunk or EMBEDDING_CHUNK or max(1024, getattr(embeddings, "pool_min_texts", 0))
+    return max(batch_size, -(-size // batch_size) * batch_size)
+
+
+def embed_array(embeddings: Embeddings, texts: List[str]) -> np.ndarray:
+    """(len(texts) x D) float32 document embeddings (no list round trip for CPUThroughputEmbeddings)."""
+    if isinstance(embeddings, CPUThroughputEmbeddings):
+        return embeddings.encode_array(texts)
+    return np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+
+
+def make_embeddings(backend: Optional[str] = None, model_name: str = EMBEDDING_MODEL) -> Embeddings:
+    """The dense embedding model for `backend` (default EMBEDDING_BACKEND)."""
+    backend = (backend or EMBEDDING_BACKEND).strip().lower()
+    if backend in ("cpu", "onnx"):
+        return CPUThroughputEmbeddings(model_name, onnx=backend == "onnx", quantize=EMBEDDING_QUANTIZE)
+    if backend != "default":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r} (expected default, cpu or onnx)")
+
+    import torch
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    device = "mps" if torch.backends.mps.is_available() else "cpu"
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={"device": device},
+        encode_kwargs={"normalize_embeddings": True}
+    )
+
+
+# ---------- query-side caching ----------
+def normalize_query(text: str) -> str:
+    """Cache key of a hybrid query: bge's tokenizer and BM25 both lowercase, so case and spacing don't matter."""
+    return " ".join(text.lower().split())
+
+
+class _LRU:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """`embeddings` with `embed_query` going through an LRU keyed by the normalized query."""
+
+    def __init__(self, embeddings: Embeddings, maxsize: int = QUERY_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.cache = _LRU(maxsize)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.cache.maxsize <= 0:
+            return self.embeddings.embed_query(text)
+        vector = self.cache.get_or_compute(normalize_query(text), lambda: tuple(self.embeddings.embed_query(text)))
+        return list(vector)
+
+
+class CachedSparseEncoder:
+    """BM25 encoder whose `encode_queries` goes through an LRU keyed by the normalized query."""
+
+    def __init__(self, encoder: Any, maxsize: int = QUERY_CACHE_SIZE):
+        self.encoder = encoder
+        self.cache = _LRU(maxsize)
+
+    def encode_queries(self, texts):
+        if isinstance(texts, list) or self.cache.maxsize <= 0:
+            return self.encoder.encode_queries(texts)
+        vector = self.cache.get_or_compute(normalize_query(texts), lambda: self.encoder.encode_queries(texts))
+        # Callers (e.g. PineconeHybridSearchRetriever) modify the returned dict in place
+        return copy.deepcopy(vector)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.encoder, name)
@@ -0,0 +1,43 @@
+from llm_models import get_llama_model, initialize_models, LLAMA_MODEL_NAME
+from parser_and_prompts import combined_extraction_prompt, combined_parser
+from llm_cache import cached_call, acached_call
+from streaming_parser import arun_chain
+from models import CombinedExtraction
+
+
+def extract_all(user_query):
+    """
+    Single-call extraction: returns a CombinedExtraction with the intent,
+    fields, search data, comparators and hybrid query for `user_query`.
+    Uses llama so no <think> tokens are generated before the JSON.
+    """
+    def _invoke():
+        # Initialize models if not already done
+        initialize_models()
+        llama_model = get_llama_model()
+        extraction_chain = combined_extraction_prompt | llama_model | combined_parser
+        return extraction_chain.invoke({'user_query': user_query})
+
+    result = cached_call(combined_extraction_prompt, LLAMA_MODEL_NAME, user_query, _invoke, CombinedExtraction)
+    return result
+
+
+async def arun_extraction(user_query):
+    """
+    One uncached combined extraction through `arun_chain`: holds a slot of
+    the process-wide Groq limiter and stops streaming as soon as the JSON
+    is complete.
+    """
+    return await arun_chain(
+        "groq", combined_extraction_prompt, get_llama_model(), {'user_query': user_query}, combined_parser, "combined_extraction"
+    )
+
+
+async def aextract_all(user_query):
+    """Async variant of `extract_all` built on `ainvoke`."""
+    return await acached_call(
+        combined_extraction_prompt, LLAMA_MODEL_NAME, user_query, lambda: arun_extraction(user_query), CombinedExtraction
+    )
+
+
+# print(extract_all(input("Enter the query")))
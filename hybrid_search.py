@@ -1,93 +1,329 @@
+import functools
 import os
-import torch
+import threading
+from importlib.util import find_spec
 from dotenv import load_dotenv
-import streamlit as st
 
-# Optional imports for Pinecone functionality
-try:
-    from pinecone import Pinecone
-    from pinecone_text.sparse import BM25Encoder
-    from langchain_huggingface import HuggingFaceEmbeddings
-    from langchain_community.document_loaders import CSVLoader
-    from langchain_community.retrievers import PineconeHybridSearchRetriever
-    PINECONE_AVAILABLE = True
-except ImportError:
-    PINECONE_AVAILABLE = False
-    print("Warning: Pinecone dependencies not available. Hybrid search will be disabled.")
+# Heavy dependencies (torch, sentence-transformers via langchain_huggingface,
+# pinecone) are only located here, not imported: they are imported inside
+# the loaders below, on the first hybrid query or by the background warmup.
+HYBRID_AVAILABLE = all(
+    find_spec(m) is not None for m in ("pinecone_text", "langchain_huggingface", "torch")
+)
+PINECONE_AVAILABLE = HYBRID_AVAILABLE and find_spec("pinecone") is not None
+
+if not HYBRID_AVAILABLE:
+    print("Warning: Hybrid search dependencies not available. Hybrid search will be disabled.")
+
+from dataset_store import get_dataset
 
 # ---------------------------
 # Config
 # ---------------------------
-DATA_PATH = "dataset/Real_Description.csv"
 INDEX_NAME = "property-advisor-agent"
+INDEX_DIMENSION = 1024  # bge-large-en-v1.5
 
-os.environ["TOKENIZERS_PARALLELISM"] = "false"
+# "pinecone" -> remote Pinecone index; "local" -> in-process dense + BM25 index
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "pinecone").strip().lower()
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", os.path.join("dataset", "local_index"))
+# Pinecone has no index-level metadata: ingestion records which BM25 artifact
+# the remote sparse vectors were encoded with in this directory instead
+PINECONE_MANIFEST_DIR = os.getenv("PINECONE_MANIFEST_DIR", os.path.join("dataset", "pinecone_index"))
+HYBRID_ALPHA = 0.5
+HYBRID_TOP_K = 1000
+
+# Off by default (fork-safety warnings under Streamlit); export it to override
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
 load_dotenv()
 
-DEVICE = "mps" if torch.backends.mps.is_available() else "cpu"
+
+def _load_once(fn):
+    """Process-wide memoization of a zero-argument loader; concurrent first
+    calls (query thread vs. background warmup) build it only once."""
+    cached = functools.lru_cache(maxsize=None)(fn)
+    lock = threading.Lock()
+
+    @functools.wraps(fn)
+    def wrapper():
+        with lock:
+            return cached()
+
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
 
 
-@st.cache_resource
+@_load_once
 def load_docs():
-    if not PINECONE_AVAILABLE:
+    if not HYBRID_AVAILABLE:
         return []
-    loader = CSVLoader(file_path=DATA_PATH, metadata_columns=["property_id"])
-    return loader.load()
+    from langchain_core.documents import Document
+
+    # doc_text is the CSVLoader page_content the indexes were built from
+    descriptions = get_dataset().doc_texts()
+    return [
+        Document(page_content=text, metadata={"property_id": pid})
+        for pid, text in zip(descriptions["property_id"], descriptions["doc_text"])
+    ]
 
 
-@st.cache_resource
+@_load_once
 def load_embeddings():
-    if not PINECONE_AVAILABLE:
+    if not HYBRID_AVAILABLE:
         return None
-    return HuggingFaceEmbeddings(
-        model_name="BAAI/bge-large-en-v1.5",
-        model_kwargs={"device": DEVICE},
-        encode_kwargs={"normalize_embeddings": True}
-    )
+    from embedding_backends import make_embeddings
+
+    # EMBEDDING_BACKEND: see embedding_backends.py
+    return make_embeddings()
+
+
+def _index_dimension() -> int:
+    if RETRIEVER_BACKEND == "local":
+        index = load_local_index()
+        if index is not None and len(index):
+            return int(index.dense.shape[1])
+    return INDEX_DIMENSION
 
 
-@st.cache_resource
+@_load_once
+def load_query_embeddings():
+    """
+    Dense encoder for hybrid queries, behind the query LRU: QUERY_EMBEDDING_MODEL
+    when set and its vectors fit the index, otherwise the document model.
+    """
+    if not HYBRID_AVAILABLE:
+        return None
+    from embedding_backends import QUERY_EMBEDDING_MODEL, CachedQueryEmbeddings, make_embeddings
+
+    embeddings = None
+    if QUERY_EMBEDDING_MODEL:
+        candidate = make_embeddings(model_name=QUERY_EMBEDDING_MODEL)
+        dimension, expected = len(candidate.embed_query("dimension check")), _index_dimension()
+        if dimension == expected:
+            embeddings = candidate
+        else:
+            print(f"[WARN] QUERY_EMBEDDING_MODEL {QUERY_EMBEDDING_MODEL} embeds into {dimension} dims, "
+                  f"the index has {expected}; using the document model for queries.")
+    return CachedQueryEmbeddings(embeddings or load_embeddings())
+
+
+@_load_once
+def load_query_sparse_encoder():
+    """The BM25 encoder with encode_queries behind the query LRU."""
+    if not HYBRID_AVAILABLE:
+        return None
+    from embedding_backends import CachedSparseEncoder
+
+    return CachedSparseEncoder(load_bm25())
+
+
+@_load_once
 def load_index():
     if not PINECONE_AVAILABLE:
         return None
+    from pinecone import Pinecone
+
     pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
     return pc.Index(INDEX_NAME)
 
 
-@st.cache_resource
+def index_manifest_dir() -> str:
+    """Directory where the active backend's index records its BM25 version."""
+    return LOCAL_INDEX_DIR if RETRIEVER_BACKEND == "local" else PINECONE_MANIFEST_DIR
+
+
+@_load_once
 def load_bm25():
-    if not PINECONE_AVAILABLE:
+    """
+    The BM25 encoder the index was encoded with (see bm25_store.py). The
+    artifact must match the version the index recorded; a missing or
+    mismatched artifact raises instead of refitting at query time. The only
+    fit here is for a local index that does not exist yet, which
+    `load_local_index` then builds with it.
+    """
+    if not HYBRID_AVAILABLE:
         return None
-    docs = load_docs()
-    corpus = [d.page_content for d in docs]
-    bm25 = BM25Encoder().default()
-    bm25.fit(corpus)
+    from bm25_store import BM25_DIR, fit_bm25, load_bm25_artifact, recorded_bm25_version, save_bm25
+
+    expected = recorded_bm25_version(index_manifest_dir())
+    artifact = load_bm25_artifact(BM25_DIR, expected)
+    if artifact is not None:
+        return artifact[0]
+    if RETRIEVER_BACKEND != "local" or expected is not None:
+        raise RuntimeError(
+            f"No BM25 artifact in {BM25_DIR} matches the {RETRIEVER_BACKEND} index "
+            f"(recorded version: {expected or 'none'} in {index_manifest_dir()}); "
+            f"run `python pinecone_add_document_retriever.py --target {RETRIEVER_BACKEND}` to re-sync it."
+        )
+
+    print(f"[INFO] Fitting BM25 for the new local index and saving it to {BM25_DIR} ...")
+    corpus = [d.page_content for d in load_docs()]
+    bm25 = fit_bm25(corpus)
+    save_bm25(bm25, corpus, BM25_DIR)
     return bm25
 
 
-@st.cache_resource
+def with_listing_metadata(docs):
+    """Doc metadata merged with the listing's filterable columns (joined on property_id)."""
+    from csv_agent import listing_metadata
+
+    by_id = {m["property_id"]: m for m in listing_metadata(get_dataset().listings)}
+    return [
+        {**by_id.get(str(d.metadata.get("property_id")), {}), **d.metadata}
+        for d in docs
+    ]
+
+
+@_load_once
+def load_local_index():
+    """Memory-map the local hybrid index, building and saving it on first use."""
+    if not HYBRID_AVAILABLE:
+        return None
+    from local_retriever import LocalHybridIndex
+    from ann_index import ANN_CANDIDATES, ANN_FILE, ANN_INDEX, load_or_build_ann
+    from bm25_store import BM25_DIR, read_manifest, record_bm25_version, recorded_bm25_version
+
+    bm25 = load_bm25()
+    bm25_version = (read_manifest(BM25_DIR) or {}).get("version")
+    if LocalHybridIndex.exists(LOCAL_INDEX_DIR) and recorded_bm25_version(LOCAL_INDEX_DIR) == bm25_version:
+        index = LocalHybridIndex.load(LOCAL_INDEX_DIR, mmap=True)
+    else:
+        # Missing, or its sparse vectors came from another BM25 fit
+        print(f"[INFO] Building local hybrid index in {LOCAL_INDEX_DIR} ...")
+        docs = load_docs()
+        index = LocalHybridIndex.build(
+            [d.page_content for d in docs],
+            load_embeddings(),
+            bm25,
+            ids=[str(d.metadata.get("property_id")) for d in docs],
+            metadatas=with_listing_metadata(docs),
+        )
+        index.save(LOCAL_INDEX_DIR)
+        record_bm25_version(LOCAL_INDEX_DIR, bm25_version)
+        # Row order may have changed: the ANN index is rebuilt from the new vectors
+        if os.path.exists(os.path.join(LOCAL_INDEX_DIR, ANN_FILE)):
+            os.remove(os.path.join(LOCAL_INDEX_DIR, ANN_FILE))
+
+    ann = load_or_build_ann(LOCAL_INDEX_DIR, index.dense, ANN_INDEX)
+    if ann is not None:
+        index.attach_ann(ann, ANN_CANDIDATES)
+    return index
+
+
+def _has_listing_keys(metadata) -> bool:
+    from csv_agent import ENUM_COLS, NUMERIC_COLS, TEXT_COLS
+
+    return bool(set(metadata or {}) & (NUMERIC_COLS | ENUM_COLS | TEXT_COLS | {"is_top_floor"}))
+
+
+@_load_once
+def index_has_listing_metadata() -> bool:
+    """
+    True when the index stores the listing columns metadata filters need
+    (probed once on a stored document). Indexes ingested before listing
+    metadata existed only carry `property_id`; a filtered query on them
+    matches nothing.
+    """
+    if RETRIEVER_BACKEND == "local":
+        index = load_local_index()
+        return index is not None and len(index) > 0 and _has_listing_keys(index.metadatas[0])
+    index = load_index()
+    if index is None:
+        return False
+    try:
+        ids = next(iter(index.list(limit=1)), [])
+        if not ids:
+            return False
+        vector = index.fetch(ids=list(ids)[:1]).vectors[list(ids)[0]]
+        return _has_listing_keys(getattr(vector, "metadata", None))
+    except Exception as e:
+        print(f"[WARN] Could not probe the Pinecone index metadata ({e!r}); hybrid search will not pre-filter.")
+        return False
+
+
+@_load_once
 def build_retriever():
+    if RETRIEVER_BACKEND == "local":
+        if not HYBRID_AVAILABLE:
+            return None
+        from local_retriever import LocalHybridSearchRetriever
+
+        index_has_listing_metadata()
+        return LocalHybridSearchRetriever(
+            embeddings=load_query_embeddings(),
+            sparse_encoder=load_query_sparse_encoder(),
+            index=load_local_index(),
+            alpha=HYBRID_ALPHA,
+            top_k=HYBRID_TOP_K,
+        )
+
     if not PINECONE_AVAILABLE:
         return None
-    embeddings = load_embeddings()
-    bm25 = load_bm25()
+    from langchain_community.retrievers import PineconeHybridSearchRetriever
+
+    embeddings = load_query_embeddings()
+    bm25 = load_query_sparse_encoder()
     index = load_index()
+    if not index_has_listing_metadata():
+        print("[WARN] Pinecone index has no listing metadata; re-run ingestion to enable metadata pre-filters.")
     retriever = PineconeHybridSearchRetriever(
         embeddings=embeddings,
         sparse_encoder=bm25,
         index=index,
-        alpha=0.5,
-        top_k=1000,
+        alpha=HYBRID_ALPHA,
+        top_k=HYBRID_TOP_K,
     )
     return retriever
 
 
+def _retrieve(query: str, retriever, metadata_filter=None, top_k=None):
+    """
+    Documents for `query`, best first (their metadata carries the hybrid
+    `score`). A filter that matches nothing gives no documents. On an index
+    without listing metadata the filter cannot be pushed down: the search
+    runs unfiltered with the full HYBRID_TOP_K and the caller's
+    intersection with the CSV result does the filtering.
+    """
+    if metadata_filter and not index_has_listing_metadata():
+        metadata_filter, top_k = None, HYBRID_TOP_K
+    if top_k is not None and top_k != retriever.top_k:
+        retriever = retriever.model_copy(update={"top_k": int(top_k)})
+
+    if metadata_filter:
+        return retriever.invoke(query, filter=metadata_filter)
+    return retriever.invoke(query)
+
+
+def hybrid_search_with_scores(query: str, retriever, metadata_filter=None, top_k=None):
+    """
+    {property_id: hybrid score} for `query`, best first. Hits without a
+    score get a rank-based one below every scored hit.
+    """
+    if not HYBRID_AVAILABLE or retriever is None:
+        return {}
+
+    scores = {}
+    results = _retrieve(query, retriever, metadata_filter, top_k)
+    floor = min((float(d.metadata["score"]) for d in results if d.metadata.get("score") is not None), default=0.0)
+    for rank, doc in enumerate(results):
+        pid = doc.metadata.get('property_id')
+        if not pid or str(pid) in scores:
+            continue
+        score = doc.metadata.get("score")
+        scores[str(pid)] = float(score) if score is not None else floor - (rank + 1) / (len(results) + 1)
+    return scores
+
+
 # hybrid_search.py
-def hybrid_search_in_property(query: str, retriever):
-    if not PINECONE_AVAILABLE or retriever is None:
+def hybrid_search_in_property(query: str, retriever, metadata_filter=None, top_k=None):
+    """
+    Property ids matching `query`. `metadata_filter` (see
+    `csv_agent.build_metadata_filter`) restricts the search to listings that
+    already pass the structured filters; `top_k` overrides the retriever's.
+    """
+    if not HYBRID_AVAILABLE or retriever is None:
         return []
-    
-    results = retriever.invoke(query)
+
+    results = _retrieve(query, retriever, metadata_filter, top_k)
 
     document_text = "\n".join(
         f"Chunk {i+1}: {doc.page_content}" for i, doc in enumerate(results)
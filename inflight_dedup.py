@@ -0,0 +1,62 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Set
+
+
+class InflightDeduplicator:
+    """
+    Shares one `run(item)` call among concurrent `submit`s with the same `key`.
+
+    The first submit of a key starts the call at once (nothing waits for
+    other requests); submits of that key while it is in flight await the
+    same result instead of starting another call. Once the call finishes,
+    succeeds or not, the key is free again, so nothing is cached here and a
+    retry is a new call. If the call is cancelled, its waiters fail instead
+    of waiting forever.
+
+    Bound to the event loop of its first `submit`, which suits a
+    long-lived server loop.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[Any], Awaitable[Any]],
+        key: Callable[[Any], Hashable] = lambda item: item,
+    ):
+        self.run = run
+        self.key = key
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {"items": 0, "deduplicated": 0, "calls": 0}
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        key = self.key(item)
+        self.stats["items"] += 1
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats["deduplicated"] += 1
+        else:
+            self.stats["calls"] += 1
+            future = loop.create_future()
+            self._inflight[key] = future
+            task = loop.create_task(self._dispatch(key, item, future))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        # Shielded: one caller giving up does not cancel the shared call
+        return await asyncio.shield(future)
+
+    async def _dispatch(self, key: Hashable, item: Any, future: asyncio.Future) -> None:
+        try:
+            try:
+                result = await self.run(item)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+        finally:
+            # Also on cancellation (or any BaseException): no waiter may hang
+            # and the key must be free for the next submit
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if not future.done():
+                future.set_exception(RuntimeError("Call was cancelled"))
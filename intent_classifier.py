@@ -0,0 +1,122 @@
+import os
+import re
+import zlib
+from typing import List
+
+from dotenv import load_dotenv
+
+from models import Intent, LocalIntent
+from rule_based_parser import PROPERTY_WORDS, _normalize, _words, parse_query
+
+load_dotenv()
+
+# ---------------------------
+# Config
+# ---------------------------
+# Greetings / farewells at or above this confidence get a templated reply
+# without any LLM call ("0" / "off" disables the local classifier)
+LOCAL_INTENT_ENABLED = os.getenv("LOCAL_INTENT_ENABLED", "1").strip().lower() not in {"0", "false", "no", "off"}
+LOCAL_INTENT_MIN_CONFIDENCE = float(os.getenv("LOCAL_INTENT_MIN_CONFIDENCE", "0.9"))
+
+# =========================
+# Vocabulary
+# =========================
+
+GREETING = (
+    r"\bh+i+\b|\bhey+a?\b|\bhel+o+\b|\bhiya\b|\bnamaste\b|\bhowdy\b|\bgreetings\b|\byo\b"
+    r"|\bgood (?:morning|afternoon|evening|day)\b|\bhow (?:are|r) (?:you|u)(?: doing)?\b"
+    r"|\bwhat'?s up\b|\bwass?up\b|\bsup\b"
+)
+FAREWELL = (
+    r"\bbye+\b|\bgood ?bye\b|\bgood ?night\b|\bsee (?:you|ya)(?: later| soon)?\b|\btake care\b"
+    r"|\bthank (?:you|u)\b|\bthanks?\b|\bthx\b|\bty\b|\bcheers\b|\bcya\b|\bciao\b"
+    r"|\bthat'?s (?:all|it)\b|\bhave a (?:good|nice|great) (?:day|one|evening)\b"
+)
+
+# Words that may surround a greeting / farewell without changing its intent
+CHITCHAT_FILLER = {
+    "there", "bot", "assistant", "advisor", "friend", "everyone", "all", "so", "much", "very",
+    "a", "lot", "again", "for", "your", "the", "help", "you", "u", "ok", "okay", "great", "nice",
+    "cool", "awesome", "and", "guys", "sir", "madam", "mam", "dear", "buddy", "s", "its", "it",
+    "that", "was", "helpful", "now", "then", "well",
+}
+
+# Real-estate vocabulary that marks a query as property related
+PROPERTY_HINTS = PROPERTY_WORDS | {
+    "villa", "villas", "plot", "plots", "penthouse", "studio", "bhk", "rent", "rental", "lease",
+    "buy", "sell", "sector", "society", "builder", "locality", "crore", "cr", "lakh", "lakhs",
+    "lac", "lacs", "sqft", "bedroom", "bedrooms", "bathroom", "balcony", "floor", "furnished",
+    "semifurnished", "unfurnished", "possession", "facing", "carpet", "metro", "amenities",
+}
+
+GREETING_REPLIES = [
+    "Hello! 👋 I'm your property advisor. Tell me what you're looking for — for example "
+    "\"3 BHK in Gurgaon under 2 Cr\" or \"east-facing flat near a metro station\".",
+    "Hi there! I can help you find a home. Share a city, budget, number of bedrooms or any "
+    "feature you care about and I'll look it up.",
+    "Hey! Looking for a flat or a house? Tell me your budget, preferred city and BHK and I'll "
+    "find matching properties.",
+]
+FAREWELL_REPLIES = [
+    "You're welcome! Come back any time you want to look at more properties. 🏡",
+    "Thanks for stopping by! Good luck with your home search — I'm here whenever you need me.",
+    "Glad I could help. Take care, and feel free to return for more property suggestions!",
+]
+
+
+def classify_intent(user_query: str) -> LocalIntent:
+    """
+    Keyword-rule intent of a message, without any LLM call:
+      - only greeting / farewell phrases (plus filler) -> Greeting / Farewell, confidence 1.0
+      - any property signal (rule-parser match or real-estate word) -> Property_Related,
+        confidence of the rule parser (at least 0.5)
+      - anything else -> Unknown, confidence 0.0 (ask the LLM)
+    """
+    text = _normalize(user_query or "")
+    greetings: List[str] = [m.group(0) for m in re.finditer(GREETING, text)]
+    farewells: List[str] = [m.group(0) for m in re.finditer(FAREWELL, text)]
+    rest = re.sub(FAREWELL, " ", re.sub(GREETING, " ", text))
+    leftover = [w for w in _words(rest) if w not in CHITCHAT_FILLER]
+
+    if (greetings or farewells) and not leftover:
+        label = "Farewell" if farewells else "Greeting"
+        return LocalIntent(label=label, confidence=1.0, matched=greetings + farewells)
+
+    words = set(_words(rest))
+    hints = sorted(words & PROPERTY_HINTS)
+    parsed = parse_query(rest)
+    if hints or parsed.confidence > 0:
+        confidence = max(parsed.confidence, 0.5 + 0.1 * min(len(hints), 4))
+        return LocalIntent(label="Property_Related", confidence=round(confidence, 3), matched=hints)
+    return LocalIntent(label="Unknown", confidence=0.0)
+
+
+def is_chitchat(local_intent: LocalIntent) -> bool:
+    """True when a greeting / farewell can be answered from a template."""
+    return (
+        LOCAL_INTENT_ENABLED
+        and local_intent.label in ("Greeting", "Farewell")
+        and local_intent.confidence >= LOCAL_INTENT_MIN_CONFIDENCE
+    )
+
+
+def is_property_likely(local_intent: LocalIntent) -> bool:
+    """True when extraction can start before the LLM intent call returns."""
+    return not LOCAL_INTENT_ENABLED or local_intent.label == "Property_Related"
+
+
+def templated_response(label: str, user_query: str = "") -> str:
+    """Canned reply for a Greeting / Farewell (varied, but stable per message)."""
+    replies = FAREWELL_REPLIES if label == "Farewell" else GREETING_REPLIES
+    return replies[zlib.crc32(user_query.encode("utf-8")) % len(replies)]
+
+
+def chitchat_label(intent: Intent) -> str:
+    """"Greeting" / "Farewell" when an LLM `Intent` is pure chit-chat, else ""."""
+    if getattr(intent, "Property_Related", False) or getattr(intent, "Other", False):
+        return ""
+    if getattr(intent, "Farewell", False):
+        return "Farewell"
+    if getattr(intent, "Greeting", False):
+        return "Greeting"
+    return ""
@@ -1,25 +1,51 @@
-from llm_models import get_llama_model, initialize_models
+from llm_models import get_llama_model, initialize_models, ainvoke_limited, LLAMA_MODEL_NAME
 from parser_and_prompts import intent_prompt,intent_response_prompt
 from parser_and_prompts import intent_parser
+from llm_cache import cached_call, acached_call
+from streaming_parser import arun_chain
+from models import Intent
 
 def find_intent(user_query):
-    # Initialize models if not already done
-    initialize_models()
-    llama_model = get_llama_model()
-    intent_chain=intent_prompt|llama_model|intent_parser
-    intent=intent_chain.invoke({'user_query':user_query})
+    def _invoke():
+        # Initialize models if not already done
+        initialize_models()
+        llama_model = get_llama_model()
+        intent_chain=intent_prompt|llama_model|intent_parser
+        return intent_chain.invoke({'user_query':user_query})
+
+    intent=cached_call(intent_prompt, LLAMA_MODEL_NAME, user_query, _invoke, Intent)
     return intent
 
 
 def intent_response_agent(user_query):
-    # Initialize models if not already done
-    initialize_models()
-    llama_model = get_llama_model()
-    intent_response_chain=intent_response_prompt|llama_model
-    result=intent_response_chain.invoke(user_query).content
+    def _invoke():
+        # Initialize models if not already done
+        initialize_models()
+        llama_model = get_llama_model()
+        intent_response_chain=intent_response_prompt|llama_model
+        return intent_response_chain.invoke(user_query).content
+
+    result=cached_call(intent_response_prompt, LLAMA_MODEL_NAME, user_query, _invoke)
     return result
 
+
+async def afind_intent(user_query):
+    async def _ainvoke():
+        llama_model = get_llama_model()
+        return await arun_chain("groq", intent_prompt, llama_model, {'user_query':user_query}, intent_parser, "intent")
+
+    return await acached_call(intent_prompt, LLAMA_MODEL_NAME, user_query, _ainvoke, Intent)
+
+
+async def aintent_response_agent(user_query):
+    async def _ainvoke():
+        llama_model = get_llama_model()
+        intent_response_chain=intent_response_prompt|llama_model
+        return (await ainvoke_limited("groq", intent_response_chain, user_query, "intent_response")).content
+
+    return await acached_call(intent_response_prompt, LLAMA_MODEL_NAME, user_query, _ainvoke)
+
 # print(find_intent(input("Enter the query")))
 
      
-     
\ No newline at end of file
+     
@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional, Type
+
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+from telemetry import record_cache
+
+load_dotenv()
+
+# ---------------------------
+# Config
+# ---------------------------
+CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1").strip().lower() not in {"0", "false", "no"}
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite"))
+CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+# Expiry and LRU eviction run once per this many writes, not on every write
+CACHE_EVICT_EVERY = int(os.getenv("LLM_CACHE_EVICT_EVERY", "64"))
+
+
+def normalize_query(user_query: Any) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation."""
+    text = re.sub(r"\s+", " ", str(user_query or "")).strip().casefold()
+    return text.rstrip(" .!?")
+
+
+def prompt_hash(prompt: Any) -> str:
+    """Hash of a PromptTemplate's text and partials (format instructions included)."""
+    template = getattr(prompt, "template", str(prompt))
+    partials = getattr(prompt, "partial_variables", {}) or {}
+    payload = json.dumps(
+        {"template": template, "partials": {k: str(v) for k, v in sorted(partials.items())}},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def make_key(prompt: Any, model_name: str, user_query: Any) -> str:
+    raw = "\x1f".join([prompt_hash(prompt), model_name, normalize_query(user_query)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    On-disk SQLite store of parsed LLM results with TTL expiry and
+    LRU eviction (by last access time) once `max_entries` is exceeded.
+    Eviction runs every `evict_every` writes, so the table may briefly
+    hold up to `evict_every - 1` entries over the limit.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int, evict_every: int = CACHE_EVICT_EVERY):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.evict_every = max(1, evict_every)
+        self._writes = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache(created_at)")
+        with self._lock:
+            self._evict()
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload, created_at = row
+            if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(payload)
+
+    def set(self, key: str, payload: dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, payload, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(payload), now, now),
+            )
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict()
+
+    def _evict(self) -> None:
+        if self.ttl_seconds > 0:
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Process-wide cache instance, opened on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache(CACHE_PATH, CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES)
+    return _cache
+
+
+def _encode(result: Any) -> dict:
+    if isinstance(result, BaseModel):
+        return {"kind": "model", "data": result.model_dump(mode="json")}
+    return {"kind": "text", "data": result}
+
+
+def _decode(payload: dict, model_cls: Optional[Type[BaseModel]]) -> Any:
+    if payload.get("kind") == "model" and model_cls is not None:
+        return model_cls.model_validate(payload["data"])
+    return payload.get("data")
+
+
+def cached_call(
+    prompt: Any,
+    model_name: str,
+    user_query: Any,
+    compute: Callable[[], Any],
+    model_cls: Optional[Type[BaseModel]] = None,
+) -> Any:
+    """
+    Return the cached result for (prompt, model, normalized query) or run
+    `compute()` and store it. Pydantic results are rebuilt as `model_cls`.
+    Cache failures never break the call; they just fall through to the LLM.
+    """
+    if not CACHE_ENABLED:
+        return compute()
+
+    key = make_key(prompt, model_name, user_query)
+    hit = _read(key, model_cls)
+    record_cache("llm", model_cls.__name__ if model_cls is not None else "text", hit is not None)
+    if hit is not None:
+        return hit
+
+    result = compute()
+    _write(key, result)
+    return result
+
+
+async def acached_call(
+    prompt: Any,
+    model_name: str,
+    user_query: Any,
+    acompute: Callable[[], Awaitable[Any]],
+    model_cls: Optional[Type[BaseModel]] = None,
+) -> Any:
+    """Async counterpart of `cached_call` for chains run with `ainvoke`."""
+    if not CACHE_ENABLED:
+        return await acompute()
+
+    key = make_key(prompt, model_name, user_query)
+    # SQLite is blocking: keep it off the (shared) event loop
+    hit = await asyncio.to_thread(_read, key, model_cls)
+    record_cache("llm", model_cls.__name__ if model_cls is not None else "text", hit is not None)
+    if hit is not None:
+        return hit
+
+    result = await acompute()
+    await asyncio.to_thread(_write, key, result)
+    return result
+
+
+def _read(key: str, model_cls: Optional[Type[BaseModel]]) -> Any:
+    try:
+        payload = get_llm_cache().get(key)
+        if payload is not None:
+            return _decode(payload, model_cls)
+    except Exception as e:
+        print(f"[WARN] LLM cache read failed: {e!r}")
+    return None
+
+
+def _write(key: str, result: Any) -> None:
+    try:
+        get_llm_cache().set(key, _encode(result))
+    except Exception as e:
+        print(f"[WARN] LLM cache write failed: {e!r}")
@@ -1,6 +1,17 @@
 from langchain_groq import ChatGroq
 from dotenv import load_dotenv
+import asyncio
+import collections
+import hashlib
 import os
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+from langchain_core.language_models import BaseLanguageModel
+
+from telemetry import TokenUsageCallback, llm_span, model_label, record_tokens
 
 # Optional import for Mistral
 try:
@@ -11,25 +22,246 @@ except ImportError:
 
 load_dotenv()
 
-def get_deepseek_model():
-    """Get deepseek model with proper API key handling"""
+DEEPSEEK_MODEL_NAME = "deepseek-r1-distill-llama-70b"
+LLAMA_MODEL_NAME = "llama-3.3-70b-versatile"
+MISTRAL_MODEL_NAME = "open-mixtral-8x7b"
+
+# Connection pool shared by every Groq client
+HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("LLM_HTTP_TIMEOUT_SECONDS", "60"))
+
+# Max in-flight async requests per provider (per process, across event loops)
+PROVIDER_MAX_CONCURRENCY = {
+    "groq": int(os.getenv("GROQ_MAX_CONCURRENCY", "16")),
+    "mistral": int(os.getenv("MISTRAL_MAX_CONCURRENCY", "4")),
+}
+
+# ---------------------------
+# Model registry
+# ---------------------------
+# One client per (provider, model, api key). A key entered in the Streamlit
+# sidebar lands in os.environ; the next lookup sees a new key, builds a new
+# client and drops the stale one, so no restart is needed.
+_registry: Dict[Tuple[str, str, str], Any] = {}
+_registry_lock = threading.RLock()
+_http_client = None
+
+# Async connections belong to the event loop that opened them, so clients
+# created inside a running loop (with their own pooled httpx.AsyncClient)
+# are kept per loop. Long-lived loops (background_loop.py, the API server)
+# reuse them for every query; whoever owns a loop closes them with
+# `aclose_loop_clients()` before the loop ends.
+_loop_state: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+_limiters: Dict[str, "ProviderLimiter"] = {}
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _state_for_loop(loop: asyncio.AbstractEventLoop) -> Dict[str, Any]:
+    with _registry_lock:
+        state = _loop_state.get(loop)
+        if state is None:
+            state = {
+                "clients": {},
+                "http": httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                    ),
+                    timeout=httpx.Timeout(HTTP_TIMEOUT_SECONDS, connect=10.0),
+                ),
+            }
+            _loop_state[loop] = state
+        return state
+
+
+async def aclose_loop_clients() -> None:
+    """Close the running loop's pooled async HTTP client and drop its LLM clients."""
+    loop = asyncio.get_running_loop()
+    with _registry_lock:
+        state = _loop_state.pop(loop, None)
+    if state is not None:
+        await state["http"].aclose()
+
+
+class ProviderLimiter:
+    """
+    Async semaphore shared by every event loop of the process (Streamlit
+    sessions, worker threads), so the provider bound holds process-wide.
+    A released slot is handed directly to the oldest waiter on a running
+    loop; waiters on a stopped loop are told to queue again if it resumes.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self._in_use = 0
+        self._lock = threading.Lock()
+        self._waiters: "collections.deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]" = collections.deque()
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._in_use < self.limit and not self._waiters:
+                    self._in_use += 1
+                    return
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+            try:
+                granted = await waiter[1]
+            except asyncio.CancelledError:
+                with self._lock:
+                    queued = waiter in self._waiters
+                    if queued:
+                        self._waiters.remove(waiter)
+                future = waiter[1]
+                if not queued and future.done() and not future.cancelled() and future.result():
+                    # The slot was handed over just before the cancellation
+                    self.release()
+                raise
+            if granted:
+                return
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                if not loop.is_running():
+                    # A stopped loop would never run the hand-over and the slot would leak
+                    try:
+                        loop.call_soon_threadsafe(self._wake, future, False)
+                    except RuntimeError:
+                        pass  # that loop is closed
+                    continue
+                try:
+                    loop.call_soon_threadsafe(self._hand_over, future)
+                    return
+                except RuntimeError:
+                    continue  # closed since the check
+            self._in_use -= 1
+
+    def _hand_over(self, future: asyncio.Future) -> None:
+        if future.done():
+            # Cancelled while the slot was in transit: pass it on
+            self.release()
+        else:
+            future.set_result(True)
+
+    @staticmethod
+    def _wake(future: asyncio.Future, granted: bool) -> None:
+        if not future.done():
+            future.set_result(granted)
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    async def __aenter__(self) -> "ProviderLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+
+def provider_limiter(provider: str) -> ProviderLimiter:
+    """Process-wide limiter bounding concurrent requests to `provider`."""
+    with _registry_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = _limiters[provider] = ProviderLimiter(PROVIDER_MAX_CONCURRENCY.get(provider, 8))
+        return limiter
+
+
+async def ainvoke_limited(provider: str, chain, inputs, stage: str = "llm"):
+    """
+    `chain.ainvoke(inputs)` under the provider's concurrency limit, traced as
+    span `llm.<stage>` with the call's token usage.
+    """
+    model = model_label(next((step for step in getattr(chain, "steps", [chain]) if isinstance(step, BaseLanguageModel)), chain))
+    with llm_span(stage, model, provider):
+        usage = TokenUsageCallback()
+        async with provider_limiter(provider):
+            result = await chain.ainvoke(inputs, config={"callbacks": [usage]})
+        record_tokens(stage, model, usage.usage)
+        return result
+
+
+def _shared_http_client() -> httpx.Client:
+    """Pooled keep-alive HTTP client reused across all Groq models."""
+    global _http_client
+    with _registry_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                ),
+                timeout=httpx.Timeout(HTTP_TIMEOUT_SECONDS, connect=10.0),
+            )
+        return _http_client
+
+
+def _key_fingerprint(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def _get_or_build(provider: str, model_name: str, api_key: str, build: Callable[[Optional[Dict[str, Any]]], Any]) -> Any:
+    key = (provider, model_name, _key_fingerprint(api_key))
+    loop = _running_loop()
+    state = _state_for_loop(loop) if loop is not None else None
+    registry = state["clients"] if state is not None else _registry
+    client = registry.get(key)
+    if client is not None:
+        return client
+    with _registry_lock:
+        client = registry.get(key)
+        if client is None:
+            for stale in [k for k in registry if k[:2] == key[:2]]:
+                del registry[stale]
+            client = build(state)
+            registry[key] = client
+        return client
+
+
+def reset_models():
+    """Drop every cached client (they are rebuilt on next use)."""
+    with _registry_lock:
+        _registry.clear()
+        for state in list(_loop_state.values()):
+            state["clients"].clear()
+
+
+def _get_groq_model(model_name: str):
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
         raise ValueError("GROQ_API_KEY environment variable is required")
-    return ChatGroq(
-        model="deepseek-r1-distill-llama-70b",  
-        api_key=api_key
+    return _get_or_build(
+        "groq",
+        model_name,
+        api_key,
+        lambda state: ChatGroq(
+            model=model_name,
+            api_key=api_key,
+            http_client=_shared_http_client(),
+            http_async_client=state["http"] if state is not None else None,
+        ),
     )
 
+
+def get_deepseek_model():
+    """Get deepseek model with proper API key handling"""
+    return _get_groq_model(DEEPSEEK_MODEL_NAME)
+
 def get_llama_model():
     """Get llama model with proper API key handling"""
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        raise ValueError("GROQ_API_KEY environment variable is required")
-    return ChatGroq(
-        model="llama-3.3-70b-versatile",
-        api_key=api_key
-    )
+    return _get_groq_model(LLAMA_MODEL_NAME)
 
 def get_mistral_model():
     """Get mistral model with proper API key handling"""
@@ -38,7 +270,12 @@ def get_mistral_model():
     api_key = os.getenv("MISTRAL_API_KEY")
     if not api_key:
         raise ValueError("MISTRAL_API_KEY environment variable is required")
-    return ChatMistralAI(model="open-mixtral-8x7b", api_key=api_key)
+    return _get_or_build(
+        "mistral",
+        MISTRAL_MODEL_NAME,
+        api_key,
+        lambda state: ChatMistralAI(model=MISTRAL_MODEL_NAME, api_key=api_key),
+    )
 
 # Initialize models lazily
 deepseek_model = None
@@ -46,7 +283,7 @@ llama_model = None
 model = None
 
 def initialize_models():
-    """Initialize all models when needed"""
+    """Initialize all models when needed (registry lookups; cheap after the first call)"""
     global deepseek_model, llama_model, model
     try:
         deepseek_model = get_deepseek_model()
@@ -60,4 +297,4 @@ def initialize_models():
         llama_model = None
         model = None
 
-# print(model.invoke("hello"))
\ No newline at end of file
+# print(model.invoke("hello"))
@@ -0,0 +1,336 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LocalHybridIndex:
+    """
+    In-process replacement for the Pinecone hybrid index.
+
+    Holds a (N x D) float32 matrix of normalized dense embeddings, the
+    BM25 document vectors in doc-major CSR form, and a term-major inverted
+    index derived from them. Scores follow Pinecone's dotproduct metric on
+    convex-scaled vectors: alpha * dense + (1 - alpha) * sparse.
+    """
+
+    def __init__(
+        self,
+        dense: np.ndarray,
+        sparse_indptr: np.ndarray,
+        sparse_indices: np.ndarray,
+        sparse_values: np.ndarray,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+    ):
+        self.dense = dense
+        self.sparse_indptr = sparse_indptr
+        self.sparse_indices = sparse_indices
+        self.sparse_values = sparse_values
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.ann = None
+        self.ann_candidates = 0
+        self._meta_columns: Dict[str, np.ndarray] = {}
+        self._build_postings()
+
+    def attach_ann(self, ann: Any, candidates: int) -> None:
+        """
+        Use an `ann_index.AnnIndex` for the dense side: only its top
+        `candidates` rows plus rows with a BM25 match are scored.
+        """
+        self.ann = ann
+        self.ann_candidates = candidates
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ---------- construction ----------
+    @classmethod
+    def from_vectors(
+        cls,
+        dense: List[List[float]],
+        sparse: List[Dict[str, List]],
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+    ) -> "LocalHybridIndex":
+        lengths = [len(s["indices"]) for s in sparse]
+        indptr = np.zeros(len(sparse) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = np.fromiter((i for s in sparse for i in s["indices"]), dtype=np.int64, count=int(indptr[-1]))
+        values = np.fromiter((v for s in sparse for v in s["values"]), dtype=np.float32, count=int(indptr[-1]))
+        matrix = np.asarray(dense, dtype=np.float32).reshape(len(ids), -1)
+        return cls(matrix, indptr, indices, values, list(ids), list(texts), list(metadatas))
+
+    @classmethod
+    def build(
+        cls,
+        texts: List[str],
+        embeddings: Embeddings,
+        sparse_encoder: Any,
+        ids: Optional[List[str]] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        batch_size: int = 64,
+    ) -> "LocalHybridIndex":
+        """Embed and BM25-encode `texts` in batches."""
+        ids = ids or [_hash_text(t) for t in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        dense: List[List[float]] = []
+        sparse: List[Dict[str, List]] = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            dense.extend(embeddings.embed_documents(batch))
+            sparse.extend(sparse_encoder.encode_documents(batch))
+        return cls.from_vectors(dense, sparse, ids, texts, metadatas)
+
+    def merged(self, other: "LocalHybridIndex") -> "LocalHybridIndex":
+        """New index with `other`'s rows appended."""
+        offset = self.sparse_indptr[-1]
+        return LocalHybridIndex(
+            np.vstack([np.asarray(self.dense), np.asarray(other.dense)]),
+            np.concatenate([self.sparse_indptr, other.sparse_indptr[1:] + offset]),
+            np.concatenate([self.sparse_indices, other.sparse_indices]),
+            np.concatenate([self.sparse_values, other.sparse_values]),
+            self.ids + other.ids,
+            self.texts + other.texts,
+            self.metadatas + other.metadatas,
+        )
+
+    def without(self, ids: Iterable[str]) -> "LocalHybridIndex":
+        """New index without the rows whose id is in `ids`."""
+        drop = set(ids)
+        rows = np.array([i for i, pid in enumerate(self.ids) if pid not in drop], dtype=np.int64)
+        starts, ends = self.sparse_indptr[rows], self.sparse_indptr[rows + 1]
+        lengths = ends - starts
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        # Gather each kept row's [start, end) slice of the CSR arrays
+        entries = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+        return LocalHybridIndex(
+            np.asarray(self.dense)[rows],
+            indptr,
+            self.sparse_indices[entries],
+            self.sparse_values[entries],
+            [self.ids[i] for i in rows],
+            [self.texts[i] for i in rows],
+            [self.metadatas[i] for i in rows],
+        )
+
+    def _build_postings(self) -> None:
+        doc_of_entry = np.repeat(
+            np.arange(len(self.sparse_indptr) - 1, dtype=np.int64),
+            np.diff(self.sparse_indptr),
+        )
+        order = np.argsort(self.sparse_indices, kind="stable")
+        terms = self.sparse_indices[order]
+        self._post_docs = doc_of_entry[order]
+        self._post_values = self.sparse_values[order]
+        self._terms, self._term_starts = np.unique(terms, return_index=True)
+        self._term_ends = np.append(self._term_starts[1:], len(terms))
+
+    # ---------- persistence ----------
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "dense.npy"), np.ascontiguousarray(self.dense, dtype=np.float32))
+        np.save(os.path.join(directory, "sparse_indptr.npy"), self.sparse_indptr)
+        np.save(os.path.join(directory, "sparse_indices.npy"), self.sparse_indices)
+        np.save(os.path.join(directory, "sparse_values.npy"), self.sparse_values)
+        with open(os.path.join(directory, "docs.json"), "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "texts": self.texts, "metadatas": self.metadatas}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "LocalHybridIndex":
+        mode = "r" if mmap else None
+        with open(os.path.join(directory, "docs.json"), "r", encoding="utf-8") as f:
+            docs = json.load(f)
+        return cls(
+            np.load(os.path.join(directory, "dense.npy"), mmap_mode=mode),
+            np.load(os.path.join(directory, "sparse_indptr.npy")),
+            np.load(os.path.join(directory, "sparse_indices.npy")),
+            np.load(os.path.join(directory, "sparse_values.npy")),
+            docs["ids"],
+            docs["texts"],
+            docs["metadatas"],
+        )
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return all(
+            os.path.exists(os.path.join(directory, name))
+            for name in ("dense.npy", "sparse_indptr.npy", "sparse_indices.npy", "sparse_values.npy", "docs.json")
+        )
+
+    # ---------- metadata filters ----------
+    def _column(self, key: str) -> np.ndarray:
+        column = self._meta_columns.get(key)
+        if column is None:
+            values = [meta.get(key) for meta in self.metadatas]
+            if all(v is None or isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+                column = np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+            else:
+                column = np.array(values, dtype=object)
+            self._meta_columns[key] = column
+        return column
+
+    def filter_mask(self, metadata_filter: Dict[str, Any]) -> np.ndarray:
+        """Boolean row mask for a Pinecone-style filter ($eq, $ne, $gt(e), $lt(e), $in, $nin, $and, $or)."""
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key, condition in metadata_filter.items():
+            if key == "$and":
+                for sub in condition:
+                    mask &= self.filter_mask(sub)
+                continue
+            if key == "$or":
+                any_mask = np.zeros(len(self.ids), dtype=bool)
+                for sub in condition:
+                    any_mask |= self.filter_mask(sub)
+                mask &= any_mask
+                continue
+            column = self._column(key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, value in condition.items():
+                if op == "$eq":
+                    mask &= column == value
+                elif op == "$ne":
+                    mask &= column != value
+                elif op == "$gt":
+                    mask &= column > value
+                elif op == "$gte":
+                    mask &= column >= value
+                elif op == "$lt":
+                    mask &= column < value
+                elif op == "$lte":
+                    mask &= column <= value
+                elif op == "$in":
+                    mask &= np.isin(column, list(value))
+                elif op == "$nin":
+                    mask &= ~np.isin(column, list(value))
+                else:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+        return mask
+
+    # ---------- scoring ----------
+    def dense_scores(self, query_vector: List[float]) -> np.ndarray:
+        return self.dense @ np.asarray(query_vector, dtype=np.float32)
+
+    def sparse_scores(self, indices: List[int], values: List[float]) -> np.ndarray:
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        if len(self._terms) == 0:
+            return scores
+        for term, weight in zip(indices, values):
+            pos = int(np.searchsorted(self._terms, term))
+            if pos < len(self._terms) and self._terms[pos] == term:
+                start, end = self._term_starts[pos], self._term_ends[pos]
+                scores[self._post_docs[start:end]] += np.float32(weight) * self._post_values[start:end]
+        return scores
+
+    def hybrid_scores(
+        self,
+        query_vector: List[float],
+        query_sparse: Dict[str, List],
+        alpha: float,
+        mask: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Fused score per row; -inf for rows excluded by `mask` or not
+        considered by the ANN path. Masked rows are never scored.
+        """
+        sparse = self.sparse_scores(query_sparse.get("indices", []), query_sparse.get("values", []))
+        query = np.asarray(query_vector, dtype=np.float32)
+
+        if mask is not None and (self.ann is None or np.count_nonzero(mask) <= self.ann_candidates):
+            # Pre-filter: exact scores over the allowed rows only
+            rows = np.flatnonzero(mask)
+        elif self.ann is None:
+            dense = self.dense_scores(query_vector)
+            return alpha * dense + (1.0 - alpha) * sparse
+        else:
+            _, candidates = self.ann.search(query, self.ann_candidates)
+            rows = np.union1d(candidates, np.flatnonzero(sparse))
+            if mask is not None:
+                rows = rows[mask[rows]]
+
+        scores = np.full(len(self.ids), -np.inf, dtype=np.float32)
+        # Exact dense scores for the candidate rows only
+        scores[rows] = alpha * (np.asarray(self.dense[rows]) @ query) + (1.0 - alpha) * sparse[rows]
+        return scores
+
+    def top_k(self, scores: np.ndarray, k: int) -> np.ndarray:
+        """Row positions of the `k` best scores, best first."""
+        k = min(k, int(np.count_nonzero(np.isfinite(scores))))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        part = np.argpartition(-scores, k - 1)[:k]
+        return part[np.argsort(-scores[part], kind="stable")]
+
+
+class LocalHybridSearchRetriever(BaseRetriever):
+    """Same interface as `PineconeHybridSearchRetriever`, scored in-process."""
+
+    embeddings: Embeddings
+    """Embeddings model to use."""
+    sparse_encoder: Any = None
+    """Sparse encoder to use (BM25Encoder)."""
+    index: Any = None
+    """LocalHybridIndex to search."""
+    top_k: int = 4
+    """Number of documents to return."""
+    alpha: float = 0.5
+    """Weight of dense vs sparse scores (1.0 = dense only)."""
+    text_key: str = "context"
+
+    model_config = ConfigDict(arbitrary_types_allowed=True, extra="forbid")
+
+    def add_texts(
+        self,
+        texts: List[str],
+        ids: Optional[List[str]] = None,
+        metadatas: Optional[List[dict]] = None,
+    ) -> None:
+        """Rebuild the in-memory index with `texts` appended."""
+        new = LocalHybridIndex.build(texts, self.embeddings, self.sparse_encoder, ids, metadatas)
+        if self.index is None or len(self.index) == 0:
+            self.index = new
+            return
+        old = self.index
+        merged = old.merged(new)
+        if old.ann is not None:
+            old.ann.add(new.dense, np.arange(len(old), len(merged), dtype=np.int64))
+            merged.attach_ann(old.ann, old.ann_candidates)
+        self.index = merged
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs: Any
+    ) -> List[Document]:
+        if self.index is None or len(self.index) == 0:
+            return []
+        metadata_filter = kwargs.get("filter")
+        mask = self.index.filter_mask(metadata_filter) if metadata_filter else None
+        if mask is not None and not mask.any():
+            return []
+        sparse_vec = self.sparse_encoder.encode_queries(query)
+        dense_vec = self.embeddings.embed_query(query)
+        scores = self.index.hybrid_scores(dense_vec, sparse_vec, self.alpha, mask)
+        top_k = int(kwargs.get("top_k", self.top_k))
+
+        final_result = []
+        for row in self.index.top_k(scores, top_k):
+            metadata = dict(self.index.metadatas[row])
+            metadata["score"] = float(scores[row])
+            final_result.append(Document(page_content=self.index.texts[row], metadata=metadata))
+        return final_result
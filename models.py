@@ -128,4 +128,25 @@ class ApplyFilterToColumn(BaseModel):
 class YesNoResults(BaseModel):
     decisions: List[Literal["Yes", "No"]] = Field(
         ..., description="List of Yes/No values, one for each chunk in order."
-    )
\ No newline at end of file
+    )
+
+class CombinedExtraction(BaseModel):
+    intent: Intent = Field(..., description="Intent of the user query; exactly one flag must be true")
+    fields: FieldToSearch = Field(..., description="Which property fields the user query mentions")
+    search_data: SearchData = Field(..., description="Structured search values extracted from the user query")
+    filter_on_columns: ApplyFilterToColumn = Field(..., description="Greater than / Lesser than comparators for numeric fields")
+    hybrid_query: str = Field(..., description="Query reformed to only nearby locations, features, furnishing and description, or No_User_Query")
+
+
+class RuleBasedParse(BaseModel):
+    fields: FieldToSearch = Field(..., description="Fields the rules found in the user query")
+    search_data: SearchData = Field(..., description="Search values filled directly by the rules")
+    filter_on_columns: ApplyFilterToColumn = Field(..., description="Comparators filled directly by the rules")
+    leftover: List[str] = Field(default_factory=list, description="Meaningful words no rule could account for")
+    confidence: float = Field(..., description="Share of meaningful words explained by the rules (0 to 1)")
+
+
+class LocalIntent(BaseModel):
+    label: Literal["Greeting", "Farewell", "Property_Related", "Unknown"] = Field(..., description="Intent the local rules settled on")
+    confidence: float = Field(..., description="How sure the rules are (0 to 1)")
+    matched: List[str] = Field(default_factory=list, description="Phrases the rules recognized")
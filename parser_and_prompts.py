@@ -1,6 +1,6 @@
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
-from models import Intent,FieldToSearch,SearchData,ApplyFilterToColumn,YesNoResults
+from models import Intent,FieldToSearch,SearchData,ApplyFilterToColumn,YesNoResults,CombinedExtraction
 
 
 
@@ -9,6 +9,7 @@ intent_parser=PydanticOutputParser(pydantic_object=Intent)
 field_to_set_parser=PydanticOutputParser(pydantic_object=FieldToSearch) 
 filter_column_parser=PydanticOutputParser(pydantic_object=ApplyFilterToColumn)
 yes_no_parser = PydanticOutputParser(pydantic_object=YesNoResults)
+combined_parser = PydanticOutputParser(pydantic_object=CombinedExtraction)
 
 
 intent_prompt = PromptTemplate(
@@ -304,4 +305,48 @@ Document Chunks:
 """.strip(),
     input_variables=["user_query", "document_text"],
     partial_variables={"format_instructions": yes_no_parser.get_format_instructions()},
-)
\ No newline at end of file
+)
+
+
+combined_extraction_prompt = PromptTemplate(
+    template="""
+You are a real estate query analyst. In a single pass, analyse the user query and return ALL of the following sections as one JSON object.
+
+1. intent -- whether the query is a Greeting, Property_Related, Farewell, or Other.
+   - Only one of these should be True. The rest must be False.
+
+2. fields -- whether each predefined property field is explicitly mentioned or strongly implied in the query.
+   - Mark a field as `true` only if the user is clearly asking about it.
+   - For additionalRoom make it true only when the query involves store/study/servant/pooja room or their combination.
+   - top_floor is true only when the query is about the top floor; floorNum and Totalfloor must then be false.
+
+3. search_data -- the structured search values.
+   - Always take numeric values exactly as stated; do not infer, calculate or transform them (except words like "two" -> 2).
+   - Ignore comparative words like "more than", "less than", "above", "under" when extracting the value.
+     Example: "more than one balcony" -> balcony = 1
+   - City can only be Bangalore, Pathankot, Gurgaon, Delhi.
+   - Society, colony, sector or residency names go to colony_or_sector in lower case.
+   - Leave every field that is not mentioned as null.
+
+4. filter_on_columns -- for numeric fields only, "Greater than" or "Lesser than" when the query asks for a
+   comparison (more than, less than, above, under, in my budget); otherwise null. Never use numbers here.
+
+5. hybrid_query -- the query reformed into a single line that focuses ONLY on nearby locations, features
+   (e.g. Fire Alarm, Swimming Pool, Park, Lift), furnishing details (e.g. Wardrobe, Modular Kitchen, ACs) and
+   the general description of the flat.
+   - Do not include price, area, area type, address, floor, BHK, bedrooms, bathrooms, balconies, additional
+     rooms, facing, sector, society, city or country.
+   - Only use information present in the query; do not add anything.
+   - If nothing relevant remains, use exactly "No_User_Query".
+   Examples:
+   - "Looking for a 3BHK flat near a school with swimming pool and lift" -> "A flat near a school with swimming pool and lift."
+   - "I want a 1BHK flat under 5 crore on 2nd floor" -> "No_User_Query"
+
+User Query: "{user_query}"
+
+Return the output strictly in this format, with no explanation or text outside the JSON:
+{format_instructions}
+""",
+    input_variables=["user_query"],
+    partial_variables={"format_instructions": combined_parser.get_format_instructions()},
+)
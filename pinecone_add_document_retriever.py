@@ -1,51 +1,352 @@
+"""
+Incremental ingestion of the property descriptions into the hybrid index.
+
+Every described property is hashed by `property_id` (one hash for the
+embedded text, one for its listing metadata) and compared with the state
+file of the previous run:
+  - new ids and ids whose text changed are embedded (dense + BM25) in
+    `--embed-chunk` calls (by default large enough for the CPU backend's
+    worker pool), then upserted in `--batch-size` batches of parallel
+    `--upsert-chunk` requests
+  - ids whose metadata alone changed only get their metadata updated
+  - ids that disappeared from the dataset are deleted
+The state file is checkpointed every `--checkpoint-every` batches, so an
+interrupted run resumes where it stopped: re-running skips every row whose
+hashes were already recorded.
+
+The BM25 encoder is frozen: its saved artifact (bm25_store.py) is reused so
+unchanged rows keep valid sparse vectors. `--refit-bm25` fits a new one on
+the current corpus, which re-encodes every row. The artifact version is
+recorded next to the index (LOCAL_INDEX_DIR, or PINECONE_MANIFEST_DIR for
+Pinecone) and query time refuses any other artifact.
+
+    python pinecone_add_document_retriever.py [--target pinecone|local]
+        [--batch-size 64] [--embed-chunk 0] [--upsert-chunk 100] [--workers 4]
+        [--checkpoint-every 20] [--refit-bm25] [--reset] [--dry-run]
+        [--embedding-backend default|cpu|onnx]
+"""
+
+import argparse
+import hashlib
+import json
 import os
-from langchain_community.document_loaders import CSVLoader
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
 from dotenv import load_dotenv
-from pinecone import Pinecone,ServerlessSpec
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
-from langchain_community.retrievers import PineconeHybridSearchRetriever
-from pinecone_text.sparse import BM25Encoder
+
+from bm25_store import BM25_DIR, fit_bm25, load_bm25_artifact, record_bm25_version, save_bm25
+from csv_agent import listing_metadata
+from dataset_store import get_dataset
+from hybrid_search import INDEX_DIMENSION, INDEX_NAME, LOCAL_INDEX_DIR, PINECONE_MANIFEST_DIR, RETRIEVER_BACKEND
+
 load_dotenv()
 
-import torch
-device = "mps" if torch.backends.mps.is_available() else "cpu"
-print(device)
-
-#Load CSV
-loader = CSVLoader(file_path="/Users/slimshady/Documents/Property Advisor /Property-Advisor-Agent/dataset/Real_Description.csv",metadata_columns=['property_id'])
-docs = loader.load()
-# print(docs[0])
-
-#CREATE PINECONE CLIENT 
-pc=Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-
-#CREATE INDEX 
-index_name="property-advisor-agent"
-if index_name not in pc.list_indexes().names():
-        pc.create_index(
-            name=index_name,
-            dimension=1024,  # dimensionality of dense model
-            metric="dotproduct",  # sparse values supported only for dotproduct
-            spec=ServerlessSpec(cloud="aws", region="us-east-1"),
-        )
-index = pc.Index(index_name)
-
-#Embeddings 
-embeddings = HuggingFaceEmbeddings(
-    model_name="BAAI/bge-large-en-v1.5",
-    model_kwargs={"device": device},
-    encode_kwargs={"normalize_embeddings": True}
-        )
-
-#BM25-ENCODER 
-bm25_encoder = BM25Encoder().default()
-corpus = [d.page_content for d in docs]
-bm25_encoder.fit(corpus)
-
-
-#Setting Up Retriever
-texts = [d.page_content for d in docs]
-metadatas = [d.metadata for d in docs]
-retriever=PineconeHybridSearchRetriever(embeddings=embeddings,sparse_encoder=bm25_encoder,index=index,alpha=0.5,top_k=40)
-retriever.add_texts(texts=texts,metadatas=metadatas)
-print("Documents add to Retriever")
\ No newline at end of file
+# ---------------------------
+# Config
+# ---------------------------
+PINECONE_STATE_FILE = os.getenv("INGEST_STATE_FILE", os.path.join("dataset", "pinecone_ingest_state.json"))
+LOCAL_STATE_FILE = "ingest_state.json"  # kept inside LOCAL_INDEX_DIR
+INGEST_STATE_VERSION = 1
+TEXT_KEY = "context"  # metadata key PineconeHybridSearchRetriever reads the text from
+
+
+# ---------- row hashing ----------
+def _digest(payload: str) -> str:
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def dataset_rows() -> List[Dict[str, Any]]:
+    """One row per described property: id, text to embed, listing metadata and their hashes."""
+    dataset = get_dataset()
+    descriptions = dataset.doc_texts()
+    listings = {m["property_id"]: m for m in listing_metadata(dataset.listings)}
+    rows = []
+    for pid, text in zip(descriptions["property_id"].astype(str), descriptions["doc_text"]):
+        metadata = {**listings.get(pid, {}), "property_id": pid}
+        rows.append({
+            "id": pid,
+            "text": text,
+            "metadata": metadata,
+            "text_hash": _digest(text),
+            "meta_hash": _digest(json.dumps(metadata, sort_keys=True, default=str)),
+        })
+    return rows
+
+
+# ---------- state ----------
+def read_state(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if state.get("state_version") == INGEST_STATE_VERSION else {}
+
+
+def write_state(path: str, state: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    state = {**state, "state_version": INGEST_STATE_VERSION, "updated_at": time.time()}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def plan(rows: List[Dict[str, Any]], hashes: Dict[str, List[str]]) -> Tuple[List[Dict], List[Dict], List[str]]:
+    """(rows to embed, rows needing only a metadata update, ids to delete)."""
+    embed, update = [], []
+    for row in rows:
+        previous = hashes.get(row["id"])
+        if previous is None or previous[0] != row["text_hash"]:
+            embed.append(row)
+        elif previous[1] != row["meta_hash"]:
+            update.append(row)
+    current = {row["id"] for row in rows}
+    removed = [pid for pid in hashes if pid not in current]
+    return embed, update, removed
+
+
+# ---------- BM25 ----------
+def frozen_bm25(rows: List[Dict[str, Any]], refit: bool) -> Tuple[Any, str]:
+    """(encoder, artifact version): the saved artifact, or a fresh fit saved as the new one."""
+    artifact = None if refit else load_bm25_artifact(BM25_DIR)
+    if artifact is not None:
+        return artifact[0], artifact[1]["version"]
+    print(f"[INFO] Fitting BM25 on {len(rows)} documents ...")
+    corpus = [row["text"] for row in rows]
+    encoder = fit_bm25(corpus)
+    manifest = save_bm25(encoder, corpus, BM25_DIR)
+    print(f"[INFO] BM25 artifact {manifest['version']} saved to {BM25_DIR}")
+    return encoder, manifest["version"]
+
+
+# ---------- targets ----------
+class PineconeTarget:
+    """Parallel chunked upserts / updates / deletes against the Pinecone index."""
+
+    def __init__(self, workers: int, upsert_chunk: int):
+        from pinecone import Pinecone, ServerlessSpec
+
+        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        if INDEX_NAME not in pc.list_indexes().names():
+            pc.create_index(
+                name=INDEX_NAME,
+                dimension=INDEX_DIMENSION,  # dimensionality of dense model
+                metric="dotproduct",  # sparse values supported only for dotproduct
+                spec=ServerlessSpec(cloud="aws", region="us-east-1"),
+            )
+        self.index = pc.Index(INDEX_NAME)
+        self.upsert_chunk = upsert_chunk
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.pending = []
+
+    def reset(self) -> None:
+        self.index.delete(delete_all=True)
+
+    def upsert(self, rows: List[Dict], dense: List[List[float]], sparse: List[Dict]) -> None:
+        vectors = [
+            {
+                "id": row["id"],
+                "values": values.tolist() if hasattr(values, "tolist") else values,
+                "sparse_values": {"indices": s["indices"], "values": [float(v) for v in s["values"]]},
+                "metadata": {**row["metadata"], TEXT_KEY: row["text"]},
+            }
+            for row, values, s in zip(rows, dense, sparse)
+        ]
+        for start in range(0, len(vectors), self.upsert_chunk):
+            self.pending.append(self.pool.submit(self.index.upsert, vectors=vectors[start:start + self.upsert_chunk]))
+
+    def update_metadata(self, rows: List[Dict]) -> None:
+        for row in rows:
+            self.pending.append(self.pool.submit(
+                self.index.update, id=row["id"], set_metadata={**row["metadata"], TEXT_KEY: row["text"]}
+            ))
+
+    def delete(self, ids: List[str]) -> None:
+        for start in range(0, len(ids), 1000):
+            self.pending.append(self.pool.submit(self.index.delete, ids=ids[start:start + 1000]))
+
+    def flush(self, bm25_version: str) -> None:
+        # Raises the first failed request, before the checkpoint records its rows
+        pending, self.pending = self.pending, []
+        for future in pending:
+            future.result()
+        # Query time loads only the BM25 artifact recorded here (see hybrid_search.load_bm25)
+        record_bm25_version(PINECONE_MANIFEST_DIR, bm25_version)
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
+
+
+class LocalTarget:
+    """Incremental update of the on-disk LocalHybridIndex (LOCAL_INDEX_DIR)."""
+
+    def __init__(self, directory: str = LOCAL_INDEX_DIR):
+        from local_retriever import LocalHybridIndex
+
+        self.directory = directory
+        self.index: Optional[Any] = None
+        if LocalHybridIndex.exists(directory):
+            self.index = LocalHybridIndex.load(directory, mmap=False)
+        self.added: List[Any] = []
+        self.updates: Dict[str, Dict[str, Any]] = {}
+        self.removed: List[str] = []
+
+    def reset(self) -> None:
+        self.index = None
+
+    def upsert(self, rows: List[Dict], dense: List[List[float]], sparse: List[Dict]) -> None:
+        from local_retriever import LocalHybridIndex
+
+        self.added.append(LocalHybridIndex.from_vectors(
+            dense, sparse, [row["id"] for row in rows], [row["text"] for row in rows],
+            [row["metadata"] for row in rows],
+        ))
+
+    def update_metadata(self, rows: List[Dict]) -> None:
+        self.updates.update((row["id"], row["metadata"]) for row in rows)
+
+    def delete(self, ids: List[str]) -> None:
+        self.removed.extend(ids)
+
+    def flush(self, bm25_version: str) -> None:
+        from ann_index import ANN_FILE
+
+        if not (self.added or self.updates or self.removed):
+            return
+        index = self.index
+        replaced = [pid for part in self.added for pid in part.ids] + self.removed
+        if index is not None and replaced:
+            index = index.without(replaced)
+        for part in self.added:
+            index = part if index is None else index.merged(part)
+        if index is not None and self.updates:
+            index.metadatas = [self.updates.get(pid, meta) for pid, meta in zip(index.ids, index.metadatas)]
+        self.index, self.added, self.updates, self.removed = index, [], {}, []
+        if index is None:
+            return
+        index.save(self.directory)
+        record_bm25_version(self.directory, bm25_version)
+        # Rows moved: the ANN index is rebuilt from the new vectors on next load
+        if os.path.exists(os.path.join(self.directory, ANN_FILE)):
+            os.remove(os.path.join(self.directory, ANN_FILE))
+
+    def close(self) -> None:
+        pass
+
+
+# ---------- pipeline ----------
+def ingest(
+    target: str = RETRIEVER_BACKEND,
+    batch_size: int = 64,
+    upsert_chunk: int = 100,
+    workers: int = 4,
+    checkpoint_every: int = 20,
+    refit_bm25: bool = False,
+    reset: bool = False,
+    dry_run: bool = False,
+    state_path: Optional[str] = None,
+    embedding_backend: Optional[str] = None,
+    embed_chunk: int = 0,
+) -> Dict[str, int]:
+    """Bring the `target` index in line with the dataset store; returns the counts of each change."""
+    state_path = state_path or (
+        os.path.join(LOCAL_INDEX_DIR, LOCAL_STATE_FILE) if target == "local" else PINECONE_STATE_FILE
+    )
+    state = {} if reset else read_state(state_path)
+    rows = dataset_rows()
+
+    bm25, bm25_version = frozen_bm25(rows, refit_bm25) if not dry_run else (None, state.get("bm25_version"))
+    hashes: Dict[str, List[str]] = state.get("hashes", {})
+    if state.get("bm25_version") not in (None, bm25_version):
+        # Sparse vectors of every row came from another BM25 fit
+        print(f"[INFO] BM25 changed ({state.get('bm25_version')} -> {bm25_version}); re-encoding every row.")
+        hashes = {pid: ["", h[1]] for pid, h in hashes.items()}
+
+    embed, update, removed = plan(rows, hashes)
+    counts = {"embedded": len(embed), "metadata_updated": len(update), "deleted": len(removed),
+              "unchanged": len(rows) - len(embed) - len(update)}
+    print(f"[INFO] {target}: {counts}")
+    if dry_run or not (embed or update or removed or reset):
+        return counts
+
+    from embedding_backends import embed_array, embedding_chunk_size, make_embeddings
+
+    sink = LocalTarget() if target == "local" else PineconeTarget(workers, upsert_chunk)
+    embeddings = make_embeddings(embedding_backend) if embed else None
+
+    def checkpoint() -> None:
+        sink.flush(bm25_version)
+        write_state(state_path, {"target": target, "bm25_version": bm25_version, "hashes": hashes})
+
+    try:
+        if reset:
+            sink.reset()
+        # Deletes and metadata-only updates are cheap: apply and checkpoint them first
+        if removed or update:
+            sink.delete(removed)
+            sink.update_metadata(update)
+            for pid in removed:
+                hashes.pop(pid, None)
+            for row in update:
+                hashes[row["id"]] = [row["text_hash"], row["meta_hash"]]
+            checkpoint()
+
+        started = time.perf_counter()
+        number = 0
+        chunk = embedding_chunk_size(embeddings, batch_size, embed_chunk) if embed else batch_size
+        for chunk_start in range(0, len(embed), chunk):
+            chunk_rows = embed[chunk_start:chunk_start + chunk]
+            texts = [row["text"] for row in chunk_rows]
+            # One large call per chunk: length buckets span it and the worker pool engages;
+            # uploads of the previous chunk proceed meanwhile
+            dense, sparse = embed_array(embeddings, texts), bm25.encode_documents(texts)
+            for start in range(0, len(chunk_rows), batch_size):
+                batch = chunk_rows[start:start + batch_size]
+                sink.upsert(batch, dense[start:start + batch_size], sparse[start:start + batch_size])
+                for row in batch:
+                    hashes[row["id"]] = [row["text_hash"], row["meta_hash"]]
+                number += 1
+                if number % checkpoint_every == 0:
+                    checkpoint()
+                    done = chunk_start + min(start + batch_size, len(chunk_rows))
+                    print(f"[INFO] {done}/{len(embed)} embedded ({done / (time.perf_counter() - started):.1f} docs/s)")
+        checkpoint()
+    finally:
+        sink.close()
+        if hasattr(embeddings, "close"):
+            embeddings.close()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally ingest the property descriptions into the hybrid index.")
+    parser.add_argument("--target", choices=["pinecone", "local"], default=RETRIEVER_BACKEND)
+    parser.add_argument("--batch-size", type=int, default=64, help="documents upserted (and checkpointed) per batch")
+    parser.add_argument("--embed-chunk", type=int, default=0,
+                        help="documents per embedding call (0 = EMBEDDING_CHUNK, else sized for the worker pool)")
+    parser.add_argument("--upsert-chunk", type=int, default=100, help="vectors per Pinecone upsert request")
+    parser.add_argument("--workers", type=int, default=4, help="parallel upsert requests")
+    parser.add_argument("--checkpoint-every", type=int, default=20, help="batches between state checkpoints")
+    parser.add_argument("--state", default=None, help="state file (default depends on --target)")
+    parser.add_argument("--refit-bm25", action="store_true", help="fit a new BM25 encoder and re-encode every row")
+    parser.add_argument("--reset", action="store_true", help="clear the index and the state, then ingest everything")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    parser.add_argument("--embedding-backend", choices=["default", "cpu", "onnx"], default=None,
+                        help="dense embedding backend (default: EMBEDDING_BACKEND)")
+    args = parser.parse_args()
+    ingest(
+        target=args.target,
+        batch_size=args.batch_size,
+        upsert_chunk=args.upsert_chunk,
+        workers=args.workers,
+        checkpoint_every=args.checkpoint_every,
+        refit_bm25=args.refit_bm25,
+        reset=args.reset,
+        dry_run=args.dry_run,
+        state_path=args.state,
+        embedding_backend=args.embedding_backend,
+        embed_chunk=args.embed_chunk,
+    )
@@ -1,18 +1,35 @@
 from parser_and_prompts import hybrid_query_maker_prompt
-from llm_models import get_deepseek_model, initialize_models
+from llm_models import get_deepseek_model, initialize_models, DEEPSEEK_MODEL_NAME
+from llm_cache import cached_call, acached_call
+from streaming_parser import arun_chain
 
 def query_maker_hybrid(user_query):
-    # Initialize models if not already done
-    initialize_models()
-    deepseek_model = get_deepseek_model()
-    llm=hybrid_query_maker_prompt|deepseek_model
-    result=llm.invoke(user_query)
-    result=result.content
-    hybrid_query = result.split("</think>", 1)[-1].strip()
+    def _invoke():
+        # Initialize models if not already done
+        initialize_models()
+        deepseek_model = get_deepseek_model()
+        llm=hybrid_query_maker_prompt|deepseek_model
+        result=llm.invoke(user_query)
+        result=result.content
+        return result.split("</think>", 1)[-1].strip()
+
+    hybrid_query = cached_call(hybrid_query_maker_prompt, DEEPSEEK_MODEL_NAME, user_query, _invoke)
+
+    print(hybrid_query)
+    return hybrid_query
+
+
+async def aquery_maker_hybrid(user_query):
+    async def _ainvoke():
+        deepseek_model = get_deepseek_model()
+        # Text mode: think block skipped, call ends after the single output line
+        return await arun_chain("groq", hybrid_query_maker_prompt, deepseek_model, user_query, None, "hybrid_query")
+
+    hybrid_query = await acached_call(hybrid_query_maker_prompt, DEEPSEEK_MODEL_NAME, user_query, _ainvoke)
 
     print(hybrid_query)
     return hybrid_query
 
 
 
-# query_maker_hybrid("Tell me flat of 3bhk of Area 5000 sq.ft with carpet Area havign 24/7 power backup ")
\ No newline at end of file
+# query_maker_hybrid("Tell me flat of 3bhk of Area 5000 sq.ft with carpet Area havign 24/7 power backup ")
@@ -0,0 +1,180 @@
+import os
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from csv_agent import _filter_on_columns_dict, _numeric_values, numeric_interval
+
+load_dotenv()
+
+# ---------------------------
+# Config
+# ---------------------------
+# Rows returned per property query (0 = every matching row)
+RESULT_TOP_K = int(os.getenv("RESULT_TOP_K", "100"))
+
+# Near misses on these numeric constraints are kept with a lower score:
+# ("relative", 0.10) -> within 10% of the bound, ("absolute", 1) -> within 1
+SOFT_CONSTRAINTS = os.getenv("SOFT_CONSTRAINTS", "1").strip().lower() not in {"0", "false", "no", "off"}
+SOFT_TOLERANCES: Dict[str, Tuple[str, float]] = {
+    "Price_in_Crore": ("relative", 0.10),
+    "bedRoom": ("absolute", 1),
+}
+
+# Weight of the (normalized) hybrid score vs the constraint score
+RANK_HYBRID_WEIGHT = float(os.getenv("RANK_HYBRID_WEIGHT", "0.7"))
+
+
+# Columns added by `rank_results`
+SCORE_COLUMNS = ["relevance_score", "constraint_score", "hybrid_score", "exact_match"]
+
+
+def _margins(lo: float, hi: float, kind: str, tolerance: float) -> Tuple[float, float]:
+    if kind == "relative":
+        return tolerance * abs(lo), tolerance * abs(hi)
+    return tolerance, tolerance
+
+
+def _soft_intervals(
+    fields: Dict[str, bool],
+    search_data: Dict[str, Any],
+    filter_on_columns: Any,
+) -> Dict[str, Tuple[float, float, float, float]]:
+    """{column: (lo, hi, lo margin, hi margin)} of the enabled soft constraints."""
+    if not SOFT_CONSTRAINTS:
+        return {}
+    comparators = _filter_on_columns_dict(filter_on_columns)
+    search_data = search_data or {}
+    intervals = {}
+    for col, (kind, tolerance) in SOFT_TOLERANCES.items():
+        if not fields.get(col, False) or search_data.get(col) is None:
+            continue
+        try:
+            interval = numeric_interval(search_data[col], comparators.get(col))
+        except (TypeError, ValueError):
+            continue
+        if interval is not None:
+            lo, hi = interval
+            intervals[col] = (lo, hi, *_margins(lo, hi, kind, tolerance))
+    return intervals
+
+
+def relax_search_data(
+    fields: Dict[str, bool],
+    search_data: Dict[str, Any],
+    filter_on_columns: Any,
+) -> Dict[str, Any]:
+    """
+    `search_data` with the soft constraints widened by their tolerance
+    (same comparators), so the CSV filter / metadata pre-filter also keep
+    near misses, e.g. "under 2 Cr" -> "under 2.2 Cr", "3 BHK" -> 2 to 4 BHK.
+    """
+    intervals = _soft_intervals(fields, search_data, filter_on_columns)
+    if not intervals:
+        return search_data
+    comparators = _filter_on_columns_dict(filter_on_columns)
+    relaxed = dict(search_data)
+    for col, (lo, hi, lo_margin, hi_margin) in intervals.items():
+        comparator = comparators.get(col)
+        if comparator == "Greater than":
+            relaxed[col] = lo - lo_margin
+        elif comparator == "Lesser than":
+            relaxed[col] = hi + hi_margin
+        else:
+            relaxed[col] = [lo - lo_margin, hi + hi_margin]
+    return relaxed
+
+
+def constraint_scores(
+    frame: pd.DataFrame,
+    fields: Dict[str, bool],
+    search_data: Dict[str, Any],
+    filter_on_columns: Any,
+) -> np.ndarray:
+    """
+    Per-row soft-match score in [0.5, 1]: 1 when every soft constraint is
+    met exactly, falling linearly to 0.5 at the edge of each tolerance
+    (product over the constraints). Checked against the original, not the
+    relaxed, `search_data`.
+    """
+    scores = np.ones(len(frame), dtype=np.float64)
+    for col, (lo, hi, lo_margin, hi_margin) in _soft_intervals(fields, search_data, filter_on_columns).items():
+        if col not in frame.columns:
+            continue
+        values = _numeric_values(frame[col])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            below = np.where(lo_margin > 0, (lo - values) / lo_margin, np.inf)
+            above = np.where(hi_margin > 0, (values - hi) / hi_margin, np.inf)
+        miss = np.clip(np.fmax(np.where(values < lo, below, 0.0), np.where(values > hi, above, 0.0)), 0.0, 1.0)
+        scores *= np.where(np.isnan(values), 0.5, 1.0 - 0.5 * miss)
+    return scores
+
+
+def _normalized(values: np.ndarray) -> np.ndarray:
+    """Min-max scaling to [0, 1] (all ones when the values are equal)."""
+    if len(values) == 0:
+        return values
+    lo, hi = float(values.min()), float(values.max())
+    if hi - lo <= 0:
+        return np.ones_like(values)
+    return (values - lo) / (hi - lo)
+
+
+def top_k_positions(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the `k` best scores, best first; ties keep their input order."""
+    if k <= 0 or k >= len(scores):
+        candidates = np.arange(len(scores))
+    else:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+def rank_results(
+    frame: pd.DataFrame,
+    fields: Dict[str, bool],
+    search_data: Dict[str, Any],
+    filter_on_columns: Any,
+    hybrid_scores: Optional[Union[Dict[str, float], np.ndarray]] = None,
+    top_k: int = RESULT_TOP_K,
+) -> Tuple[pd.DataFrame, int]:
+    """
+    (top rows, number of matching rows): the `top_k` best rows of `frame` (the relaxed CSV result), best first,
+    with `constraint_score`, `hybrid_score` (when hybrid search ran), the
+    combined `relevance_score` and `exact_match` columns. Exact matches
+    always rank above near misses (rows only the soft constraints let in),
+    so a near miss shows up only when fewer than `top_k` rows match
+    exactly. With `hybrid_scores`, only rows the hybrid search returned are
+    kept (strict intersection, as before) and counted as matches;
+    `hybrid_scores` is either {property_id: score} or an array aligned
+    with `frame`'s rows (NaN where hybrid search did not return the row).
+    """
+    constraint = constraint_scores(frame, fields, search_data, filter_on_columns)
+    columns = {}
+    if hybrid_scores is not None:
+        if isinstance(hybrid_scores, np.ndarray):
+            raw = np.asarray(hybrid_scores, dtype=np.float64)
+        elif "property_id" in frame.columns:
+            raw = frame["property_id"].astype(str).map(hybrid_scores).to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            raw = np.full(len(frame), np.nan)
+        hit = ~np.isnan(raw)
+        frame, constraint, raw = frame.iloc[np.flatnonzero(hit)], constraint[hit], raw[hit]
+        hybrid = _normalized(raw)
+        relevance = RANK_HYBRID_WEIGHT * hybrid + (1.0 - RANK_HYBRID_WEIGHT) * constraint
+        columns["hybrid_score"] = raw
+    else:
+        relevance = constraint
+
+    # relevance is in [0, 1]: the +1 puts every exact match first
+    exact = constraint >= 1.0
+    order = top_k_positions(relevance + exact, top_k)
+    columns = {name: values[order] for name, values in columns.items()}
+    ranked = frame.iloc[order].assign(
+        relevance_score=relevance[order],
+        constraint_score=constraint[order],
+        exact_match=exact[order],
+        **columns,
+    )
+    return ranked, len(frame)
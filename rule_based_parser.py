@@ -0,0 +1,371 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from models import (
+    AdditionalRoomType,
+    ApplyFilterToColumn,
+    AreaTypeEnum,
+    ComparisonEnum,
+    FacingDirection,
+    FieldToSearch,
+    RuleBasedParse,
+    SearchData,
+)
+
+# =========================
+# Vocabulary
+# =========================
+
+NUMBER_WORDS = {
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+    "single": "1", "double": "2",
+}
+
+CITY_ALIASES = {
+    "gurgaon": "Gurgaon",
+    "gurugram": "Gurgaon",
+    "new delhi": "Delhi",
+    "delhi": "Delhi",
+    "bangalore": "Bangalore",
+    "bengaluru": "Bangalore",
+    "pathankot": "Pathankot",
+    "chandigarh": "Chandigarh",
+    "mohali": "Mohali",
+}
+
+COUNTRY_ALIASES = {
+    "india": "India",
+}
+
+ROOM_ALIASES = {
+    "pooja": "Pooja Room",
+    "puja": "Pooja Room",
+    "study": "Study Room",
+    "servant": "Servant Room",
+    "store": "Store Room",
+}
+
+# Words that carry no search meaning on their own
+FILLER_WORDS = {
+    "i", "im", "we", "me", "my", "you", "can", "could", "would", "like", "want", "need",
+    "looking", "look", "searching", "search", "find", "show", "tell", "give", "get", "list",
+    "please", "pls", "for", "a", "an", "the", "any", "some", "all", "available", "there",
+    "is", "are", "be", "it", "its", "that", "which", "what", "in", "at", "of", "on", "to",
+    "and", "or", "with", "having", "has", "have", "located", "location", "about", "buy",
+    "purchase", "sale", "flat", "flats", "apartment", "apartments", "property", "properties",
+    "house", "houses", "home", "homes", "unit", "units", "residential", "city", "area",
+    "room", "rooms", "price", "priced", "cost", "costing", "rs", "inr", "rupees", "budget",
+}
+
+# Nouns that mark a query as property related even when no value is extracted
+PROPERTY_WORDS = {"flat", "flats", "apartment", "apartments", "property", "properties", "house", "houses", "home", "homes", "bhk"}
+
+# =========================
+# Grammar fragments
+# =========================
+
+NUM = r"(\d+(?:\.\d+)?)"
+LESS = r"under|below|less than|lesser than|within|upto|up to|not more than|maximum|max|at most|budget of|budget"
+MORE = r"above|over|more than|greater than|at least|atleast|minimum|min|starting from|starting at"
+COMPARATOR = rf"(?:(?P<cmp>{LESS}|{MORE})\s*)?"
+PRICE_UNIT = r"(crores?|cr|lakhs?|lacs?|l)\b"
+SQFT_UNIT = r"(?:sq\.?\s*ft|sqft|square\s*f(?:ee|oo)t|sq\.?\s*feet|ft2)"
+SQM_UNIT = r"(?:sq\.?\s*m(?:eters?|etres?|trs?)?|sqm|square\s*met(?:er|re)s?|m2)\b"
+SQYD_UNIT = r"(?:sq\.?\s*y(?:ar)?ds?|square\s*yards?|gaj)\b"
+DIRECTION = r"north[\s-]?east|north[\s-]?west|south[\s-]?east|south[\s-]?west|north|south|east|west"
+
+SQFT_TO_SQM = 0.092903
+SQYD_TO_SQM = 0.836127
+
+
+def _comparator(word: Optional[str]) -> Optional[ComparisonEnum]:
+    if not word:
+        return None
+    word = re.sub(r"\s+", " ", word.strip())
+    if re.fullmatch(LESS, word):
+        return ComparisonEnum.lesser
+    if re.fullmatch(MORE, word):
+        return ComparisonEnum.greater
+    return None
+
+
+def _to_crore(value: str, unit: str) -> float:
+    amount = float(value)
+    if unit.startswith(("l", "lac", "lakh")):
+        amount = amount / 100
+    return round(amount, 4)
+
+
+def _number(value: str) -> float:
+    amount = float(value)
+    return int(amount) if amount.is_integer() else amount
+
+
+class _Scanner:
+    """Keeps the working text and blanks out every span a rule consumes."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.matched: List[str] = []
+
+    def take(self, pattern: str):
+        """Yield matches of `pattern`, consuming each one from the text."""
+        for m in list(re.finditer(pattern, self.text)):
+            if not m.group(0).strip():
+                continue
+            yield m
+            self.matched.append(m.group(0))
+        self.text = re.sub(pattern, " ", self.text)
+
+
+def _normalize(user_query: str) -> str:
+    text = user_query.casefold()
+    text = text.replace("₹", " rs ")
+    text = re.sub(r"(?<=\d),(?=\d)", "", text)               # 1,200 -> 1200
+    text = re.sub(r"(\d)\s*\+\s*", r"\1 or more ", text)      # 3+ bhk -> 3 or more bhk
+    for word, digit in NUMBER_WORDS.items():
+        text = re.sub(rf"\b{word}\b", digit, text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+(?:\.[0-9]+)?", text)
+
+
+# =========================
+# Rules
+# =========================
+
+def _parse_price(scan: _Scanner, data: Dict[str, Any], comparators: Dict[str, Any]) -> None:
+    between = rf"(?:between|from)?\s*(?:rs\.?\s*)?{NUM}\s*(?:{PRICE_UNIT})?\s*(?:and|to|-)\s*(?:rs\.?\s*)?{NUM}\s*{PRICE_UNIT}"
+    for m in scan.take(between):
+        hi_unit = m.group(4)
+        lo_unit = m.group(2) or hi_unit
+        data["Price_in_Crore"] = [_to_crore(m.group(1), lo_unit), _to_crore(m.group(3), hi_unit)]
+
+    single = rf"{COMPARATOR}(?:rs\.?\s*)?{NUM}\s*{PRICE_UNIT}(?P<tail>\s*or (?:less|below|more|above))?"
+    for m in scan.take(single):
+        data["Price_in_Crore"] = _to_crore(m.group(2), m.group(3))
+        cmp = _comparator(m.group("cmp"))
+        tail = (m.group("tail") or "").strip()
+        if tail:
+            cmp = ComparisonEnum.lesser if tail.endswith(("less", "below")) else ComparisonEnum.greater
+        if cmp:
+            comparators["Price_in_Crore"] = cmp
+
+
+def _parse_rate(scan: _Scanner, data: Dict[str, Any], comparators: Dict[str, Any]) -> None:
+    pattern = rf"{COMPARATOR}(?:rs\.?\s*)?{NUM}\s*(?:rs\.?\s*)?(?:/|per)\s*{SQFT_UNIT}"
+    for m in scan.take(pattern):
+        data["Rate_rs_sqft"] = int(float(m.group(2)))
+        cmp = _comparator(m.group("cmp"))
+        if cmp:
+            comparators["Rate_rs_sqft"] = cmp
+
+
+def _parse_area(scan: _Scanner, data: Dict[str, Any], comparators: Dict[str, Any]) -> None:
+    for unit, factor in ((SQFT_UNIT, SQFT_TO_SQM), (SQYD_UNIT, SQYD_TO_SQM), (SQM_UNIT, 1.0)):
+        pattern = rf"{COMPARATOR}{NUM}\s*{unit}"
+        for m in scan.take(pattern):
+            data["Area_in_sq_meter"] = round(float(m.group(2)) * factor, 2)
+            cmp = _comparator(m.group("cmp"))
+            if cmp:
+                comparators["Area_in_sq_meter"] = cmp
+
+
+def _parse_count(
+    scan: _Scanner,
+    data: Dict[str, Any],
+    comparators: Dict[str, Any],
+    key: str,
+    noun: str,
+) -> None:
+    # "2 or 3 bhk", "2-3 bhk"
+    for m in scan.take(rf"{NUM}\s*(?:or|to|-)\s*{NUM}\s*(?:{noun})"):
+        data[key] = sorted({int(float(m.group(1))), int(float(m.group(2)))})
+    # "at least 3 bhk", "3 or more bhk", "3 bhk or more"
+    pattern = (
+        rf"{COMPARATOR}{NUM}(?P<mid>\s*or (?:more|above|less|below))?\s*(?:{noun})"
+        rf"(?P<tail>\s*or (?:more|above|less|below))?"
+    )
+    for m in scan.take(pattern):
+        data[key] = int(float(m.group(2)))
+        cmp = _comparator(m.group("cmp"))
+        tail = (m.group("mid") or m.group("tail") or "").strip()
+        if tail:
+            cmp = ComparisonEnum.greater if tail.endswith(("more", "above")) else ComparisonEnum.lesser
+        if cmp:
+            comparators[key] = cmp
+
+
+def _parse_floor(scan: _Scanner, data: Dict[str, Any], comparators: Dict[str, Any], flags: Dict[str, bool]) -> None:
+    for _ in scan.take(r"\b(?:top|topmost|highest|last)\s*floor\b"):
+        flags["top_floor"] = True
+
+    total = rf"{COMPARATOR}{NUM}\s*(?:floors|storeys|stories|storey|floor|story)(?:ed)?\s*(?:building|tower|society)\b"
+    for m in scan.take(total):
+        data["Totalfloor"] = int(float(m.group(2)))
+        cmp = _comparator(m.group("cmp"))
+        if cmp:
+            comparators["Totalfloor"] = cmp
+
+    for _ in scan.take(r"\bground\s*floor\b"):
+        data["floorNum"] = 0
+    floor = rf"{COMPARATOR}{NUM}\s*(?:st|nd|rd|th)?\s*floor\b"
+    for m in scan.take(floor):
+        data["floorNum"] = int(float(m.group(2)))
+        cmp = _comparator(m.group("cmp"))
+        if cmp:
+            comparators["floorNum"] = cmp
+
+
+def _facing_value(word: str) -> Optional[FacingDirection]:
+    parts = re.split(r"[\s-]+", word.strip())
+    label = "-".join(p.capitalize() for p in parts if p)
+    try:
+        return FacingDirection(label)
+    except ValueError:
+        return None
+
+
+def _parse_facing(scan: _Scanner, data: Dict[str, Any]) -> None:
+    found: List[FacingDirection] = []
+    pattern = rf"\b(?:(?P<a>{DIRECTION})\s*-?\s*facing|facing\s*(?:the\s*)?(?P<b>{DIRECTION}))\b"
+    for m in scan.take(pattern):
+        direction = _facing_value(m.group("a") or m.group("b"))
+        if direction and direction not in found:
+            found.append(direction)
+    if found:
+        data["facing"] = found[0] if len(found) == 1 else found
+
+
+def _parse_area_type(scan: _Scanner, data: Dict[str, Any]) -> None:
+    for pattern, value in (
+        (r"\bsuper\s*built[\s-]*up(?:\s*area)?\b", AreaTypeEnum.super_built_up),
+        (r"\bbuilt[\s-]*up(?:\s*area)?\b", AreaTypeEnum.built_up),
+        (r"\bcarpet(?:\s*area)?\b", AreaTypeEnum.carpet),
+    ):
+        for _ in scan.take(pattern):
+            data["AreaType"] = value
+
+
+def _parse_additional_room(scan: _Scanner, data: Dict[str, Any], failures: List[str]) -> None:
+    rooms: List[str] = []
+    names = "|".join(ROOM_ALIASES)
+    for m in scan.take(rf"\b({names})\s*rooms?\b"):
+        room = ROOM_ALIASES[m.group(1)]
+        if room not in rooms:
+            rooms.append(room)
+    if not rooms:
+        return
+    try:
+        data["additionalRoom"] = AdditionalRoomType(",".join(rooms))
+    except ValueError:
+        # More than two rooms (or an unknown pair): the enum cannot hold it
+        failures.append("additionalRoom")
+
+
+def _parse_places(scan: _Scanner, data: Dict[str, Any]) -> None:
+    sectors = []
+    for m in scan.take(r"\bsector\s*-?\s*(\d+[a-z]?)\b"):
+        sectors.append(f"sector {m.group(1)}")
+    if sectors:
+        data["colony_or_sector"] = sectors[0] if len(sectors) == 1 else sectors
+
+    cities: List[str] = []
+    for alias in sorted(CITY_ALIASES, key=len, reverse=True):
+        for _ in scan.take(rf"\b{alias}\b"):
+            if CITY_ALIASES[alias] not in cities:
+                cities.append(CITY_ALIASES[alias])
+    if cities:
+        data["City"] = cities[0] if len(cities) == 1 else cities
+
+    for alias, country in COUNTRY_ALIASES.items():
+        for _ in scan.take(rf"\b{alias}\b"):
+            data["Country"] = country
+
+
+# =========================
+# Public API
+# =========================
+
+def parse_query(user_query: str) -> RuleBasedParse:
+    """
+    Deterministically parse a property query into FieldToSearch, SearchData
+    and ApplyFilterToColumn. `confidence` is the share of meaningful words
+    the rules accounted for; 0.0 when the query has no property signal.
+    """
+    text = _normalize(user_query or "")
+    has_property_word = any(w in PROPERTY_WORDS for w in _words(text))
+    scan = _Scanner(text)
+
+    data: Dict[str, Any] = {}
+    comparators: Dict[str, Any] = {}
+    flags: Dict[str, bool] = {}
+    failures: List[str] = []
+
+    # Order matters: the most specific patterns consume their spans first
+    _parse_rate(scan, data, comparators)
+    _parse_price(scan, data, comparators)
+    _parse_area(scan, data, comparators)
+    _parse_floor(scan, data, comparators, flags)
+    _parse_count(scan, data, comparators, "bedRoom", r"bhk|bedrooms?|bed\s*rooms?|beds?|br")
+    _parse_count(scan, data, comparators, "bathroom", r"bathrooms?|baths?|washrooms?|toilets?")
+    _parse_count(scan, data, comparators, "balcony", r"balcon(?:y|ies)")
+    _parse_facing(scan, data)
+    _parse_area_type(scan, data)
+    _parse_additional_room(scan, data, failures)
+    _parse_places(scan, data)
+
+    field_values = {name: False for name in FieldToSearch.model_fields}
+    for key in data:
+        if key in field_values:
+            field_values[key] = True
+    field_values.update(flags)
+    if field_values["top_floor"]:
+        field_values["floorNum"] = False
+        field_values["Totalfloor"] = False
+
+    matched = [w for span in scan.matched for w in _words(span)]
+    leftover = [w for w in _words(scan.text) if w not in FILLER_WORDS]
+
+    if not matched and not has_property_word:
+        confidence = 0.0
+    elif failures:
+        confidence = 0.0
+    else:
+        confidence = len(matched) / max(1, len(matched) + len(leftover))
+        if not matched:
+            confidence = min(confidence, 0.5)
+
+    return RuleBasedParse(
+        fields=FieldToSearch(**field_values),
+        search_data=SearchData(**data),
+        filter_on_columns=ApplyFilterToColumn(**comparators),
+        leftover=leftover,
+        confidence=round(confidence, 3),
+    )
+
+
+def query_signature(user_query: str) -> str:
+    """
+    Structured fingerprint of a query: every number it contains plus the
+    values and comparators the rules extract. Two paraphrases only share a
+    signature when they ask for the same concrete constraints.
+    """
+    parsed = parse_query(user_query)
+    numbers = sorted(float(n) for n in re.findall(r"\d+(?:\.\d+)?", _normalize(user_query or "")))
+    return json.dumps(
+        {
+            "numbers": numbers,
+            "search_data": parsed.search_data.model_dump(mode="json", exclude_none=True),
+            "filter_on_columns": parsed.filter_on_columns.model_dump(mode="json", exclude_none=True),
+            "top_floor": parsed.fields.top_floor,
+        },
+        sort_keys=True,
+    )
+
+
+# print(parse_query(input("Enter the query")))
@@ -0,0 +1,310 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from llm_cache import normalize_query, prompt_hash
+from models import CombinedExtraction
+from telemetry import record_cache
+from rule_based_parser import query_signature
+
+load_dotenv()
+
+# ---------------------------
+# Config
+# ---------------------------
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1").strip().lower() not in {"0", "false", "no"}
+SEMANTIC_CACHE_DIR = os.getenv("SEMANTIC_CACHE_DIR", os.path.join(".cache", "semantic_cache"))
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "BAAI/bge-small-en-v1.5")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+# Recently embedded queries, so `add` after a missed `lookup` does not re-embed
+EMBED_MEMO_SIZE = 64
+
+
+def prompts_fingerprint() -> str:
+    """Hash over every PromptTemplate in parser_and_prompts; changes invalidate the cache."""
+    import parser_and_prompts
+    from langchain_core.prompts import PromptTemplate
+
+    prompts = {
+        name: prompt_hash(value)
+        for name, value in vars(parser_and_prompts).items()
+        if isinstance(value, PromptTemplate)
+    }
+    payload = json.dumps({"prompts": prompts, "model": SEMANTIC_CACHE_MODEL}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache of workflow extractions. Queries are embedded
+    with a small local model and compared by cosine similarity against an
+    in-memory matrix. A hit also needs the structured query signature to
+    match, so paraphrases are reused but "under 1 crore" never answers
+    "under 2 crore".
+
+    On disk, entries are append-only: raw float32 rows in `vectors.f32` and
+    one JSON line each in `entries.jsonl`, plus `meta.json` (prompt
+    fingerprint, dimension). A new entry costs one append; the files are
+    rewritten only when evicted rows reach `max_entries` (amortized O(1)).
+
+    The embedding model loads via `warm()` (in the retriever warm-up
+    thread); until then lookups miss and adds are skipped, so no query waits
+    for it.
+    """
+
+    def __init__(self, directory: str, threshold: float, max_entries: int):
+        self.directory = directory
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._warm_lock = threading.Lock()
+        self._embeddings = None
+        self._memo: Dict[str, np.ndarray] = {}
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._entries: List[Dict[str, Any]] = []
+        self._on_disk = 0  # rows in the files, evicted ones included
+        self._fingerprint = prompts_fingerprint()
+        self._load()
+
+    # ---------- persistence ----------
+    def _paths(self):
+        return (
+            os.path.join(self.directory, "vectors.f32"),
+            os.path.join(self.directory, "entries.jsonl"),
+            os.path.join(self.directory, "meta.json"),
+        )
+
+    def _load(self) -> None:
+        vectors_path, entries_path, meta_path = self._paths()
+        if not all(os.path.exists(p) for p in self._paths()):
+            return
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("fingerprint") != self._fingerprint:
+                print("[INFO] Prompts changed; semantic cache invalidated.")
+                return
+            dim = int(meta["dim"])
+            with open(entries_path, "r", encoding="utf-8") as f:
+                entries = [json.loads(line) for line in f if line.endswith("\n")]
+            vectors = np.fromfile(vectors_path, dtype=np.float32)
+            # A write cut short leaves a partial row / line: keep complete pairs only
+            rows = min(len(entries), len(vectors) // dim)
+            self._on_disk = rows
+            keep = min(rows, self.max_entries)
+            self._vectors = vectors[: rows * dim].reshape(rows, dim)[rows - keep:].copy()
+            self._entries = entries[rows - keep: rows]
+            if rows != len(entries) or rows * dim * 4 != os.path.getsize(vectors_path):
+                self._rewrite()
+        except Exception as e:
+            print(f"[WARN] Could not load semantic cache: {e!r}")
+            self._vectors, self._entries, self._on_disk = np.zeros((0, 0), dtype=np.float32), [], 0
+
+    def _rewrite(self) -> None:
+        """Compact the files to the live entries (atomic replace)."""
+        os.makedirs(self.directory, exist_ok=True)
+        vectors_path, entries_path, meta_path = self._paths()
+        self._vectors.astype(np.float32).tofile(vectors_path + ".tmp")
+        with open(entries_path + ".tmp", "w", encoding="utf-8") as f:
+            for entry in self._entries:
+                f.write(json.dumps(entry) + "\n")
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self._fingerprint, "dim": int(self._vectors.shape[1])}, f)
+        os.replace(vectors_path + ".tmp", vectors_path)
+        os.replace(entries_path + ".tmp", entries_path)
+        os.replace(meta_path + ".tmp", meta_path)
+        self._on_disk = len(self._entries)
+
+    def _append(self, vector: np.ndarray, entry: Dict[str, Any]) -> None:
+        vectors_path, entries_path, _ = self._paths()
+        with open(vectors_path, "ab") as f:
+            f.write(vector.astype(np.float32).tobytes())
+        with open(entries_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        self._on_disk += 1
+
+    # ---------- embeddings ----------
+    @property
+    def ready(self) -> bool:
+        return self._embeddings is not None
+
+    def warm(self) -> None:
+        """Load the embedding model (blocking; call from a background thread)."""
+        with self._warm_lock:
+            if self._embeddings is None:
+                from langchain_huggingface import HuggingFaceEmbeddings
+
+                self._embeddings = HuggingFaceEmbeddings(
+                    model_name=SEMANTIC_CACHE_MODEL,
+                    encode_kwargs={"normalize_embeddings": True},
+                )
+
+    def _embed(self, user_query: str) -> Optional[np.ndarray]:
+        """Unit vector of the normalized query, or None while the model is not loaded."""
+        if self._embeddings is None:
+            return None
+        key = normalize_query(user_query)
+        with self._lock:
+            vector = self._memo.get(key)
+        if vector is None:
+            # Encode outside the lock so a slow model call does not serialize lookups
+            vector = np.asarray(self._embeddings.embed_query(key), dtype=np.float32)
+            vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+            with self._lock:
+                if key not in self._memo and len(self._memo) >= EMBED_MEMO_SIZE:
+                    self._memo.pop(next(iter(self._memo)))
+                self._memo[key] = vector
+        return vector
+
+    def _nearest(self, vector: np.ndarray, signature: str) -> Optional[int]:
+        """Most similar entry at or above the threshold with the same signature (caller holds the lock)."""
+        if len(self._entries) == 0 or self._vectors.shape[1] != vector.shape[0]:
+            return None
+        similarities = self._vectors @ vector
+        for i in np.argsort(-similarities):
+            if similarities[i] < self.threshold:
+                return None
+            if self._entries[i]["signature"] == signature:
+                return int(i)
+        return None
+
+    # ---------- public API ----------
+    def lookup(self, user_query: str) -> Optional[CombinedExtraction]:
+        vector = self._embed(user_query)
+        if vector is None:
+            self.skipped += 1
+            return None
+        signature = query_signature(user_query)
+        with self._lock:
+            i = self._nearest(vector, signature)
+            if i is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry = self._entries[i]
+            entry["last_hit"] = time.time()
+            print(f"[INFO] Semantic cache hit: {entry['query']!r}")
+            return CombinedExtraction.model_validate(entry["extraction"])
+
+    def add(self, user_query: str, extraction: CombinedExtraction) -> None:
+        vector = self._embed(user_query)
+        if vector is None:
+            return
+        signature = query_signature(user_query)
+        entry = {
+            "query": user_query,
+            "signature": signature,
+            "extraction": extraction.model_dump(mode="json"),
+            "created_at": time.time(),
+        }
+        with self._lock:
+            if self._nearest(vector, signature) is not None:
+                # A near-duplicate (e.g. a concurrent identical query) is already cached
+                return
+            if self._vectors.size == 0 or self._vectors.shape[1] != vector.shape[0]:
+                self._vectors = vector[None, :]
+                self._entries = [entry]
+                self._rewrite()
+                return
+            self._vectors = np.vstack([self._vectors, vector[None, :]])
+            self._entries.append(entry)
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                # Oldest entries go first
+                self._vectors = self._vectors[overflow:]
+                self._entries = self._entries[overflow:]
+            if self._on_disk + 1 >= 2 * self.max_entries:
+                self._rewrite()
+            else:
+                self._append(vector, entry)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._vectors = np.zeros((0, 0), dtype=np.float32)
+            self._entries = []
+            self._fingerprint = prompts_fingerprint()
+            for path in self._paths():
+                if os.path.exists(path):
+                    os.remove(path)
+            self._on_disk = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "ready": self.ready,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+_cache: Optional[SemanticCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Process-wide semantic cache, or None when disabled / unavailable."""
+    global _cache
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticCache(SEMANTIC_CACHE_DIR, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES)
+    return _cache
+
+
+def warm_semantic_cache() -> None:
+    """Load the cache's embedding model (blocking). Never raises."""
+    try:
+        cache = get_semantic_cache()
+        if cache is not None:
+            cache.warm()
+    except Exception as e:
+        print(f"[WARN] Semantic cache model unavailable: {e!r}")
+
+
+def semantic_lookup(user_query: str) -> Optional[CombinedExtraction]:
+    """
+    Cached extraction for a near-duplicate query, or None. Never raises and
+    never waits for the embedding model: until it is warm, this is a miss.
+    """
+    try:
+        cache = get_semantic_cache()
+        if cache is None:
+            return None
+        if not cache.ready:
+            cache.skipped += 1
+            return None
+        hit = cache.lookup(user_query)
+        record_cache("semantic", "CombinedExtraction", hit is not None)
+        return hit
+    except Exception as e:
+        print(f"[WARN] Semantic cache lookup failed: {e!r}")
+        return None
+
+
+def semantic_store(user_query: str, extraction: CombinedExtraction) -> None:
+    try:
+        cache = get_semantic_cache()
+        if cache is not None:
+            cache.add(user_query, extraction)
+    except Exception as e:
+        print(f"[WARN] Semantic cache write failed: {e!r}")
+
+
+def semantic_cache_stats() -> Dict[str, Any]:
+    cache = _cache
+    return cache.stats() if cache is not None else {"entries": 0, "hits": 0, "misses": 0, "skipped": 0, "ready": False, "hit_rate": 0.0}
@@ -0,0 +1,179 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from dotenv import load_dotenv
+from langchain_core.exceptions import OutputParserException
+
+from llm_models import ainvoke_limited, provider_limiter
+from telemetry import llm_span, model_label, record_tokens
+
+load_dotenv()
+
+# ---------------------------
+# Config
+# ---------------------------
+STREAMING_ENABLED = os.getenv("LLM_STREAMING", "1").strip().lower() not in {"0", "false", "no"}
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+# The workflow points this at its `timings` dict; stages record into it.
+stage_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+
+def record_stage_timing(name: str, seconds: float) -> None:
+    timings = stage_timings.get()
+    if timings is not None:
+        timings[name] = seconds
+
+
+class ThinkStripper:
+    """
+    Drops `<think> ... </think>` sections from a token stream, including
+    tags split across chunks. `feed` returns only the visible text.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._in_think = False
+        self.text = ""
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        visible = []
+        while self._buffer:
+            tag = THINK_CLOSE if self._in_think else THINK_OPEN
+            pos = self._buffer.find(tag)
+            if pos >= 0:
+                if not self._in_think:
+                    visible.append(self._buffer[:pos])
+                self._buffer = self._buffer[pos + len(tag):]
+                self._in_think = not self._in_think
+                continue
+            # Keep a possible partial tag at the end for the next chunk
+            keep = 0
+            for size in range(min(len(tag) - 1, len(self._buffer)), 0, -1):
+                if tag.startswith(self._buffer[-size:]):
+                    keep = size
+                    break
+            if not self._in_think:
+                visible.append(self._buffer[: len(self._buffer) - keep])
+            self._buffer = self._buffer[len(self._buffer) - keep:]
+            break
+        out = "".join(visible)
+        self.text += out
+        return out
+
+    def flush(self) -> str:
+        out = "" if self._in_think else self._buffer
+        self._buffer = ""
+        self.text += out
+        return out
+
+
+class JsonObjectScanner:
+    """Yields each complete top-level `{...}` object seen in a character stream."""
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._current = []
+
+    def feed(self, text: str) -> Iterator[str]:
+        for ch in text:
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._current = [ch]
+                continue
+            self._current.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    yield "".join(self._current)
+                    self._current = []
+
+
+def _content(chunk: Any) -> str:
+    content = getattr(chunk, "content", chunk)
+    return content if isinstance(content, str) else ""
+
+
+async def arun_chain(provider: str, prompt, model, inputs, parser=None, stage: str = "llm"):
+    """
+    Run `prompt | model` and return the parsed result (or the text after any
+    think block when `parser` is None). With streaming enabled, tokens are
+    consumed as they arrive: think sections are skipped, JSON is parsed as
+    soon as one object is complete and the stream is closed right there;
+    for plain text the call ends at the end of the first non-empty line.
+    Records `ttfut_<stage>` (time to first useful token) in stage timings.
+    """
+    if not STREAMING_ENABLED:
+        chain = prompt | model | parser if parser is not None else prompt | model
+        result = await ainvoke_limited(provider, chain, inputs, stage)
+        if parser is None:
+            return _content(result).split(THINK_CLOSE, 1)[-1].strip()
+        return result
+
+    with llm_span(stage, model_label(model), provider) as span:
+        return await _arun_streaming(provider, prompt, model, inputs, parser, stage, span)
+
+
+async def _arun_streaming(provider: str, prompt, model, inputs, parser, stage: str, span):
+    start = time.time()
+    stripper = ThinkStripper()
+    scanner = JsonObjectScanner()
+    first_useful = False
+    # Token usage arrives with the provider's last chunk, which an early
+    # return never reads; the chunk count stands in for completion tokens
+    usage = None
+    chunks = 0
+
+    async with provider_limiter(provider):
+        stream = (prompt | model).astream(inputs)
+        try:
+            async for chunk in stream:
+                chunks += 1
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                visible = stripper.feed(_content(chunk))
+                if not visible:
+                    continue
+                if not first_useful and visible.strip():
+                    first_useful = True
+                    record_stage_timing(f"ttfut_{stage}", time.time() - start)
+
+                if parser is None:
+                    line = stripper.text.strip()
+                    if line and "\n" in line:
+                        return line.split("\n", 1)[0].strip()
+                    continue
+
+                for candidate in scanner.feed(visible):
+                    try:
+                        return parser.parse(candidate)
+                    except OutputParserException:
+                        continue
+        finally:
+            await stream.aclose()
+            record_stage_timing(f"stream_{stage}", time.time() - start)
+            record_tokens(stage, model_label(model), usage, estimated_completion=chunks)
+            span.set(**{"llm.chunks": chunks, "llm.early_stop": usage is None})
+
+    stripper.flush()
+    if parser is None:
+        return stripper.text.strip()
+    return parser.parse(stripper.text)
@@ -0,0 +1,394 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+
+load_dotenv()
+
+# ---------------------------
+# Config
+# ---------------------------
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "1").strip().lower() not in {"0", "false", "no", "off"}
+# JSON-lines file of finished traces in the OTLP/JSON layout (one
+# ExportTraceServiceRequest per line, as the OpenTelemetry Collector's
+# file exporter writes them); empty = no trace file
+TRACE_FILE = os.getenv("TRACE_FILE", "").strip()
+SERVICE_NAME = os.getenv("TELEMETRY_SERVICE_NAME", "property-advisor")
+METRICS_PREFIX = "property_advisor"
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROWS_BUCKETS = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+
+# =========================
+# Prometheus-style metrics
+# =========================
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str]):
+        self.name = f"{METRICS_PREFIX}_{name}"
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def _label_text(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                lines.extend(self._render_series(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def _render_series(self, key, value) -> List[str]:
+        return [f"{self.name}{self._label_text(key)} {_number(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str], buckets: Sequence[float]):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # per-bucket counts (non-cumulative), then count and sum
+                series = self._series[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += 1
+            series[2] += value
+
+    def _render_series(self, key, value) -> List[str]:
+        counts, count, total = value
+        lines, cumulative = [], 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = self._label_text(key, 'le="%s"' % _number(bound))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = self._label_text(key, 'le="+Inf"')
+        lines.append(f"{self.name}_bucket{labels} {count}")
+        lines.append(f"{self.name}_count{self._label_text(key)} {count}")
+        lines.append(f"{self.name}_sum{self._label_text(key)} {_number(total)}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+STAGE_SECONDS = Histogram("stage_seconds", "Duration of each workflow stage (span).", ["stage"], SECONDS_BUCKETS)
+WORKFLOW_SECONDS = Histogram(
+    "workflow_seconds", "End-to-end workflow duration by result type and path.", ["result_type", "path"], SECONDS_BUCKETS
+)
+LLM_TOKENS = Counter("llm_tokens_total", "LLM tokens by stage, model and type (prompt / completion).", ["stage", "model", "type"])
+LLM_TOKENS_ESTIMATED = Counter(
+    "llm_tokens_estimated_total",
+    "Completion tokens estimated from the chunk count of streams closed before the provider's usage report.",
+    ["stage", "model"],
+)
+LLM_CALLS = Counter("llm_calls_total", "LLM calls by stage, model and outcome.", ["stage", "model", "outcome"])
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache, entry kind and outcome (hit / miss).", ["cache", "kind", "outcome"])
+STAGE_ROWS = Histogram("stage_rows", "Candidate rows entering (in) and leaving (out) each filter stage.", ["stage", "point"], ROWS_BUCKETS)
+
+METRICS: List[_Metric] = [
+    STAGE_SECONDS, WORKFLOW_SECONDS, LLM_TOKENS, LLM_TOKENS_ESTIMATED, LLM_CALLS, CACHE_REQUESTS, STAGE_ROWS
+]
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format (for a /metrics endpoint)."""
+    lines: List[str] = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def record_cache(cache: str, kind: str, hit: bool) -> None:
+    if TELEMETRY_ENABLED:
+        CACHE_REQUESTS.inc(cache=cache, kind=kind, outcome="hit" if hit else "miss")
+        current = current_span()
+        if current is not None:
+            current.set(**{f"cache.{cache}": "hit" if hit else "miss"})
+
+
+def record_rows(stage: str, rows_in: int, rows_out: int) -> None:
+    """Row counts before / after a filter stage (histograms + attributes of the current span)."""
+    if TELEMETRY_ENABLED:
+        STAGE_ROWS.observe(rows_in, stage=stage, point="in")
+        STAGE_ROWS.observe(rows_out, stage=stage, point="out")
+        current = current_span()
+        if current is not None:
+            current.set(rows_in=rows_in, rows_out=rows_out)
+
+
+def record_workflow(result: Dict[str, Any], path: str, seconds: float) -> None:
+    if TELEMETRY_ENABLED:
+        WORKFLOW_SECONDS.observe(seconds, result_type=result.get("result_type", ""), path=path)
+
+
+# =========================
+# Spans / traces
+# =========================
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "root", "start", "end", "attributes", "error")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else ""
+        self.root = parent.root if parent is not None else self
+        self.start = time.time_ns()
+        self.end = 0
+        self.attributes = dict(attributes)
+        self.error = ""
+
+    @property
+    def seconds(self) -> float:
+        return ((self.end or time.time_ns()) - self.start) / 1e9
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items() if value is not None],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    elif isinstance(value, str):
+        typed = {"stringValue": value}
+    else:
+        typed = {"stringValue": json.dumps(value, default=str)}
+    return {"key": key, "value": typed}
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+# Spans of unfinished traces, and ids of recently exported ones (spans of
+# abandoned background work ending after their root are exported alone)
+_finished: Dict[str, List[Span]] = {}
+_exported: Dict[str, None] = {}
+_EXPORTED_KEEP = 1024
+_trace_lock = threading.Lock()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def set_root_attributes(**attributes: Any) -> None:
+    """Attributes of the trace's root span (e.g. which workflow path answered)."""
+    current = _current_span.get()
+    if current is not None:
+        current.root.set(**attributes)
+
+
+class _NoopSpan:
+    seconds = 0.0
+    attributes: Dict[str, Any] = {}
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+@contextmanager
+def span(
+    name: str,
+    timings: Optional[Dict[str, float]] = None,
+    timing_key: Optional[str] = None,
+    **attributes: Any,
+) -> Iterator[Span]:
+    """
+    Times a workflow stage as a child of the current span (a new trace when
+    there is none). Context variables follow asyncio tasks and
+    `asyncio.to_thread`, so stages started from inside a span nest under it.
+    On exit the duration goes to the `stage_seconds` histogram, to
+    `timings[timing_key or name]` when `timings` is given, and, once the
+    root span ends, the whole trace to TRACE_FILE.
+    """
+    if not TELEMETRY_ENABLED:
+        start = time.time()
+        try:
+            yield _NoopSpan()
+        finally:
+            if timings is not None:
+                timings[timing_key or name] = time.time() - start
+        return
+
+    parent = _current_span.get()
+    current = Span(name, parent, attributes)
+    _current_span.set(current)
+    try:
+        yield current
+    except GeneratorExit:
+        # A streaming consumer stopped early: not an error
+        current.set(closed_early=True)
+        raise
+    except BaseException as e:
+        current.error = repr(e)
+        raise
+    finally:
+        current.end = time.time_ns()
+        # Restore the parent by value: async generators may resume in
+        # another context than the one the span was opened in
+        _current_span.set(parent)
+        STAGE_SECONDS.observe(current.seconds, stage=name)
+        if timings is not None:
+            timings[timing_key or name] = current.seconds
+        if TRACE_FILE:
+            _finish(current)
+
+
+def _finish(current: Span) -> None:
+    with _trace_lock:
+        if current.trace_id in _exported:
+            spans = [current]
+        else:
+            spans = _finished.setdefault(current.trace_id, [])
+            spans.append(current)
+            if current.parent_id:
+                return
+            del _finished[current.trace_id]
+            _exported[current.trace_id] = None
+            if len(_exported) > _EXPORTED_KEEP:
+                del _exported[next(iter(_exported))]
+    export = {
+        "resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{
+                "scope": {"name": "property_advisor.telemetry"},
+                "spans": [s.to_otlp() for s in sorted(spans, key=lambda s: s.start)],
+            }],
+        }]
+    }
+    try:
+        line = json.dumps(export, default=str)
+        with _trace_lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError as e:
+        print(f"[WARN] Trace export failed: {e!r}")
+
+
+# =========================
+# LLM calls
+# =========================
+
+def record_tokens(stage: str, model: str, usage: Optional[Dict[str, Any]], estimated_completion: int = 0) -> None:
+    """
+    Token counts of one LLM call from LangChain `usage_metadata`. Streams
+    closed before the provider's final usage chunk only know how many
+    chunks arrived: that count goes to `llm_tokens_estimated_total`, so
+    `llm_tokens_total` only holds provider-reported counts.
+    """
+    if not TELEMETRY_ENABLED:
+        return
+    current = current_span()
+    if usage:
+        prompt_tokens = int(usage.get("input_tokens") or 0)
+        completion_tokens = int(usage.get("output_tokens") or 0)
+        estimated = False
+    else:
+        prompt_tokens, completion_tokens, estimated = 0, estimated_completion, True
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, stage=stage, model=model, type="prompt")
+    if completion_tokens and estimated:
+        LLM_TOKENS_ESTIMATED.inc(completion_tokens, stage=stage, model=model)
+    elif completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, stage=stage, model=model, type="completion")
+    if current is not None:
+        current.set(
+            **{
+                "llm.prompt_tokens": prompt_tokens,
+                "llm.completion_tokens": completion_tokens,
+                "llm.tokens_estimated": estimated,
+            }
+        )
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Sums `usage_metadata` over the LLM calls of a (batched) chain run."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.usage: Dict[str, int] = {}
+        self.calls = 0
+
+    def on_llm_end(self, response, **kwargs: Any) -> None:
+        self.calls += 1
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                for key in ("input_tokens", "output_tokens"):
+                    self.usage[key] = self.usage.get(key, 0) + int(usage.get(key) or 0)
+
+
+@contextmanager
+def llm_span(stage: str, model: str, provider: str) -> Iterator[Span]:
+    """Span `llm.<stage>` around one LLM call (or batch), counted in `llm_calls_total`."""
+    outcome = "ok"
+    with span(f"llm.{stage}", **{"llm.model": model, "llm.provider": provider}) as current:
+        try:
+            yield current
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            if TELEMETRY_ENABLED:
+                LLM_CALLS.inc(stage=stage, model=model, outcome=outcome)
+
+
+def model_label(model: Any) -> str:
+    return str(getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__)
@@ -0,0 +1,80 @@
+import os
+import sys
+
+# Tests never call a provider or write the on-disk caches
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ["LLM_CACHE_ENABLED"] = "0"
+os.environ["SEMANTIC_CACHE_ENABLED"] = "0"
+os.environ["TRACE_FILE"] = ""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+
+CITIES = ["Gurgaon", "Mohali", "Delhi", "Noida"]
+FACINGS = ["East", "West", "North-East", "South"]
+AREA_TYPES = ["Carpet", "Built Up", "Super Built up"]
+
+
+def make_listings(n: int, seed: int = 0) -> pd.DataFrame:
+    """Synthetic listings with the dataset's filterable columns (and some missing values)."""
+    rng = np.random.default_rng(seed)
+    total = rng.integers(1, 30, n)
+    frame = pd.DataFrame({
+        "property_id": [f"P{i}" for i in range(n)],
+        "property_name": [f"Property {i}" for i in range(n)],
+        "Price_in_Crore": np.round(rng.uniform(0.2, 6.0, n), 2),
+        "Area_in_sq_meter": np.round(rng.uniform(40, 400, n), 1),
+        "bedRoom": rng.integers(1, 6, n).astype(float),
+        "bathroom": rng.integers(1, 5, n).astype(float),
+        "floorNum": np.minimum(rng.integers(0, 30, n), total).astype(float),
+        "Totalfloor": total.astype(float),
+        "City": rng.choice(CITIES + [" gurgaon "], n),
+        "facing": rng.choice(FACINGS, n).astype(object),
+        "AreaType": rng.choice(AREA_TYPES, n),
+    })
+    frame.loc[rng.random(n) < 0.1, "Price_in_Crore"] = np.nan
+    frame.loc[rng.random(n) < 0.1, "facing"] = None
+    return frame
+
+
+def random_query(rng: np.random.Generator):
+    """(fields, search_data, filter_on_columns) over a random subset of the filterable columns."""
+    from models import FacingDirection, FieldToSearch
+
+    fields = {name: False for name in FieldToSearch.model_fields}
+    search_data, comparators = {}, {}
+    if rng.random() < 0.6:
+        fields["Price_in_Crore"] = True
+        if rng.random() < 0.3:
+            search_data["Price_in_Crore"] = sorted(np.round(rng.uniform(0.2, 6.0, 2), 2).tolist())
+        else:
+            search_data["Price_in_Crore"] = round(float(rng.uniform(0.2, 6.0)), 2)
+            comparators["Price_in_Crore"] = rng.choice(["Greater than", "Lesser than"])
+    if rng.random() < 0.5:
+        fields["bedRoom"] = True
+        search_data["bedRoom"] = int(rng.integers(1, 6)) if rng.random() < 0.7 else [2, 4]
+    if rng.random() < 0.3:
+        fields["Area_in_sq_meter"] = True
+        search_data["Area_in_sq_meter"] = float(rng.integers(40, 400))
+        comparators["Area_in_sq_meter"] = "Greater than"
+    if rng.random() < 0.5:
+        fields["City"] = True
+        cities = list(rng.choice(CITIES, int(rng.integers(1, 3)), replace=False))
+        search_data["City"] = [c.upper() for c in cities] if rng.random() < 0.5 else cities[0]
+    if rng.random() < 0.4:
+        fields["facing"] = True
+        search_data["facing"] = FacingDirection(rng.choice(FACINGS))
+    if rng.random() < 0.3:
+        fields["AreaType"] = True
+        search_data["AreaType"] = rng.choice(AREA_TYPES)
+    if rng.random() < 0.2:
+        fields["top_floor"] = True
+    return fields, search_data, comparators
+
+
+@pytest.fixture
+def listings() -> pd.DataFrame:
+    return make_listings(400)
@@ -0,0 +1,69 @@
+import zlib
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from ann_index import FAISS_AVAILABLE, AnnIndex, load_or_build_ann
+from local_retriever import LocalHybridIndex, LocalHybridSearchRetriever
+
+pytestmark = pytest.mark.skipif(not FAISS_AVAILABLE, reason="faiss not installed")
+
+KINDS = [("hnsw", {}), ("ivfpq", {"pq_m": 8})]
+
+
+class HashEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        vector = np.random.default_rng(zlib.crc32(text.encode())).normal(size=16)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+
+class NoSparse:
+    def encode_documents(self, texts):
+        return [{"indices": [], "values": []} for _ in texts]
+
+    def encode_queries(self, text):
+        return {"indices": [], "values": []}
+
+
+def _vectors(n):
+    return np.asarray(HashEmbeddings().embed_documents([f"listing {i}" for i in range(n)]), dtype=np.float32)
+
+
+@pytest.mark.parametrize("kind, params", KINDS)
+def test_saved_index_is_mapped_and_reloaded_to_add_rows(tmp_path, kind, params):
+    vectors = _vectors(1200)
+    load_or_build_ann(str(tmp_path), vectors[:1000], kind, params)
+
+    ann = load_or_build_ann(str(tmp_path), vectors, kind, params)
+    assert ann.ntotal == 1200
+    assert 1100 in ann.search(vectors[1100], 10)[1]
+    reloaded = AnnIndex.load(str(tmp_path))
+    assert reloaded.ntotal == 1200 and reloaded._mapped_path is not None
+
+
+@pytest.mark.parametrize("kind, params", KINDS)
+def test_add_texts_on_a_mapped_index(tmp_path, kind, params):
+    texts = [f"listing {i}" for i in range(1000)]
+    index = LocalHybridIndex.build(texts, HashEmbeddings(), NoSparse(), texts)
+    load_or_build_ann(str(tmp_path), index.dense, kind, params)
+    index.attach_ann(AnnIndex.load(str(tmp_path)), candidates=50)
+    retriever = LocalHybridSearchRetriever(
+        embeddings=HashEmbeddings(), sparse_encoder=NoSparse(), index=index, alpha=1.0, top_k=1
+    )
+
+    retriever.add_texts(["listing new"], ids=["new"])
+    assert retriever.index.ann.ntotal == 1001
+    assert retriever.invoke("listing new")[0].page_content == "listing new"
+
+
+def test_remove_on_a_mapped_ivfpq_index(tmp_path):
+    vectors = _vectors(1000)
+    AnnIndex.build(vectors, "ivfpq", {"pq_m": 8}).save(str(tmp_path))
+    ann = AnnIndex.load(str(tmp_path))
+    assert ann.remove(np.arange(10))
+    assert ann.ntotal == 990
+    assert ann._mapped_path is None
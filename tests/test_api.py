@@ -0,0 +1,95 @@
+import asyncio
+import itertools
+
+import pandas as pd
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+import extraction_agent
+import llm_models
+from api import _payload
+from llm_models import ProviderLimiter
+from models import ApplyFilterToColumn, CombinedExtraction, FieldToSearch, Intent, SearchData
+from ranking import rank_results
+
+EXTRACTION = CombinedExtraction(
+    intent=Intent(Greeting=False, Property_Related=True, Farewell=False, Other=False),
+    fields=FieldToSearch(**{name: False for name in FieldToSearch.model_fields}),
+    search_data=SearchData(),
+    filter_on_columns=ApplyFilterToColumn(),
+    hybrid_query="No_User_Query",
+)
+
+
+class SlowStreamingModel(GenericFakeChatModel):
+    """Streams word by word with a pause, recording the limiter's load and the chunks read."""
+    limiter: ProviderLimiter
+    peaks: list = []
+    chunks_read: list = []
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for chunk in self._stream(messages, stop=stop, **kwargs):
+            await asyncio.sleep(0.005)
+            self.peaks.append(self.limiter.in_use)
+            self.chunks_read.append(chunk)
+            yield chunk
+
+
+def test_extractions_go_through_the_limiter_and_stop_early(monkeypatch):
+    limiter = ProviderLimiter(2)
+    monkeypatch.setitem(llm_models._limiters, "groq", limiter)
+    reply = "<think>plan</think> " + EXTRACTION.model_dump_json() + " and then a long useless epilogue " * 5
+    model = SlowStreamingModel(
+        messages=itertools.cycle([AIMessage(content=reply), AIMessage(content="not json at all")]),
+        limiter=limiter,
+    )
+    monkeypatch.setattr(extraction_agent, "get_llama_model", lambda: model)
+
+    async def extract_all(queries):
+        return await asyncio.gather(*(extraction_agent.arun_extraction(q) for q in queries), return_exceptions=True)
+
+    results = asyncio.run(extract_all(["q1", "q2", "q3", "q4"]))
+
+    assert [type(r).__name__ for r in results] == [
+        "CombinedExtraction", "OutputParserException", "CombinedExtraction", "OutputParserException"
+    ]
+    assert results[0] == EXTRACTION
+    assert max(model.peaks) == 2 and limiter.in_use == 0
+    # The epilogue after the JSON object is never read
+    assert not any("epilogue" in chunk.message.content for chunk in model.chunks_read)
+
+
+def test_payload_reports_scores_and_total_matches():
+    frame = pd.DataFrame({
+        "property_id": ["P0", "P1", "P2", "P3"],
+        "Price_in_Crore": [2.1, 1.5, 1.9, 1.0],
+    })
+    ranked, total = rank_results(
+        frame, {"Price_in_Crore": True}, {"Price_in_Crore": 2.0}, {"Price_in_Crore": "Lesser than"},
+        {"P0": 0.9, "P1": 0.5, "P2": 0.7, "P3": 0.1}, top_k=3,
+    )
+    payload = _payload({"result_type": "property", "final_df": ranked, "total_matches": total, "timings": {"a": 0.123456},
+                        "hybrid_result": [f"P{i}" for i in range(1000)]}, 2)
+
+    assert payload["count"] == 2 and payload["total_matches"] == 4
+    assert [row["property_id"] for row in payload["rows"]] == ["P2", "P1"]
+    assert "relevance_score" not in payload["rows"][0]
+    assert [s["property_id"] for s in payload["scores"]] == ["P2", "P1"]
+    assert set(payload["scores"][0]) == {"property_id", "relevance_score", "constraint_score", "hybrid_score", "exact_match"}
+    assert payload["scores"][0]["exact_match"] is True
+    assert payload["timings"] == {"a": 0.1235}
+    # Capped at the requested rows, not the whole hybrid candidate list
+    assert payload["hybrid_ids"] == ["P0", "P1"]
+
+
+def test_payload_of_partial_and_empty_results():
+    partial = _payload({"result_type": "property", "partial": True, "final_df": pd.DataFrame({"property_id": ["P0"]}),
+                        "total_matches": 1, "stage": "fields"}, 10)
+    assert partial["scores"] == [] and partial["count"] == 1 and partial["stage"] == "fields"
+    assert "search_data" not in partial
+
+    empty = _payload({"result_type": "property", "final_df": None}, 10)
+    assert (empty["rows"], empty["scores"], empty["count"], empty["total_matches"]) == ([], [], 0, 0)
+
+    chat = _payload({"result_type": "chat", "result": "Hello!"}, 10)
+    assert chat["result"] == "Hello!" and "rows" not in chat
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+import bm25_store
+import hybrid_search
+from bm25_store import load_bm25_artifact, read_manifest, record_bm25_version, recorded_bm25_version, save_bm25
+
+CORPUS = ["3 bhk flat near metro", "villa with garden", "studio apartment"]
+
+
+class FakeEncoder:
+    def __init__(self, params=None):
+        self.params = params or {"avgdl": 3.0, "n_docs": len(CORPUS)}
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.params, f)
+
+
+@pytest.fixture
+def bm25_dirs(tmp_path, monkeypatch):
+    """Artifact and manifest directories in tmp, a fresh `load_bm25` and hybrid deps reported present."""
+    dirs = {"bm25": str(tmp_path / "bm25"), "local": str(tmp_path / "local"), "pinecone": str(tmp_path / "pinecone")}
+    monkeypatch.setattr(bm25_store, "BM25_DIR", dirs["bm25"])
+    monkeypatch.setattr(hybrid_search, "LOCAL_INDEX_DIR", dirs["local"])
+    monkeypatch.setattr(hybrid_search, "PINECONE_MANIFEST_DIR", dirs["pinecone"])
+    monkeypatch.setattr(hybrid_search, "HYBRID_AVAILABLE", True)
+    monkeypatch.setattr(bm25_store, "fit_bm25", lambda corpus: pytest.fail("BM25 refitted at query time"))
+    hybrid_search.load_bm25.cache_clear()
+    yield dirs
+    hybrid_search.load_bm25.cache_clear()
+
+
+def test_manifest_versions_the_params(tmp_path):
+    manifest = save_bm25(FakeEncoder(), CORPUS, str(tmp_path))
+    assert read_manifest(str(tmp_path)) == manifest
+    assert manifest["n_docs"] == len(CORPUS)
+    # Another fit gives another version
+    assert save_bm25(FakeEncoder({"avgdl": 4.0}), CORPUS, str(tmp_path / "other"))["version"] != manifest["version"]
+
+
+def test_mismatched_or_modified_artifact_is_rejected(tmp_path):
+    manifest = save_bm25(FakeEncoder(), CORPUS, str(tmp_path))
+    assert load_bm25_artifact(str(tmp_path), expected_version="0" * 16) is None
+
+    with open(tmp_path / bm25_store.PARAMS_FILE, "a", encoding="utf-8") as f:
+        f.write(" ")
+    assert load_bm25_artifact(str(tmp_path), expected_version=manifest["version"]) is None
+
+
+def test_recorded_version_round_trip(tmp_path):
+    assert recorded_bm25_version(str(tmp_path)) is None
+    record_bm25_version(str(tmp_path / "index"), "abc123")
+    assert recorded_bm25_version(str(tmp_path / "index")) == "abc123"
+
+
+@pytest.mark.parametrize("backend, directory", [("local", "LOCAL_INDEX_DIR"), ("pinecone", "PINECONE_MANIFEST_DIR")])
+def test_each_backend_has_a_manifest_dir(monkeypatch, backend, directory):
+    monkeypatch.setattr(hybrid_search, "RETRIEVER_BACKEND", backend)
+    assert hybrid_search.index_manifest_dir() == getattr(hybrid_search, directory)
+
+
+@pytest.mark.parametrize("backend", ["pinecone", "local"])
+def test_load_bm25_refuses_an_artifact_of_another_version(bm25_dirs, monkeypatch, backend):
+    monkeypatch.setattr(hybrid_search, "RETRIEVER_BACKEND", backend)
+    save_bm25(FakeEncoder(), CORPUS, bm25_dirs["bm25"])
+    record_bm25_version(bm25_dirs[backend], "0" * 16)
+    with pytest.raises(RuntimeError, match="re-sync"):
+        hybrid_search.load_bm25()
+
+
+def test_load_bm25_needs_an_artifact_for_pinecone(bm25_dirs, monkeypatch):
+    monkeypatch.setattr(hybrid_search, "RETRIEVER_BACKEND", "pinecone")
+    with pytest.raises(RuntimeError, match="--target pinecone"):
+        hybrid_search.load_bm25()
+
+
+def test_load_bm25_fits_only_for_a_new_local_index(bm25_dirs, monkeypatch):
+    monkeypatch.setattr(hybrid_search, "RETRIEVER_BACKEND", "local")
+    monkeypatch.setattr(bm25_store, "fit_bm25", lambda corpus: FakeEncoder())
+    monkeypatch.setattr(
+        hybrid_search, "load_docs", lambda: [type("Doc", (), {"page_content": text}) for text in CORPUS]
+    )
+    assert isinstance(hybrid_search.load_bm25(), FakeEncoder)
+    assert read_manifest(bm25_dirs["bm25"])["corpus_fingerprint"] == bm25_store.corpus_fingerprint(CORPUS)
+
+
+def test_artifact_round_trip_with_pinecone_text(tmp_path):
+    pytest.importorskip("pinecone_text")
+    encoder = bm25_store.fit_bm25(CORPUS)
+    manifest = save_bm25(encoder, CORPUS, str(tmp_path))
+    loaded, loaded_manifest = load_bm25_artifact(str(tmp_path), expected_version=manifest["version"])
+    assert loaded_manifest == manifest
+    assert loaded.encode_queries("villa") == encoder.encode_queries("villa")
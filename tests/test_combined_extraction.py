@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+import workflow
+from csv_agent import run_csv_agent
+from models import ApplyFilterToColumn, CombinedExtraction, FieldToSearch, Intent, SearchData
+from parser_and_prompts import combined_parser
+
+
+def _intent(label: str) -> Intent:
+    return Intent(**{name: name == label for name in Intent.model_fields})
+
+
+def _extraction(label: str = "Property_Related") -> CombinedExtraction:
+    fields = {name: False for name in FieldToSearch.model_fields}
+    fields.update(City=True, Price_in_Crore=True)
+    return CombinedExtraction(
+        intent=_intent(label),
+        fields=FieldToSearch(**fields),
+        search_data=SearchData(City="Gurgaon", Price_in_Crore=2.0),
+        filter_on_columns=ApplyFilterToColumn(Price_in_Crore="Lesser than"),
+        hybrid_query="No_User_Query",
+    )
+
+
+@pytest.fixture
+def offline_workflow(monkeypatch):
+    """No retriever, no multi-call chains: any LLM chain call fails the test."""
+    async def forbidden(*args, **kwargs):
+        raise AssertionError("multi-call chain invoked in combined mode")
+
+    monkeypatch.setattr(workflow, "warm_retriever", lambda: None)
+    monkeypatch.setitem(workflow._retriever_status, "state", "unavailable")
+    for name in ("afind_intent", "afield_to_set_agent", "aquery_maker_hybrid", "aintent_response_agent"):
+        monkeypatch.setattr(workflow, name, forbidden)
+
+
+def test_combined_parser_round_trips_extraction():
+    extraction = _extraction()
+    assert combined_parser.parse(extraction.model_dump_json()) == extraction
+
+
+def test_combined_mode_makes_one_extraction_call(offline_workflow, listings):
+    calls = []
+
+    async def extractor(user_query):
+        calls.append(user_query)
+        return _extraction()
+
+    query = "cozy family home close to the metro in Gurgaon"
+    result = asyncio.run(workflow.async_workflow(query, listings, extraction_mode="combined", combined_extractor=extractor))
+
+    assert calls == [query]
+    assert result["result_type"] == "property"
+    extraction = _extraction()
+    expected = run_csv_agent(
+        extraction.fields.model_dump(), listings, extraction.search_data.model_dump(exclude_none=True), extraction.filter_on_columns
+    )
+    final_df = result["final_df"]
+    # Exact matches first, then near misses kept by the relaxed price bound
+    assert set(final_df.loc[final_df["exact_match"], "property_id"]) == set(expected["property_id"])
+    assert final_df["exact_match"].is_monotonic_decreasing
+    assert "combined_extraction" in result["timings"]
+
+
+def test_combined_mode_routes_chit_chat_to_template(offline_workflow, listings):
+    async def extractor(user_query):
+        return _extraction("Greeting")
+
+    result = asyncio.run(workflow.async_workflow("what's up", listings, extraction_mode="combined", combined_extractor=extractor))
+    assert result["result_type"] == "chat"
+    assert isinstance(result["result"], str) and result["result"]
@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from csv_agent import _normalize_series_str, _numeric_values, filter_dataframe_manual
+from dataset_store import PropertyDataset, _read_descriptions, build_store, read_store
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DESCRIPTION_CSV = os.path.join(ROOT, "dataset", "Description.csv")
+
+
+def _csvloader_texts(path):
+    pytest.importorskip("langchain_community")
+    from langchain_community.document_loaders import CSVLoader
+
+    docs = CSVLoader(file_path=path, metadata_columns=["property_id"]).load()
+    return [(doc.metadata["property_id"], doc.page_content) for doc in docs]
+
+
+def test_doc_text_matches_csvloader_page_content():
+    expected = _csvloader_texts(DESCRIPTION_CSV)
+    frame = _read_descriptions(DESCRIPTION_CSV)
+    assert list(zip(frame["property_id"], frame["doc_text"])) == expected
+
+
+def test_doc_text_matches_csvloader_on_awkward_cells(tmp_path):
+    path = tmp_path / "descriptions.csv"
+    path.write_text(
+        ",property_id,Description, Extra \n"
+        '0,P1,"  line one\nline two, with comma  ", x \n'
+        '1,P2,"quoted ""word""",\n'
+        "2,P3,,\n",
+        encoding="utf-8",
+    )
+    frame = _read_descriptions(str(path))
+    assert list(zip(frame["property_id"], frame["doc_text"])) == _csvloader_texts(str(path))
+    assert frame["description"].tolist() == ["line one\nline two, with comma", 'quoted "word"', ""]
+
+
+@pytest.fixture
+def store(tmp_path):
+    listings = pd.DataFrame({
+        "Unnamed: 0": [0, 1, 2],
+        "property_id": ["P1", "P2", "P3"],
+        "Price_in_Crore": [1.2, 0.3, None],
+        "bedRoom": [3, None, 2],
+        "City": ["Mohali", "Delhi", "Mohali"],
+        "additionalRoom": ["['Pooja Room', 'Study Room']", None, "Servant Room"],
+    })
+    listings_csv = tmp_path / "listings.csv"
+    listings.to_csv(listings_csv, index=False)
+    descriptions_csv = tmp_path / "descriptions.csv"
+    descriptions_csv.write_text(",property_id,Description\n0,P1,Sunny\n1,P9,Orphan\n", encoding="utf-8")
+    return build_store(str(listings_csv), str(descriptions_csv), str(tmp_path / "store.parquet"))
+
+
+def test_store_schema(store):
+    frame = read_store(path=store)
+    assert "Unnamed: 0" not in frame.columns
+    assert frame["Price_in_Crore"].dtype == np.float32
+    assert str(frame["bedRoom"].dtype) == "Int16"
+    assert isinstance(frame["City"].dtype, pd.CategoricalDtype)
+    assert isinstance(frame["additionalRoom"].dtype, pd.ArrowDtype)
+    assert frame["additionalRoom"].iloc[0] == ["Pooja Room", "Study Room"]
+    # Descriptions without a listing are kept for the hybrid index, flagged as non-listings
+    assert frame.loc[~frame["is_listing"], "property_id"].tolist() == ["P9"]
+
+
+def test_float32_values_are_widened_through_their_decimal_form(store):
+    prices = read_store(["Price_in_Crore"], path=store)["Price_in_Crore"]
+    assert float(prices.iloc[0]) != 1.2  # the raw float32 widening
+    values = _numeric_values(prices)
+    assert values[0] == 1.2 and values[1] == 0.3 and np.isnan(values[2])
+
+    frame = read_store(["property_id", "Price_in_Crore"], path=store)
+    exact = filter_dataframe_manual(frame, {"Price_in_Crore": True}, {"Price_in_Crore": 1.2}, {})
+    assert exact["property_id"].tolist() == ["P1"]
+
+
+def test_arrow_list_columns_compare_as_their_csv_form(store):
+    rooms = read_store(["additionalRoom"], path=store)["additionalRoom"]
+    # Missing cells are masked by the callers (`.where(notna)`); only present ones matter
+    assert _normalize_series_str(rooms).tolist()[::2] == ["pooja room,study room", "servant room"]
+    as_objects = pd.Series([["Pooja Room", "Study Room"], None, ["Servant Room"]], dtype=object)
+    assert _normalize_series_str(as_objects).tolist()[::2] == ["pooja room,study room", "servant room"]
+
+    frame = read_store(["property_id", "additionalRoom", "is_listing"], path=store)
+    frame = frame[frame["is_listing"]]
+    match = filter_dataframe_manual(frame, {"additionalRoom": True}, {"additionalRoom": "Servant Room"}, {})
+    assert match["property_id"].tolist() == ["P3"]
+
+
+def test_property_dataset_lookups(store):
+    frame = read_store(path=store)
+    listings = frame[frame["is_listing"]].reset_index(drop=True)
+    dataset = PropertyDataset(listings, frame[["property_id", "description"]])
+    assert len(dataset) == 3
+    assert dataset.description("P1") == "Sunny" and dataset.description("P2") == ""
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from inflight_dedup import InflightDeduplicator
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_each_key_is_dispatched_at_once():
+    calls = []
+
+    async def double(item):
+        calls.append(item)
+        return item * 2
+
+    async def main():
+        dedup = InflightDeduplicator(double)
+        first = asyncio.ensure_future(dedup.submit(1))
+        # The call starts on the next loop iteration, not after a batching window
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        started = list(calls)
+        results = await asyncio.gather(first, *(dedup.submit(i) for i in range(2, 5)))
+        return started, results, dedup.stats
+
+    started, results, stats = run(main())
+    assert started == [1]
+    assert results == [2, 4, 6, 8]
+    assert stats == {"items": 4, "deduplicated": 0, "calls": 4}
+
+
+def test_identical_keys_are_deduplicated():
+    calls = []
+
+    async def upper(item):
+        calls.append(item)
+        await asyncio.sleep(0.01)
+        return item.upper()
+
+    async def main():
+        dedup = InflightDeduplicator(upper, key=str.lower)
+        results = await asyncio.gather(dedup.submit("Hi"), dedup.submit("hi"), dedup.submit("yo"))
+        return results, dedup.stats, dict(dedup._inflight)
+
+    results, stats, inflight = run(main())
+    assert results == ["HI", "HI", "YO"]
+    assert calls == ["Hi", "yo"]
+    assert stats["deduplicated"] == 1
+    assert inflight == {}
+
+
+def test_failures_are_shared_and_free_the_key():
+    calls = []
+
+    async def flaky(item):
+        calls.append(item)
+        await asyncio.sleep(0.01)
+        if len(calls) <= 1:
+            raise RuntimeError("provider down")
+        return item
+
+    async def main():
+        dedup = InflightDeduplicator(flaky)
+        first = await asyncio.gather(dedup.submit("q"), dedup.submit("q"), return_exceptions=True)
+        # Key is free again: a retry is a new call, not a stale shared failure
+        second = await dedup.submit("q")
+        return first, second
+
+    first, second = run(main())
+    assert all(isinstance(r, RuntimeError) for r in first)
+    assert second == "q" and calls == ["q", "q"]
+
+
+def test_cancelled_call_fails_waiters_and_frees_the_key():
+    async def main():
+        gate = asyncio.Event()
+
+        async def slow(item):
+            gate.set()
+            await asyncio.sleep(60)
+            return item
+
+        dedup = InflightDeduplicator(slow)
+        waiters = [asyncio.create_task(dedup.submit("a")) for _ in range(2)]
+        await gate.wait()
+        for task in list(dedup._tasks):
+            task.cancel()
+        results = await asyncio.wait_for(asyncio.gather(*waiters, return_exceptions=True), timeout=1)
+        return results, dict(dedup._inflight)
+
+    results, inflight = run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert inflight == {}
+
+
+def test_one_caller_giving_up_does_not_cancel_the_others():
+    async def slowish(item):
+        await asyncio.sleep(0.05)
+        return item
+
+    async def main():
+        dedup = InflightDeduplicator(slowish)
+        impatient = asyncio.create_task(dedup.submit("q"))
+        patient = asyncio.create_task(dedup.submit("q"))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return await patient
+
+    assert run(main()) == "q"
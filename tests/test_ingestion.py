@@ -0,0 +1,157 @@
+import pytest
+
+import embedding_backends
+import pinecone_add_document_retriever as ingestion
+from pinecone_add_document_retriever import plan
+
+
+def _row(pid, text="text", city="Delhi"):
+    metadata = {"property_id": pid, "City": city}
+    return {
+        "id": pid,
+        "text": text,
+        "metadata": metadata,
+        "text_hash": ingestion._digest(text),
+        "meta_hash": ingestion._digest(city),
+    }
+
+
+def _hashes(rows):
+    return {row["id"]: [row["text_hash"], row["meta_hash"]] for row in rows}
+
+
+def test_plan_classifies_added_changed_and_removed_rows():
+    previous = [_row("a"), _row("b"), _row("c"), _row("d")]
+    current = [
+        _row("a"),                      # unchanged
+        _row("b", text="new text"),     # text changed -> re-embed
+        _row("c", city="Mohali"),       # metadata only -> update
+        _row("e"),                      # new -> embed
+    ]                                   # "d" removed -> delete
+    embed, update, removed = plan(current, _hashes(previous))
+    assert [r["id"] for r in embed] == ["b", "e"]
+    assert [r["id"] for r in update] == ["c"]
+    assert removed == ["d"]
+
+
+def test_plan_on_empty_state_embeds_everything():
+    rows = [_row("a"), _row("b")]
+    assert plan(rows, {}) == (rows, [], [])
+    assert plan(rows, _hashes(rows)) == ([], [], [])
+
+
+class FakeSink:
+    """Records every call; `fail_after` upserts raise (a crash mid-run)."""
+    instances = []
+
+    def __init__(self, fail_after=None):
+        self.upserted, self.updated, self.deleted, self.flushed = [], [], [], []
+        self.fail_after = fail_after
+        FakeSink.instances.append(self)
+
+    def reset(self):
+        pass
+
+    def upsert(self, rows, dense, sparse):
+        if self.fail_after is not None and len(self.upserted) >= self.fail_after:
+            raise RuntimeError("connection lost")
+        assert len(rows) == len(dense) == len(sparse)
+        self.upserted.append([row["id"] for row in rows])
+
+    def update_metadata(self, rows):
+        self.updated.extend(row["id"] for row in rows)
+
+    def delete(self, ids):
+        self.deleted.extend(ids)
+
+    def flush(self, bm25_version):
+        self.flushed.append(bm25_version)
+
+    def close(self):
+        pass
+
+
+class FakeEmbeddings:
+    calls = []
+
+    def embed_documents(self, texts):
+        FakeEmbeddings.calls.append(len(texts))
+        return [[float(len(t))] for t in texts]
+
+
+class FakeBM25:
+    def encode_documents(self, texts):
+        return [{"indices": [0], "values": [1.0]} for _ in texts]
+
+
+@pytest.fixture
+def ingest_env(monkeypatch, tmp_path):
+    rows = [_row(f"p{i}", text=f"text {i}") for i in range(10)]
+    state = {"rows": rows, "sink": {}}
+    monkeypatch.setattr(ingestion, "dataset_rows", lambda: state["rows"])
+    monkeypatch.setattr(ingestion, "frozen_bm25", lambda rows, refit: (FakeBM25(), "v1"))
+    monkeypatch.setattr(ingestion, "LocalTarget", lambda: FakeSink(**state["sink"]))
+    monkeypatch.setattr(embedding_backends, "make_embeddings", lambda backend=None: FakeEmbeddings())
+    FakeSink.instances = []
+    FakeEmbeddings.calls = []
+    state["path"] = str(tmp_path / "state.json")
+    return state
+
+
+def _ingest(env, **kwargs):
+    return ingestion.ingest(target="local", batch_size=3, checkpoint_every=1, state_path=env["path"], **kwargs)
+
+
+def test_rerun_only_applies_changes(ingest_env):
+    counts = _ingest(ingest_env)
+    assert counts["embedded"] == 10
+    assert sum(FakeSink.instances[0].upserted, []) == [f"p{i}" for i in range(10)]
+
+    assert _ingest(ingest_env) == {"embedded": 0, "metadata_updated": 0, "deleted": 0, "unchanged": 10}
+    assert len(FakeSink.instances) == 1  # nothing to do: no sink opened
+
+    rows = ingest_env["rows"]
+    ingest_env["rows"] = [_row("p0", text="changed")] + [_row("p1", text="text 1", city="Mohali")] + rows[2:9]
+    counts = _ingest(ingest_env)
+    assert counts == {"embedded": 1, "metadata_updated": 1, "deleted": 1, "unchanged": 7}
+    sink = FakeSink.instances[-1]
+    assert sink.upserted == [["p0"]] and sink.updated == ["p1"] and sink.deleted == ["p9"]
+    assert sink.flushed and set(sink.flushed) == {"v1"}
+
+
+def test_interrupted_run_resumes_from_the_checkpoint(ingest_env):
+    ingest_env["sink"] = {"fail_after": 2}
+    with pytest.raises(RuntimeError):
+        _ingest(ingest_env)
+
+    ingest_env["sink"] = {}
+    counts = _ingest(ingest_env)
+    # The first two batches (6 rows) were checkpointed before the crash
+    assert counts["embedded"] == 4
+    assert sum(FakeSink.instances[-1].upserted, []) == [f"p{i}" for i in range(6, 10)]
+
+
+def test_dry_run_changes_nothing(ingest_env):
+    assert _ingest(ingest_env, dry_run=True)["embedded"] == 10
+    assert FakeSink.instances == []
+    assert _ingest(ingest_env, dry_run=True)["embedded"] == 10
+
+
+def test_rows_are_embedded_in_large_chunks_and_upserted_in_batches(ingest_env):
+    ingest_env["rows"] = [_row(f"p{i}", text=f"text {i}") for i in range(25)]
+    ingestion.ingest(target="local", batch_size=3, checkpoint_every=1, state_path=ingest_env["path"], embed_chunk=10)
+    # Chunks are rounded up to whole batches: 12 + 12 + 1
+    assert FakeEmbeddings.calls == [12, 12, 1]
+    assert [len(batch) for batch in FakeSink.instances[0].upserted] == [3] * 8 + [1]
+
+
+def test_default_chunk_reaches_the_worker_pool():
+    from embedding_backends import embedding_chunk_size
+
+    class Pooled:
+        pool_min_texts = 4 * 32 * 16
+
+    # Ingestion's default 64-row batches alone never reach pool_min_texts
+    assert embedding_chunk_size(Pooled(), 64) == 2048 >= Pooled.pool_min_texts
+    assert embedding_chunk_size(FakeEmbeddings(), 64) == 1024
+    assert embedding_chunk_size(FakeEmbeddings(), 64, chunk=100) == 128
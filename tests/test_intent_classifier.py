@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+import intent_classifier
+import workflow
+from intent_classifier import (
+    FAREWELL_REPLIES,
+    GREETING_REPLIES,
+    chitchat_label,
+    classify_intent,
+    is_chitchat,
+    is_property_likely,
+    templated_response,
+)
+from models import Intent
+
+
+@pytest.mark.parametrize(
+    "query, label",
+    [
+        ("hi", "Greeting"),
+        ("Hello there!", "Greeting"),
+        ("good morning", "Greeting"),
+        ("thanks, bye", "Farewell"),
+        ("thank you so much", "Farewell"),
+        ("ok thanks see you", "Farewell"),
+    ],
+)
+def test_chit_chat_is_recognized(query, label):
+    local = classify_intent(query)
+    assert (local.label, local.confidence) == (label, 1.0)
+    assert is_chitchat(local)
+    assert not is_property_likely(local)
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["hi, 3 bhk in delhi", "3 bhk flat in mohali under 1cr", "villa with a garden"],
+)
+def test_property_signal_wins_over_greeting(query):
+    local = classify_intent(query)
+    assert local.label == "Property_Related"
+    assert 0.5 <= local.confidence <= 1.0
+    assert not is_chitchat(local)
+    assert is_property_likely(local)
+
+
+@pytest.mark.parametrize("query", ["what is the capital of france", "hey can you help me"])
+def test_anything_else_is_left_to_the_llm(query):
+    local = classify_intent(query)
+    assert (local.label, local.confidence) == ("Unknown", 0.0)
+    assert not is_chitchat(local) and not is_property_likely(local)
+
+
+def test_templates_are_stable_per_message():
+    assert templated_response("Greeting", "hi") in GREETING_REPLIES
+    assert templated_response("Farewell", "bye") in FAREWELL_REPLIES
+    assert templated_response("Greeting", "hi") == templated_response("Greeting", "hi")
+
+
+def test_chitchat_label_of_llm_intent():
+    def intent(**flags):
+        return Intent(**{name: flags.get(name, False) for name in Intent.model_fields})
+
+    assert chitchat_label(intent(Greeting=True)) == "Greeting"
+    assert chitchat_label(intent(Farewell=True)) == "Farewell"
+    assert chitchat_label(intent(Greeting=True, Property_Related=True)) == ""
+    assert chitchat_label(intent(Other=True)) == ""
+
+
+def test_disabled_classifier_always_runs_extraction(monkeypatch):
+    monkeypatch.setattr(intent_classifier, "LOCAL_INTENT_ENABLED", False)
+    assert not is_chitchat(classify_intent("hi"))
+    assert is_property_likely(classify_intent("what is the capital of france"))
+
+
+def test_greeting_makes_no_llm_call(monkeypatch, listings):
+    async def forbidden(*args, **kwargs):
+        raise AssertionError("LLM chain invoked for a greeting")
+
+    for name in ("afind_intent", "afield_to_set_agent", "aquery_maker_hybrid", "aintent_response_agent", "aextract_all"):
+        monkeypatch.setattr(workflow, name, forbidden)
+
+    result = asyncio.run(workflow.async_workflow("thanks, bye", listings))
+    assert result["result_type"] == "chat"
+    assert result["result"] in FAREWELL_REPLIES
+
+
+def test_unknown_intent_waits_before_extracting(monkeypatch, listings):
+    calls = []
+
+    async def find_intent(user_query):
+        calls.append("intent")
+        return Intent(Greeting=False, Property_Related=False, Farewell=False, Other=True)
+
+    async def extraction(user_query):
+        raise AssertionError("field / hybrid extraction started for a non-property message")
+
+    async def respond(user_query):
+        calls.append("response")
+        return "Paris."
+
+    monkeypatch.setattr(workflow, "warm_retriever", lambda: None)
+    monkeypatch.setattr(workflow, "afind_intent", find_intent)
+    monkeypatch.setattr(workflow, "afield_to_set_agent", extraction)
+    monkeypatch.setattr(workflow, "aquery_maker_hybrid", extraction)
+    monkeypatch.setattr(workflow, "aintent_response_agent", respond)
+
+    result = asyncio.run(workflow.async_workflow("what is the capital of france", listings, extraction_mode="multi"))
+    assert result == {"result_type": "chat", "result": "Paris.", "timings": result["timings"]}
+    assert calls == ["intent", "response"]
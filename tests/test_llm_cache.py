@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+import llm_cache
+from llm_cache import LLMCache
+
+
+def _count(cache: LLMCache) -> int:
+    return cache._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+def test_eviction_runs_every_n_writes(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite"), ttl_seconds=0, max_entries=3, evict_every=4)
+    for i in range(7):
+        cache.set(f"k{i}", {"kind": "text", "data": i})
+    # Evicted after the 4th write only, then 3 more writes pile up until the next pass
+    assert _count(cache) == 6
+    cache.set("k7", {"kind": "text", "data": 7})
+    assert _count(cache) == 3
+    assert cache.get("k0") is None and cache.get("k7") == {"kind": "text", "data": 7}
+
+
+def test_expired_rows_are_dropped_on_open(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = LLMCache(path, ttl_seconds=60, max_entries=10)
+    cache.set("old", {"kind": "text", "data": "x"})
+    cache._conn.execute("UPDATE llm_cache SET created_at = created_at - 120")
+    assert _count(LLMCache(path, ttl_seconds=60, max_entries=10)) == 0
+
+
+def test_async_call_keeps_sqlite_off_the_event_loop(tmp_path, monkeypatch):
+    cache = LLMCache(str(tmp_path / "cache.sqlite"), ttl_seconds=0, max_entries=10)
+    threads = []
+    get, set_ = cache.get, cache.set
+
+    def recording(method):
+        def wrapper(*args):
+            threads.append(threading.current_thread())
+            return method(*args)
+        return wrapper
+
+    monkeypatch.setattr(cache, "get", recording(get))
+    monkeypatch.setattr(cache, "set", recording(set_))
+    monkeypatch.setattr(llm_cache, "CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_cache, "_cache", cache)
+
+    async def main():
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return "answer"
+
+        first = await llm_cache.acached_call("prompt", "model", "Hi there", compute)
+        second = await llm_cache.acached_call("prompt", "model", "hi there!", compute)
+        return first, second, calls, threading.current_thread()
+
+    first, second, calls, loop_thread = asyncio.run(main())
+    assert (first, second, calls) == ("answer", "answer", [1])
+    assert len(threads) == 3 and loop_thread not in threads
@@ -0,0 +1,77 @@
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+import hybrid_search
+from conftest import random_query
+from csv_agent import build_metadata_filter, filter_dataframe_manual, listing_metadata
+from local_retriever import LocalHybridIndex, LocalHybridSearchRetriever
+
+
+class FakeEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text):
+        vector = np.random.default_rng(len(text)).normal(size=4)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+
+class NoSparse:
+    def encode_documents(self, texts):
+        return [{"indices": [], "values": []} for _ in texts]
+
+    def encode_queries(self, text):
+        return {"indices": [], "values": []}
+
+
+def _retriever(listings, metadatas):
+    ids = listings["property_id"].tolist()
+    index = LocalHybridIndex.build([f"listing {pid}" for pid in ids], FakeEmbeddings(), NoSparse(), ids, metadatas)
+    return LocalHybridSearchRetriever(
+        embeddings=FakeEmbeddings(), sparse_encoder=NoSparse(), index=index, alpha=1.0, top_k=10
+    )
+
+
+def test_metadata_filter_matches_the_csv_filter(listings):
+    index = LocalHybridIndex.build(
+        listings["property_id"].tolist(), FakeEmbeddings(), NoSparse(),
+        listings["property_id"].tolist(), listing_metadata(listings),
+    )
+    rng = np.random.default_rng(11)
+    for _ in range(200):
+        fields, search_data, comparators = random_query(rng)
+        expected = filter_dataframe_manual(listings, fields, search_data, comparators)
+        mask = index.filter_mask(build_metadata_filter(fields, search_data, comparators))
+        assert set(np.asarray(index.ids)[mask]) == set(expected["property_id"]), (fields, search_data, comparators)
+
+
+def test_filter_is_applied_before_scoring(listings, monkeypatch):
+    monkeypatch.setattr(hybrid_search, "index_has_listing_metadata", lambda: True)
+    retriever = _retriever(listings, listing_metadata(listings))
+    fields = {"City": True, "bedRoom": True}
+    search_data = {"City": "Mohali", "bedRoom": 3}
+    expected = set(filter_dataframe_manual(listings, fields, search_data, {})["property_id"])
+
+    docs = hybrid_search._retrieve("quiet flat", retriever, build_metadata_filter(fields, search_data, {}), top_k=len(expected))
+    assert {d.metadata["property_id"] for d in docs} == expected
+
+
+def test_filter_matching_nothing_returns_nothing(listings, monkeypatch):
+    monkeypatch.setattr(hybrid_search, "index_has_listing_metadata", lambda: True)
+    retriever = _retriever(listings, listing_metadata(listings))
+    metadata_filter = build_metadata_filter({"City": True}, {"City": "Atlantis"}, {})
+    assert hybrid_search._retrieve("quiet flat", retriever, metadata_filter, top_k=5) == []
+
+
+def test_index_without_listing_metadata_searches_unfiltered(listings, monkeypatch):
+    metadatas = [{"property_id": pid} for pid in listings["property_id"]]
+    assert not hybrid_search._has_listing_keys(metadatas[0])
+    assert hybrid_search._has_listing_keys(listing_metadata(listings)[0])
+
+    monkeypatch.setattr(hybrid_search, "index_has_listing_metadata", lambda: False)
+    retriever = _retriever(listings, metadatas)
+    metadata_filter = build_metadata_filter({"City": True}, {"City": "Mohali"}, {})
+    docs = hybrid_search._retrieve("quiet flat", retriever, metadata_filter, top_k=5)
+    # Full HYBRID_TOP_K, not the filtered size: the CSV intersection filters afterwards
+    assert len(docs) == min(len(listings), hybrid_search.HYBRID_TOP_K)
+
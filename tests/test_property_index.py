@@ -0,0 +1,122 @@
+from enum import Enum
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_listings, random_query
+from csv_agent import (
+    ENUM_COLS,
+    NUMERIC_COLS,
+    TEXT_COLS,
+    PropertyIndex,
+    filter_dataframe_manual,
+    run_csv_agent_batch,
+    run_csv_agent_partial,
+)
+
+
+def _norm(value) -> str:
+    if isinstance(value, Enum):
+        value = value.value
+    return str(value).strip().casefold()
+
+
+def reference_filter(df, fields, search_data, comparators, categorical_only=False):
+    """Row-by-row pandas filter with the semantics `PropertyIndex` replaced."""
+    out = df
+    if fields.get("top_floor") and {"Totalfloor", "floorNum"} <= set(df.columns):
+        out = out[out["Totalfloor"] == out["floorNum"]]
+    for key, enabled in fields.items():
+        value = search_data.get(key)
+        if not enabled or key == "top_floor" or value is None or key not in df.columns:
+            continue
+        if key in NUMERIC_COLS:
+            if categorical_only:
+                continue
+            series = pd.to_numeric(out[key], errors="coerce")
+            comparator = comparators.get(key)
+            if isinstance(value, list) and len(value) >= 2 and comparator is None:
+                out = out[series.between(min(value), max(value))]
+                continue
+            value = value[0] if isinstance(value, list) else value
+            if comparator == "Greater than":
+                out = out[series >= value]
+            elif comparator == "Lesser than":
+                out = out[series <= value]
+            else:
+                out = out[series == value]
+        elif key in ENUM_COLS or key in TEXT_COLS:
+            values = value if isinstance(value, list) else [value]
+            out = out[out[key].astype(str).str.strip().str.casefold().isin({_norm(v) for v in values})]
+    return out
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_index_matches_reference_filter(seed):
+    df = make_listings(500, seed=seed)
+    rng = np.random.default_rng(100 + seed)
+    for _ in range(150):
+        fields, search_data, comparators = random_query(rng)
+        expected = reference_filter(df, fields, search_data, comparators)
+        got = filter_dataframe_manual(df, fields, search_data, comparators)
+        # Same rows, in frame order
+        assert got["property_id"].tolist() == expected["property_id"].tolist(), (fields, search_data, comparators)
+
+
+def test_batch_matches_single_queries(listings):
+    rng = np.random.default_rng(7)
+    queries = [random_query(rng) for _ in range(50)]
+    batch = run_csv_agent_batch(queries, listings)
+    for positions, (fields, search_data, comparators) in zip(batch, queries):
+        single = filter_dataframe_manual(listings, fields, search_data, comparators)
+        assert listings["property_id"].to_numpy()[positions].tolist() == single["property_id"].tolist()
+
+
+def test_partial_filter_is_a_superset(listings):
+    rng = np.random.default_rng(3)
+    for _ in range(50):
+        fields, search_data, comparators = random_query(rng)
+        partial = run_csv_agent_partial(fields, listings, search_data)
+        expected = reference_filter(listings, fields, search_data, comparators, categorical_only=True)
+        assert partial["property_id"].tolist() == expected["property_id"].tolist()
+        full = filter_dataframe_manual(partial, fields, search_data, comparators)
+        assert full["property_id"].tolist() == filter_dataframe_manual(listings, fields, search_data, comparators)["property_id"].tolist()
+
+
+def test_missing_and_float32_values():
+    df = pd.DataFrame({
+        "Price_in_Crore": np.array([1.2, np.nan, 2.5], dtype=np.float32),
+        "City": ["Delhi", None, "delhi "],
+    })
+    index = PropertyIndex(df)
+    # float32 1.2 still equals the query's 1.2; NaN never matches a comparator
+    assert index.filter_positions({"Price_in_Crore": True}, {"Price_in_Crore": 1.2}, {}).tolist() == [0]
+    assert index.filter_positions({"Price_in_Crore": True}, {"Price_in_Crore": 5.0}, {"Price_in_Crore": "Lesser than"}).tolist() == [0, 2]
+    assert index.filter_positions({"City": True}, {"City": "DELHI"}, {}).tolist() == [0, 2]
+    # A non-numeric value matches nothing instead of raising
+    assert index.filter_positions({"Price_in_Crore": True}, {"Price_in_Crore": "cheap"}, {}).tolist() == []
+
+
+def test_id_positions_join_matches_the_string_join(listings):
+    import workflow
+
+    index = PropertyIndex(listings)
+    assert index.id_positions(["P3", "nope", "P7"]).tolist() == [3, -1, 7]
+    assert not PropertyIndex(listings.assign(property_id="same")).has_id_positions
+
+    rng = np.random.default_rng(5)
+    fields, search_data, comparators = {"City": True}, {"City": "Mohali"}, {}
+    candidates = filter_dataframe_manual(listings, fields, search_data, comparators)
+    hybrid = {f"P{i}": float(s) for i, s in zip(rng.choice(len(listings), 150, replace=False), rng.random(150))}
+
+    joined = workflow._intersect_hybrid(listings, candidates, hybrid)
+    expected = candidates[candidates["property_id"].isin(hybrid)]
+    pd.testing.assert_frame_equal(joined, expected)
+
+    scores = workflow._hybrid_row_scores(listings, candidates, hybrid)
+    assert np.array_equal(scores, candidates["property_id"].map(hybrid).to_numpy(dtype=float), equal_nan=True)
+    # Row labels not in the frame: fall back to the string join
+    foreign = candidates.set_axis(candidates.index + len(listings))
+    assert workflow._hybrid_row_scores(listings, foreign, hybrid) is None
+    pd.testing.assert_frame_equal(workflow._intersect_hybrid(listings, foreign, hybrid), expected.set_axis(expected.index + len(listings)))
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm_models import ProviderLimiter
+
+
+async def _queue_waiter(limiter: ProviderLimiter) -> asyncio.Task:
+    """Start an acquire on the running loop and return once it is queued."""
+    task = asyncio.create_task(limiter.acquire())
+    while not limiter._waiters:
+        await asyncio.sleep(0)
+    return task
+
+
+def test_cancelled_before_the_hand_over_runs_passes_the_slot_on():
+    async def main():
+        limiter = ProviderLimiter(1)
+        await limiter.acquire()
+        waiter = await _queue_waiter(limiter)
+        limiter.release()  # hand-over scheduled, not yet run
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return limiter.in_use
+
+    assert asyncio.run(main()) == 0
+
+
+def test_cancelled_after_the_hand_over_gives_the_slot_back():
+    async def main():
+        limiter = ProviderLimiter(1)
+        await limiter.acquire()
+        waiter = await _queue_waiter(limiter)
+        limiter.release()
+        await asyncio.sleep(0)  # hand-over runs; the waiter has not resumed yet
+        assert not limiter._waiters and not waiter.done()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return limiter.in_use
+
+    assert asyncio.run(main()) == 0
+
+
+def test_slot_goes_to_the_next_waiter_when_one_is_cancelled():
+    async def main():
+        limiter = ProviderLimiter(1)
+        await limiter.acquire()
+        first = await _queue_waiter(limiter)
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release()
+        first.cancel()
+        await asyncio.wait_for(second, timeout=1)
+        return limiter.in_use
+
+    assert asyncio.run(main()) == 1
+
+
+@pytest.mark.parametrize("close", [True, False])
+def test_waiter_on_a_dead_loop_does_not_leak_the_slot(close):
+    limiter = ProviderLimiter(1)
+    asyncio.run(limiter.acquire())
+
+    stranded = asyncio.new_event_loop()
+    task = stranded.run_until_complete(_queue_waiter(limiter))
+    if close:
+        stranded.close()
+
+    limiter.release()
+    assert limiter.in_use == 0 and not limiter._waiters
+    asyncio.run(asyncio.wait_for(limiter.acquire(), timeout=1))
+    assert limiter.in_use == 1
+
+    if not close:
+        # The stopped loop resumes: its waiter queues again and gets the next slot
+        limiter.release()
+        stranded.run_until_complete(asyncio.wait_for(task, timeout=1))
+        assert limiter.in_use == 1
+        limiter.release()
+        stranded.close()
+
+
+def test_bound_holds_across_threads():
+    limiter = ProviderLimiter(3)
+    peak, lock = [0], threading.Lock()
+
+    async def call():
+        async with limiter:
+            with lock:
+                peak[0] = max(peak[0], limiter.in_use)
+            await asyncio.sleep(0.002)
+
+    async def session():
+        await asyncio.gather(*(call() for _ in range(20)))
+
+    threads = [threading.Thread(target=asyncio.run, args=(session(),)) for _ in range(4)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert time.monotonic() - start < 10
+    assert peak[0] == 3
+    assert limiter.in_use == 0 and not limiter._waiters
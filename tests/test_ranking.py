@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import ranking
+from ranking import constraint_scores, rank_results, relax_search_data, top_k_positions
+
+PRICE = {"Price_in_Crore": True}
+UNDER_2 = {"Price_in_Crore": "Lesser than"}
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        "property_id": [f"P{i}" for i in range(6)],
+        "Price_in_Crore": [2.1, 1.5, 2.2, 1.9, 1.0, np.nan],
+        "bedRoom": [3, 3, 3, 2, 4, 3],
+    })
+
+
+@pytest.mark.parametrize(
+    "fields, search_data, comparators, relaxed",
+    [
+        (PRICE, {"Price_in_Crore": 2.0}, UNDER_2, {"Price_in_Crore": 2.2}),
+        (PRICE, {"Price_in_Crore": 2.0}, {"Price_in_Crore": "Greater than"}, {"Price_in_Crore": 1.8}),
+        (PRICE, {"Price_in_Crore": [1.0, 2.0]}, {}, {"Price_in_Crore": [0.9, 2.2]}),
+        ({"bedRoom": True}, {"bedRoom": 3}, {}, {"bedRoom": [2, 4]}),
+        # Columns without a tolerance, or not enabled, are left alone
+        ({"City": True}, {"City": "Delhi"}, {}, {"City": "Delhi"}),
+        ({"bedRoom": False}, {"bedRoom": 3}, {}, {"bedRoom": 3}),
+    ],
+)
+def test_relax_search_data(fields, search_data, comparators, relaxed):
+    result = relax_search_data(fields, search_data, comparators)
+    assert result.keys() == relaxed.keys()
+    for key, value in relaxed.items():
+        assert result[key] == pytest.approx(value)
+
+
+def test_relaxation_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(ranking, "SOFT_CONSTRAINTS", False)
+    assert relax_search_data(PRICE, {"Price_in_Crore": 2.0}, UNDER_2) == {"Price_in_Crore": 2.0}
+
+
+def test_constraint_scores_fall_off_within_the_tolerance(frame):
+    scores = constraint_scores(frame, PRICE, {"Price_in_Crore": 2.0}, UNDER_2)
+    # 2.1 is halfway through the 0.2 margin, 2.2 at its edge; missing prices score lowest
+    assert scores == pytest.approx([0.75, 1.0, 0.5, 1.0, 1.0, 0.5])
+
+    both = constraint_scores(frame, {**PRICE, "bedRoom": True}, {"Price_in_Crore": 2.0, "bedRoom": 3}, UNDER_2)
+    assert both[3] == pytest.approx(0.5)  # price exact, 2 BHK at the edge of +-1
+
+
+def test_exact_matches_rank_before_near_misses(frame):
+    relaxed = frame[frame["Price_in_Crore"] <= 2.2]
+    hybrid = {"P0": 0.99, "P1": 0.1, "P2": 0.95, "P3": 0.2, "P4": 0.3}
+    ranked, total = rank_results(relaxed, PRICE, {"Price_in_Crore": 2.0}, UNDER_2, hybrid)
+
+    assert total == 5
+    assert ranked["exact_match"].tolist() == [True, True, True, False, False]
+    # Within each group by relevance: hybrid score dominates
+    assert ranked["property_id"].tolist() == ["P4", "P3", "P1", "P0", "P2"]
+    assert (ranked["Price_in_Crore"][ranked["exact_match"]] <= 2.0).all()
+    assert ranked["relevance_score"].between(0, 1).all()
+
+
+def test_near_misses_only_fill_up_to_k(frame):
+    relaxed = frame[frame["Price_in_Crore"] <= 2.2]
+    top, total = rank_results(relaxed, PRICE, {"Price_in_Crore": 2.0}, UNDER_2, top_k=3)
+    assert total == 5
+    assert top["exact_match"].all()
+    assert set(top["property_id"]) == {"P1", "P3", "P4"}
+
+    top, _ = rank_results(relaxed, PRICE, {"Price_in_Crore": 2.0}, UNDER_2, top_k=4)
+    assert top["exact_match"].tolist() == [True, True, True, False]
+    assert top["property_id"].iat[3] == "P0"  # the nearer miss
+
+
+def test_hybrid_ranking_is_a_strict_intersection(frame):
+    ranked, total = rank_results(frame, {}, {}, {}, {"P1": 0.5, "P3": 0.7, "missing": 0.9})
+    assert total == 2
+    assert ranked["property_id"].tolist() == ["P3", "P1"]
+    assert ranked["hybrid_score"].tolist() == [0.7, 0.5]
+    assert rank_results(frame, {}, {}, {}, {})[1] == 0
+
+
+def test_top_k_positions_is_stable_on_ties():
+    scores = np.array([0.5, 0.9, 0.5, 0.9, 0.1])
+    assert top_k_positions(scores, 3).tolist() == [1, 3, 0]
+    assert top_k_positions(scores, 0).tolist() == [1, 3, 0, 2, 4]
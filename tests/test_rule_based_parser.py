@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+import workflow
+from models import AdditionalRoomType, ComparisonEnum, FacingDirection
+from rule_based_parser import parse_query, query_signature
+
+
+def _enabled(parsed):
+    return {name for name, on in parsed.fields.model_dump().items() if on}
+
+
+def test_example_query_is_fully_parsed():
+    parsed = parse_query("3 BHK in Sector 45 Gurgaon under 2 crore east facing")
+    data = parsed.search_data
+    assert data.bedRoom == 3
+    assert data.Price_in_Crore == 2.0
+    assert data.facing == FacingDirection.east
+    assert data.City == "Gurgaon"
+    assert data.colony_or_sector == "sector 45"
+    assert parsed.filter_on_columns.Price_in_Crore == ComparisonEnum.lesser
+    assert _enabled(parsed) == {"bedRoom", "Price_in_Crore", "facing", "City", "colony_or_sector"}
+    assert parsed.leftover == []
+    assert parsed.confidence == 1.0
+
+
+@pytest.mark.parametrize(
+    "query, price, comparator",
+    [
+        ("3bhk flat in mohali under 1cr", 1.0, ComparisonEnum.lesser),
+        ("apartment with 2 bathrooms upto 90 lakhs", 0.9, ComparisonEnum.lesser),
+        ("4 bhk above 3 crore in Delhi", 3.0, ComparisonEnum.greater),
+        ("2 bhk between 50 lakh and 80 lakh", [0.5, 0.8], None),
+    ],
+)
+def test_price_grammar(query, price, comparator):
+    parsed = parse_query(query)
+    assert parsed.search_data.Price_in_Crore == price
+    assert parsed.filter_on_columns.Price_in_Crore == comparator
+    assert parsed.confidence == 1.0
+
+
+def test_number_words_and_synonyms():
+    parsed = parse_query("three bedroom apartment Mohali below 1 crore")
+    assert parsed.search_data.bedRoom == 3
+    assert parsed.search_data.City == "Mohali"
+    assert parsed.confidence == 1.0
+
+
+def test_area_units_are_converted_to_square_meters():
+    parsed = parse_query("flats above 1500 sq ft")
+    assert parsed.search_data.Area_in_sq_meter == pytest.approx(1500 * 0.092903, abs=0.01)
+    assert parsed.filter_on_columns.Area_in_sq_meter == ComparisonEnum.greater
+
+
+def test_enums_and_top_floor():
+    parsed = parse_query("north-east facing 2 bhk with servant room")
+    assert parsed.search_data.facing == FacingDirection.northeast
+    assert parsed.search_data.additionalRoom == AdditionalRoomType.servant
+
+    top = parse_query("top floor 4 bhk in Delhi")
+    assert top.fields.top_floor
+    assert not top.fields.floorNum and not top.fields.Totalfloor
+
+
+def test_unparsed_words_lower_confidence():
+    partial = parse_query("flats above 1500 sq ft in noida")
+    assert partial.leftover == ["noida"]
+    assert 0 < partial.confidence < 1
+
+    assert parse_query("villa with a swimming pool near a good school").confidence == 0.0
+    assert parse_query("hello").confidence == 0.0
+
+
+def test_signature_matches_paraphrases_only():
+    assert query_signature("3bhk flat in mohali under 1cr") == query_signature("three bedroom apartment Mohali below 1 crore")
+    assert query_signature("3bhk flat in mohali under 1cr") != query_signature("3bhk flat in mohali under 2cr")
+
+
+def test_confident_parse_skips_the_llm(monkeypatch, listings):
+    async def forbidden(*args, **kwargs):
+        raise AssertionError("LLM chain invoked for a rule-parsed query")
+
+    monkeypatch.setitem(workflow._retriever_status, "state", "unavailable")
+    for name in (
+        "afind_intent", "afield_to_set_agent", "aquery_maker_hybrid",
+        "aget_search_data", "aget_filter_for_columns", "aextract_all",
+    ):
+        monkeypatch.setattr(workflow, name, forbidden)
+
+    result = asyncio.run(workflow.async_workflow("3 bhk in Gurgaon under 2 crore", listings))
+    assert result["result_type"] == "property"
+    assert "rule_parser" in result["timings"]
+    exact = result["final_df"][result["final_df"]["exact_match"]]
+    assert (exact["bedRoom"] == 3).all() and (exact["Price_in_Crore"] <= 2).all()
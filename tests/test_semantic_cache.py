@@ -0,0 +1,149 @@
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import semantic_cache
+from models import ApplyFilterToColumn, CombinedExtraction, FieldToSearch, Intent, SearchData
+from semantic_cache import SemanticCache
+
+BASE = np.eye(8)[0]
+# Paraphrases embed almost identically; "2cr" embeds like "1cr" but has another signature
+NEAR = {
+    "3bhk flat in mohali under 1cr": BASE,
+    "three bedroom apartment mohali below 1 crore": BASE + 0.05 * np.eye(8)[1],
+    "3bhk flat in mohali under 2cr": BASE,
+}
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        if text in NEAR:
+            return NEAR[text].tolist()
+        return np.random.default_rng(zlib.crc32(text.encode())).normal(size=8).tolist()
+
+
+def _extraction(price: float) -> CombinedExtraction:
+    fields = {name: False for name in FieldToSearch.model_fields}
+    fields.update(Price_in_Crore=True, bedRoom=True, City=True)
+    return CombinedExtraction(
+        intent=Intent(Greeting=False, Property_Related=True, Farewell=False, Other=False),
+        fields=FieldToSearch(**fields),
+        search_data=SearchData(Price_in_Crore=price, bedRoom=3, City="Mohali"),
+        filter_on_columns=ApplyFilterToColumn(Price_in_Crore="Lesser than"),
+        hybrid_query="No_User_Query",
+    )
+
+
+def _cache(directory, max_entries=100, warm=True) -> SemanticCache:
+    cache = SemanticCache(str(directory), threshold=0.95, max_entries=max_entries)
+    if warm:
+        cache._embeddings = FakeEmbeddings()
+    return cache
+
+
+def _lines(directory) -> int:
+    with open(os.path.join(directory, "entries.jsonl"), encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def test_paraphrase_hits_and_other_constraints_miss(tmp_path):
+    cache = _cache(tmp_path)
+    cache.add("3bhk flat in mohali under 1cr", _extraction(1.0))
+
+    hit = cache.lookup("three bedroom apartment Mohali below 1 crore")
+    assert hit is not None and hit.search_data.Price_in_Crore == 1.0
+    assert cache.lookup("3bhk flat in mohali under 2cr") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_not_warm_skips_without_loading_the_model(tmp_path):
+    cache = _cache(tmp_path, warm=False)
+    assert cache.lookup("3bhk flat in mohali under 1cr") is None
+    cache.add("3bhk flat in mohali under 1cr", _extraction(1.0))
+    assert cache.skipped == 1 and cache.stats()["entries"] == 0
+    assert not cache.ready
+
+
+def test_near_duplicates_are_stored_once(tmp_path):
+    cache = _cache(tmp_path)
+    cache.add("3bhk flat in mohali under 1cr", _extraction(1.0))
+    cache.add("three bedroom apartment Mohali below 1 crore", _extraction(1.0))
+    cache.add("3bhk flat in mohali under 2cr", _extraction(2.0))
+    assert cache.stats()["entries"] == 2
+    assert _lines(tmp_path) == 2
+
+
+def test_add_after_missed_lookup_reuses_the_embedding(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.lookup("2 bhk in delhi") is None
+    cache.add("2 bhk in delhi", _extraction(1.0))
+    assert cache._embeddings.calls == 1
+
+
+def test_concurrent_misses_keep_the_memo_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(semantic_cache, "EMBED_MEMO_SIZE", 4)
+    cache = _cache(tmp_path)
+    queries = [f"query number {i % 40}" for i in range(400)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(cache.lookup, queries))
+    assert results == [None] * len(queries)
+    assert cache.misses == len(queries)
+    assert len(cache._memo) <= 4
+
+def test_entries_are_appended_and_reloaded(tmp_path):
+    cache = _cache(tmp_path)
+    queries = [f"query number {i}" for i in range(5)]
+    for i, query in enumerate(queries):
+        cache.add(query, _extraction(float(i)))
+        assert _lines(tmp_path) == i + 1
+
+    reloaded = _cache(tmp_path)
+    assert [e["query"] for e in reloaded._entries] == queries
+    assert reloaded.lookup("query number 3").search_data.Price_in_Crore == 3.0
+
+
+def test_eviction_keeps_newest_and_compacts_the_files(tmp_path):
+    cache = _cache(tmp_path, max_entries=3)
+    for i in range(6):
+        cache.add(f"query number {i}", _extraction(float(i)))
+    assert [e["query"] for e in cache._entries] == ["query number 3", "query number 4", "query number 5"]
+    # Compacted once the files held 2 * max_entries rows
+    assert _lines(tmp_path) == 3
+    assert os.path.getsize(tmp_path / "vectors.f32") == 3 * 8 * 4
+    assert [e["query"] for e in _cache(tmp_path, max_entries=3)._entries] == [e["query"] for e in cache._entries]
+
+
+def test_truncated_write_is_repaired_on_load(tmp_path):
+    cache = _cache(tmp_path)
+    cache.add("query number 0", _extraction(0.0))
+    cache.add("query number 1", _extraction(1.0))
+    with open(tmp_path / "vectors.f32", "ab") as f:
+        f.write(b"\0\0")  # half a float: a crash mid-append
+
+    reloaded = _cache(tmp_path)
+    assert reloaded.stats()["entries"] == 2
+    assert os.path.getsize(tmp_path / "vectors.f32") == 2 * 8 * 4
+
+
+def test_prompt_change_invalidates(tmp_path, monkeypatch):
+    cache = _cache(tmp_path)
+    cache.add("3bhk flat in mohali under 1cr", _extraction(1.0))
+    monkeypatch.setattr(semantic_cache, "prompts_fingerprint", lambda: "changed")
+    assert _cache(tmp_path).stats()["entries"] == 0
+
+
+def test_semantic_lookup_does_not_wait_for_the_model(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, warm=False)
+    monkeypatch.setattr(semantic_cache, "SEMANTIC_CACHE_ENABLED", True)
+    monkeypatch.setattr(semantic_cache, "_cache", cache)
+    monkeypatch.setattr(cache, "warm", lambda: pytest.fail("model loaded on the query path"))
+
+    assert semantic_cache.semantic_lookup("3bhk flat in mohali under 1cr") is None
+    assert semantic_cache.semantic_cache_stats()["skipped"] == 1
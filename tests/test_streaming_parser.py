@@ -0,0 +1,142 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.prompts import PromptTemplate
+
+import streaming_parser
+import telemetry
+from models import Intent
+from streaming_parser import JsonObjectScanner, ThinkStripper, arun_chain, stage_timings
+from telemetry import LLM_TOKENS, LLM_TOKENS_ESTIMATED, record_tokens
+
+PROMPT = PromptTemplate.from_template("{user_query}")
+
+
+def _splits(text: str):
+    """Every way of cutting `text` into two and three chunks."""
+    yield [text]
+    for i in range(1, len(text)):
+        yield [text[:i], text[i:]]
+        for j in range(i + 1, len(text), 3):
+            yield [text[:i], text[i:j], text[j:]]
+
+
+def _strip(chunks) -> str:
+    stripper = ThinkStripper()
+    out = "".join(stripper.feed(chunk) for chunk in chunks) + stripper.flush()
+    assert out == stripper.text
+    return out
+
+
+@pytest.mark.parametrize(
+    "text, visible",
+    [
+        ("<think>plan</think>answer", "answer"),
+        ("a<think>x</think>b<think>y</think>c", "abc"),
+        ("no tags < here <thin", "no tags < here <thin"),
+        ("<think>never closed", ""),
+        ("<<think>>x</think>>", "<>"),
+    ],
+)
+def test_think_tags_split_across_any_chunk_boundary(text, visible):
+    for chunks in _splits(text):
+        assert _strip(chunks) == visible, chunks
+
+
+def test_think_stripper_holds_back_only_a_possible_tag():
+    stripper = ThinkStripper()
+    assert stripper.feed("answer <th") == "answer "
+    assert stripper.feed("e end") == "<the end"
+
+
+def _scan(chunks):
+    scanner = JsonObjectScanner()
+    return [obj for chunk in chunks for obj in scanner.feed(chunk)]
+
+
+def test_json_scanner_ignores_braces_and_escapes_inside_strings():
+    obj = {"a": "}{", "b": 'say "hi" \\ {', "c": {"d": ["}"]}}
+    text = 'Sure: ' + json.dumps(obj) + ' trailing } { "x": 1}'
+    for chunks in _splits(text):
+        found = _scan(chunks)
+        assert json.loads(found[0]) == obj, chunks
+        assert json.loads(found[1]) == {"x": 1}
+
+
+def test_json_scanner_waits_for_the_closing_brace():
+    scanner = JsonObjectScanner()
+    assert list(scanner.feed('{"a": {"b": 1}')) == []
+    assert list(scanner.feed("}")) == ['{"a": {"b": 1}}']
+
+
+class ChunkedModel(GenericFakeChatModel):
+    """Streams the given chunks verbatim and records the ones read."""
+    chunks: list
+    read: list = []
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for text in self.chunks:
+            self.read.append(text)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+
+
+def _run(chunks, parser=None):
+    model = ChunkedModel(messages=iter([AIMessage(content="")]), chunks=chunks, read=[])
+    timings = {}
+
+    async def main():
+        stage_timings.set(timings)
+        return await arun_chain("groq", PROMPT, model, {"user_query": "q"}, parser, stage="test")
+
+    return asyncio.run(main()), model.read, timings
+
+
+def test_text_path_ends_at_the_first_line():
+    result, read, timings = _run(["<thi", "nk>one\ntwo</th", "ink>\n  Hello", " there", "\nsecond line", " never read"])
+    assert result == "Hello there"
+    assert read[-1] == "\nsecond line"
+    assert "ttfut_test" in timings and "stream_test" in timings
+
+
+def test_text_path_without_a_newline_returns_everything():
+    result, read, _ = _run(["<think>x</think>", "Just one", " line"])
+    assert result == "Just one line" and len(read) == 3
+
+
+def test_json_path_stops_after_the_first_valid_object():
+    intent = Intent(Greeting=False, Property_Related=True, Farewell=False, Other=False).model_dump_json()
+    half = len(intent) // 2
+    chunks = ["<think>{\"not\": ", "\"this\"}</think>", '{"bad": 1} ', intent[:half], intent[half:], " epilogue"]
+    result, read, _ = _run(chunks, PydanticOutputParser(pydantic_object=Intent))
+    assert result.Property_Related and not result.Greeting
+    assert " epilogue" not in read
+
+
+def _tokens(metric, stage):
+    return {key: value for key, value in metric._series.items() if key[0] == stage}
+
+
+def test_early_stop_token_estimates_stay_out_of_the_exact_counts(monkeypatch):
+    monkeypatch.setattr(telemetry, "TELEMETRY_ENABLED", True)
+    exact_before = _tokens(LLM_TOKENS, "test")
+    estimated_before = sum(_tokens(LLM_TOKENS_ESTIMATED, "test").values())
+
+    _run(["<think>x</think>", "Hello", "\nnever read"])
+    assert _tokens(LLM_TOKENS, "test") == exact_before
+    assert sum(_tokens(LLM_TOKENS_ESTIMATED, "test").values()) == estimated_before + 3
+
+    record_tokens("test_usage", "m", {"input_tokens": 7, "output_tokens": 2})
+    assert _tokens(LLM_TOKENS, "test_usage") == {("test_usage", "m", "prompt"): 7, ("test_usage", "m", "completion"): 2}
+    assert _tokens(LLM_TOKENS_ESTIMATED, "test_usage") == {}
+
+
+def test_streaming_disabled_strips_the_think_block(monkeypatch):
+    monkeypatch.setattr(streaming_parser, "STREAMING_ENABLED", False)
+    model = GenericFakeChatModel(messages=iter([AIMessage(content="<think>a\nb</think>\n Answer\nmore")]))
+    result = asyncio.run(arun_chain("groq", PROMPT, model, {"user_query": "q"}))
+    assert result == "Answer\nmore"
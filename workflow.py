@@ -1,26 +1,133 @@
 import asyncio
+import math
+import os
+import threading
 import time
-from typing import Dict, Any
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, Optional
+import numpy as np
 import pandas as pd
 
-from intent_detection_agent import find_intent, intent_response_agent
-from checklist_agent import field_to_set_agent
-from csv_agent import run_csv_agent, get_search_data, get_filter_for_columns
-from query_for_hybrid import query_maker_hybrid
-from hybrid_search import hybrid_search_in_property, build_retriever
+from intent_detection_agent import afind_intent, aintent_response_agent
+from intent_classifier import (
+    chitchat_label,
+    classify_intent,
+    is_chitchat,
+    is_property_likely,
+    templated_response,
+)
+from checklist_agent import afield_to_set_agent
+from csv_agent import (
+    run_csv_agent,
+    run_csv_agent_partial,
+    aget_search_data,
+    aget_filter_for_columns,
+    build_metadata_filter,
+    get_property_index,
+)
+from query_for_hybrid import aquery_maker_hybrid
+from extraction_agent import aextract_all
+from rule_based_parser import parse_query
+from semantic_cache import semantic_lookup, semantic_store, warm_semantic_cache
+from streaming_parser import stage_timings
+from models import CombinedExtraction, FieldToSearch, Intent, LocalIntent, SearchData, ApplyFilterToColumn
+from hybrid_search import hybrid_search_with_scores, build_retriever, HYBRID_TOP_K
+from ranking import rank_results, relax_search_data
+from telemetry import record_rows, record_workflow, set_root_attributes, span
 
 # ------------------------------------------------------
-# Build retriever once (cached outside async function)
+# Extraction mode switch
+#   "multi"    -> five separate LLM calls (intent, fields, hybrid query,
+#                 search data, comparators)
+#   "combined" -> one structured-extraction call returning all of them
 # ------------------------------------------------------
-try:
-    retriever = build_retriever()
-    if retriever is not None:
-        print("[INFO] Retriever built successfully.")
-    else:
-        print("[INFO] Retriever not available (Pinecone dependencies missing).")
-except Exception as e:
-    retriever = None
-    print(f"[WARN] build_retriever() failed at import: {e!r}. Hybrid disabled.")
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "multi").strip().lower()
+
+# Rule-based parser results at or above this confidence skip the LLM chains
+RULE_PARSER_MIN_CONFIDENCE = float(os.getenv("RULE_PARSER_MIN_CONFIDENCE", "0.8"))
+
+# Push the structured CSV filters into the retriever as metadata pre-filters
+# (hybrid search then runs after the CSV filter instead of alongside it)
+HYBRID_PREFILTER = os.getenv("HYBRID_PREFILTER", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+# ------------------------------------------------------
+# Retriever: built once per process. With LAZY_RETRIEVER (default) the
+# embedding models / BM25 / index are loaded in a background thread started
+# by `warm_retriever()` (or by the first hybrid query, which waits for it);
+# otherwise they are built here at import.
+# ------------------------------------------------------
+LAZY_RETRIEVER = os.getenv("LAZY_RETRIEVER", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+retriever = None
+_retriever_status: Dict[str, Any] = {"state": "not_started", "seconds": None, "error": None}
+_retriever_thread: Optional[threading.Thread] = None
+_retriever_lock = threading.Lock()
+
+
+def _load_retriever() -> None:
+    global retriever
+    start = time.time()
+    _retriever_status["state"] = "loading"
+    # The semantic cache's (small) model first, so lookups start hitting early
+    with span("semantic_cache_warmup"):
+        warm_semantic_cache()
+    try:
+        with span("retriever_build"):
+            retriever = build_retriever()
+        if retriever is not None:
+            state = "ready"
+            print("[INFO] Retriever built successfully.")
+        else:
+            state = "unavailable"
+            print("[INFO] Retriever not available (Pinecone dependencies missing).")
+    except Exception as e:
+        retriever = None
+        state = "failed"
+        _retriever_status["error"] = repr(e)
+        print(f"[WARN] build_retriever() failed: {e!r}. Hybrid disabled.")
+    _retriever_status["seconds"] = time.time() - start
+    _retriever_status["state"] = state
+
+
+def warm_retriever() -> None:
+    """Start building the retriever in a background thread (no-op once started)."""
+    global _retriever_thread
+    with _retriever_lock:
+        if _retriever_thread is None:
+            _retriever_thread = threading.Thread(target=_load_retriever, name="retriever-warmup", daemon=True)
+            _retriever_thread.start()
+
+
+def get_retriever():
+    """The hybrid retriever (None when unavailable); blocks until it is built."""
+    warm_retriever()
+    _retriever_thread.join()
+    return retriever
+
+
+def retriever_status() -> Dict[str, Any]:
+    """Readiness report: state is not_started / loading / ready / unavailable / failed."""
+    return dict(_retriever_status)
+
+
+def _hybrid_possible() -> bool:
+    """False once the retriever is known to be missing; never blocks."""
+    return _retriever_status["state"] not in {"unavailable", "failed"}
+
+
+def _hybrid_search(hybrid_query: str, metadata_filter=None, top_k=None):
+    """{property_id: hybrid score}, or None when the retriever turned out to be unavailable."""
+    with span("retrieval", metadata_filter=metadata_filter, top_k=top_k or HYBRID_TOP_K) as current:
+        hybrid_retriever = get_retriever()
+        if hybrid_retriever is None:
+            current.set(available=False)
+            return None
+        hybrid_result = hybrid_search_with_scores(hybrid_query, hybrid_retriever, metadata_filter, top_k)
+        current.set(hits=len(hybrid_result))
+        return hybrid_result
+
+
+if not LAZY_RETRIEVER:
+    get_retriever()
 
 
 def _no_hybrid(q: str) -> bool:
@@ -31,140 +138,234 @@ def _no_hybrid(q: str) -> bool:
     return q in {"", "No_User_Query", "N/A", "None"}
 
 
-# ------------------------------------------------------
-# Main Orchestration Workflow
-# ------------------------------------------------------
-async def async_workflow(user_query: str, df1: pd.DataFrame) -> Dict[str, Any]:
+def _hybrid_row_scores(df: pd.DataFrame, frame: pd.DataFrame, hybrid_result) -> Optional[np.ndarray]:
     """
-    Orchestrates intent detection, field selection, hybrid search, and
-    deterministic CSV filtering in parallel.
-    Returns a dict with a `result_type` and a `final_df` if property-related.
+    Hybrid score of each row of `frame` (a row subset of `df` that kept
+    its row labels, as every CSV filter result does), NaN where
+    hybrid search did not return the row. Ids are resolved through the
+    PropertyIndex id -> position map of `df` (O(hybrid ids)) instead of
+    converting the candidates' ids to strings. None when the map cannot
+    be used (repeated ids or row labels, or labels missing from `df`).
     """
-    timings: Dict[str, float] = {}
+    index = get_property_index(df)
+    if not index.has_id_positions or not df.index.is_unique:
+        return None
+    ids = list(hybrid_result)
+    positions = index.id_positions(ids)
+    if isinstance(hybrid_result, dict):
+        values = np.fromiter(hybrid_result.values(), dtype=np.float64, count=len(ids))
+    else:
+        values = np.ones(len(ids))
+    found = positions >= 0
+    by_position = np.full(len(df), np.nan)
+    by_position[positions[found]] = values[found]
+    rows = df.index.get_indexer(frame.index)
+    if (rows < 0).any():
+        return None
+    return by_position[rows]
 
-    # ------------------------
-    # Step 1: Intent + Fields + Hybrid query (parallel)
-    # ------------------------
-    start = time.time()
-    intent_task = asyncio.to_thread(find_intent, user_query)
-    fields_task = asyncio.to_thread(field_to_set_agent, user_query)
-    hybrid_query_task = asyncio.to_thread(query_maker_hybrid, user_query)
 
-    intent, fields, hybrid_query = await asyncio.gather(
-        intent_task, fields_task, hybrid_query_task
-    )
-    print(fields)
-    timings["intent_fields_hybridQuery"] = time.time() - start
-    print("[INFO] Intent, Fields, and Hybrid Query computed.")
+def _intersect_hybrid(df: pd.DataFrame, csv_result: pd.DataFrame, hybrid_result) -> pd.DataFrame:
+    """Strict intersection of CSV rows (a row subset of `df`) with hybrid property_ids (a list or {id: score})."""
+    with span("intersection", hybrid_ids=len(hybrid_result or ())):
+        scores = _hybrid_row_scores(df, csv_result, hybrid_result) if hybrid_result else None
+        if scores is not None:
+            final_df = csv_result.iloc[np.flatnonzero(~np.isnan(scores))]
+        elif hybrid_result and "property_id" in csv_result.columns:
+            hybrid_ids = {str(i) for i in hybrid_result}
+            final_df = csv_result[csv_result["property_id"].astype(str).isin(hybrid_ids)]
+        else:
+            if hybrid_result:
+                print("[WARN] property_id missing; forcing empty due to strict intersection.")
+            # hybrid ran but found nothing → strict empty
+            final_df = csv_result.iloc[0:0]
+        record_rows("intersection", len(csv_result), len(final_df))
+        return final_df
 
-    property_related = bool(getattr(intent, "Property_Related", False))
 
-    # ------------------------
-    # Property-related flow
-    # ------------------------
-    if property_related:
-        # Case A: Hybrid query unusable or retriever unavailable
-        if retriever is None or _no_hybrid(hybrid_query):
-            # Step 2: CSV preprocessing (search_data + filter comparators)
-            start = time.time()
-            search_data_task = asyncio.to_thread(get_search_data, user_query)
+def _prefiltered_top_k(csv_rows: int, total_rows: int) -> int:
+    """Scale HYBRID_TOP_K by the share of listings that pass the CSV filter."""
+    if total_rows <= 0:
+        return HYBRID_TOP_K
+    top_k = math.ceil(csv_rows * HYBRID_TOP_K / total_rows)
+    return max(min(csv_rows, 10), min(top_k, HYBRID_TOP_K))
 
-            filter_task = asyncio.to_thread(get_filter_for_columns, user_query)
-            search_data, filter_on_columns = await asyncio.gather(
-                search_data_task, filter_task
-            )
-            timings["csvPreproc"] = time.time() - start
-            print(search_data)
-            print("[INFO] Search data & filter-on-columns ready (CSV-only branch).")
 
-            # Step 3: Deterministic CSV filter
-            start = time.time()
-            csv_result = await asyncio.to_thread(
-                run_csv_agent, fields.model_dump(), df1, search_data, filter_on_columns
-            )
-            timings["csv_agent"] = time.time() - start
-            print("[INFO] CSV agent (manual filtering) done (CSV-only branch).")
-
-            return {
-                "result_type": "property",
-                "final_df": csv_result,      # <- final DataFrame is just CSV result
-                "csv_result": csv_result,
-                "hybrid_result": [],
-                "timings": timings,
-            }
-
-        # Case B: Hybrid query usable
-        print("[INFO] Hybrid Working...")
-        # Step 2: Kick off hybrid search in background
-        hybrid_task = asyncio.create_task(
-            asyncio.to_thread(hybrid_search_in_property, hybrid_query, retriever)
+def _prefiltered_hybrid_search(
+    hybrid_query: str,
+    fields,
+    search_data: Dict[str, Any],
+    filter_on_columns: Any,
+    csv_rows: int,
+    total_rows: int,
+):
+    """Hybrid search restricted to listings that pass the structured filters."""
+    metadata_filter = build_metadata_filter(fields.model_dump(), search_data or {}, filter_on_columns)
+    top_k = _prefiltered_top_k(csv_rows, total_rows)
+    return _hybrid_search(hybrid_query, metadata_filter, top_k)
+
+
+async def _csv_filter(
+    fields,
+    df1: pd.DataFrame,
+    search_data: Dict[str, Any],
+    filter_on_columns: Any,
+    timings: Optional[Dict[str, float]] = None,
+) -> pd.DataFrame:
+    """Deterministic CSV filter with the soft constraints relaxed (near misses are ranked lower)."""
+    with span("csv_filter", timings, "csv_agent"):
+        csv_result = await asyncio.to_thread(
+            run_csv_agent, fields.model_dump(), df1,
+            relax_search_data(fields.model_dump(), search_data, filter_on_columns), filter_on_columns,
         )
+        record_rows("csv_filter", len(df1), len(csv_result))
+        return csv_result
+
+
+def _rank(df: pd.DataFrame, csv_result: pd.DataFrame, fields, search_data, filter_on_columns, hybrid_result=None):
+    """`rank_results`: strict intersection with the hybrid ids (when given), then top-K (and the match count)."""
+    with span("ranking", hybrid_ids=None if hybrid_result is None else len(hybrid_result)):
+        hybrid_scores = hybrid_result
+        if hybrid_result:
+            hybrid_scores = _hybrid_row_scores(df, csv_result, hybrid_result)
+            if hybrid_scores is None:
+                hybrid_scores = hybrid_result
+        final_df, total_matches = rank_results(
+            csv_result, fields.model_dump(), search_data or {}, filter_on_columns, hybrid_scores
+        )
+        record_rows("ranking", len(csv_result), len(final_df))
+        return final_df, total_matches
+
 
-        # Step 3: CSV preprocessing
-        start = time.time()
-        search_data_task = asyncio.to_thread(get_search_data, user_query)
-        filter_task = asyncio.to_thread(get_filter_for_columns, user_query)
+async def _csv_preproc(user_query: str, timings: Dict[str, float]):
+    """Step: search_data + filter comparators via the two LLM chains (parallel)."""
+    with span("csv_preproc", timings, "csvPreproc"):
+        search_data_task = aget_search_data(user_query)
+        filter_task = aget_filter_for_columns(user_query)
         search_data, filter_on_columns = await asyncio.gather(
             search_data_task, filter_task
         )
-        timings["csvPreproc"] = time.time() - start
-        print("[INFO] Search data & filter-on-columns ready.")
+    return search_data, filter_on_columns
 
-        print("[DEBUG] search_data:", search_data)
-        print("[DEBUG] filter_on_columns:", filter_on_columns)
 
-        # Step 4: Deterministic CSV filter
-        start = time.time()
-        csv_result = await asyncio.to_thread(
-            run_csv_agent, fields.model_dump(), df1, search_data, filter_on_columns
-        )
-        timings["csv_agent"] = time.time() - start
-        print("[INFO] CSV agent (manual filtering) done.")
-
-        # Step 5: Await hybrid result
-        start = time.time()
-        hybrid_result = await hybrid_task
-        timings["hybrid_agent"] = time.time() - start
-        print("[INFO] Hybrid Agent Done.")
-        print("[RESULT] Hybrid search property_ids:", hybrid_result)
-        
-
-        # After awaiting hybrid_result
-        used_hybrid = True  # we’re in the hybrid branch
-
-        final_df = csv_result
-        if used_hybrid:
-            if isinstance(hybrid_result, list) and len(hybrid_result) > 0:
-                if "property_id" in csv_result.columns:
-                    hybrid_ids = {str(i) for i in hybrid_result}
-                    before_count = len(csv_result)
-                    final_df = csv_result[csv_result["property_id"].astype(str).isin(hybrid_ids)]
-                    after_count = len(final_df)
-                    print(f"[DEBUG] CSV rows before intersection: {before_count}")
-                    print(f"[DEBUG] Hybrid ID count: {len(hybrid_ids)}")
-                    print(f"[DEBUG] Rows after intersection by property_id: {after_count}")
-                else:
-                    print("[WARN] property_id missing; forcing empty due to strict intersection.")
-                    final_df = csv_result.iloc[0:0]
-            else:
-                # hybrid ran but found nothing → strict empty
-                final_df = csv_result.iloc[0:0]
-                print("[DEBUG] Hybrid returned no IDs; final result forced empty.")
+# ------------------------------------------------------
+# Property-related flow (shared by both extraction modes)
+# ------------------------------------------------------
+async def _property_flow(
+    user_query: str,
+    df1: pd.DataFrame,
+    fields,
+    hybrid_query: str,
+    timings: Dict[str, float],
+    search_data: Optional[Dict[str, Any]] = None,
+    filter_on_columns: Any = None,
+) -> Dict[str, Any]:
+    """
+    Runs CSV filtering (and hybrid search when usable). `search_data` and
+    `filter_on_columns` are fetched from the LLM unless already extracted.
+    """
+    # Case A: Hybrid query unusable or retriever unavailable
+    if not _hybrid_possible() or _no_hybrid(hybrid_query):
+        # Step 2: CSV preprocessing (search_data + filter comparators)
+        if search_data is None:
+            search_data, filter_on_columns = await _csv_preproc(user_query, timings)
+        print("[INFO] Search data & filter-on-columns ready (CSV-only branch).")
+
+        # Step 3: Deterministic CSV filter (soft constraints relaxed), then ranking
+        csv_result = await _csv_filter(fields, df1, search_data, filter_on_columns, timings)
+        print("[INFO] CSV agent (manual filtering) done (CSV-only branch).")
+        final_df, total_matches = _rank(df1, csv_result, fields, search_data, filter_on_columns)
 
         return {
             "result_type": "property",
-            "final_df": final_df,           # <- unified DataFrame
+            "final_df": final_df,        # <- top-K of the CSV result, best first
+            "total_matches": total_matches,
             "csv_result": csv_result,
-            "hybrid_result": hybrid_result, # raw hybrid list for debugging
+            "hybrid_result": [],
+            "search_data": search_data,
+            "filter_on_columns": filter_on_columns,
             "timings": timings,
         }
 
-    # ------------------------
-    # Non-property-related flow
-    # ------------------------
-    start = time.time()
-    result = await asyncio.to_thread(intent_response_agent, user_query)
-    timings["intent_response_agent"] = time.time() - start
+    # Case B: Hybrid query usable
+    print("[INFO] Hybrid Working...")
+    # Step 2: Kick off hybrid search in background (after the CSV filter
+    # when it is pushed down as a metadata pre-filter); a lazily built
+    # retriever keeps loading meanwhile
+    warm_retriever()
+    hybrid_task = None
+    if not HYBRID_PREFILTER:
+        hybrid_task = asyncio.create_task(asyncio.to_thread(_hybrid_search, hybrid_query))
+
+    # Step 3: CSV preprocessing
+    if search_data is None:
+        search_data, filter_on_columns = await _csv_preproc(user_query, timings)
+    print("[INFO] Search data & filter-on-columns ready.")
+
+    # Step 4: Deterministic CSV filter (soft constraints relaxed: near misses are ranked lower)
+    csv_result = await _csv_filter(fields, df1, search_data, filter_on_columns, timings)
+    print("[INFO] CSV agent (manual filtering) done.")
+
+    # Step 5: Await hybrid result
+    with span("hybrid_wait", timings, "hybrid_agent"):
+        if hybrid_task is not None:
+            hybrid_result = await hybrid_task
+        elif len(csv_result) == 0:
+            # Nothing passes the structured filters; the intersection is empty anyway
+            hybrid_result = {}
+        else:
+            hybrid_result = await asyncio.to_thread(
+                _prefiltered_hybrid_search, hybrid_query, fields,
+                relax_search_data(fields.model_dump(), search_data, filter_on_columns),
+                filter_on_columns, len(csv_result), len(df1),
+            )
+    print("[INFO] Hybrid Agent Done.")
+
+    # After awaiting hybrid_result: strict intersection, ranked by hybrid + constraint scores
+    # (None: retriever turned out to be unavailable -> CSV result only)
+    final_df, total_matches = _rank(df1, csv_result, fields, search_data, filter_on_columns, hybrid_result)
+
+    return {
+        "result_type": "property",
+        "final_df": final_df,           # <- top-K unified DataFrame, best first
+        "total_matches": total_matches,
+        "csv_result": csv_result,
+        "hybrid_result": list(hybrid_result or []),  # raw hybrid ids for debugging
+        "hybrid_scores": hybrid_result or {},
+        "search_data": search_data,
+        "filter_on_columns": filter_on_columns,
+        "timings": timings,
+    }
+
+
+# ------------------------------------------------------
+# Non-property-related flow
+# ------------------------------------------------------
+def _local_intent(user_query: str, timings: Dict[str, float]) -> LocalIntent:
+    with span("local_intent", timings) as current:
+        local_intent = classify_intent(user_query)
+        current.set(label=local_intent.label, confidence=local_intent.confidence)
+    print(f"[INFO] Local intent: {local_intent.label} (confidence={local_intent.confidence}).")
+    return local_intent
+
+
+def _templated_chat(user_query: str, label: str, timings: Dict[str, float]) -> Dict[str, Any]:
+    """Greeting / Farewell reply from a template: no LLM call."""
+    set_root_attributes(path="templated")
+    return {
+        "result_type": "chat",
+        "result": templated_response(label, user_query),
+        "timings": timings,
+    }
+
+
+async def _chat_flow(user_query: str, timings: Dict[str, float], intent: Optional[Intent] = None) -> Dict[str, Any]:
+    label = chitchat_label(intent) if intent is not None else ""
+    if label:
+        return _templated_chat(user_query, label, timings)
+
+    with span("intent_response", timings, "intent_response_agent"):
+        result = await aintent_response_agent(user_query)
 
     print("[INFO] Non-property flow timings (seconds):", timings)
     return {
@@ -172,3 +373,372 @@ async def async_workflow(user_query: str, df1: pd.DataFrame) -> Dict[str, Any]:
         "result": result,
         "timings": timings,
     }
+
+
+async def _extraction_flow(
+    user_query: str,
+    df1: pd.DataFrame,
+    extraction: CombinedExtraction,
+    timings: Dict[str, float],
+) -> Dict[str, Any]:
+    """Runs the rest of the workflow from an already complete extraction."""
+    if bool(getattr(extraction.intent, "Property_Related", False)):
+        return await _property_flow(
+            user_query,
+            df1,
+            extraction.fields,
+            extraction.hybrid_query,
+            timings,
+            search_data=extraction.search_data.model_dump(exclude_none=True),
+            filter_on_columns=extraction.filter_on_columns,
+        )
+    return await _chat_flow(user_query, timings, extraction.intent)
+
+
+def _to_extraction(intent, fields, hybrid_query, result: Dict[str, Any]) -> CombinedExtraction:
+    """Collects the pieces of a multi-call run into one cacheable extraction."""
+    if fields is None:
+        fields = FieldToSearch(**{name: False for name in FieldToSearch.model_fields})
+    filter_on_columns = result.get("filter_on_columns")
+    if isinstance(filter_on_columns, dict):
+        filter_on_columns = ApplyFilterToColumn(**filter_on_columns)
+    return CombinedExtraction(
+        intent=intent,
+        fields=fields,
+        search_data=SearchData(**(result.get("search_data") or {})),
+        filter_on_columns=filter_on_columns or ApplyFilterToColumn(),
+        hybrid_query=hybrid_query or "No_User_Query",
+    )
+
+
+# ------------------------------------------------------
+# Main Orchestration Workflow
+# ------------------------------------------------------
+async def async_workflow(
+    user_query: str,
+    df1: pd.DataFrame,
+    extraction_mode: Optional[str] = None,
+    combined_extractor: Optional[Callable[[str], Awaitable[CombinedExtraction]]] = None,
+) -> Dict[str, Any]:
+    """
+    Orchestrates intent detection, field selection, hybrid search, and
+    deterministic CSV filtering in parallel.
+    `extraction_mode` overrides EXTRACTION_MODE ("multi" or "combined");
+    `combined_extractor` replaces `aextract_all` in combined mode (e.g. a
+    variant deduplicating in-flight queries, see api.py).
+    Returns a dict with a `result_type` and a `final_df` if property-related.
+    Each stage is traced as a span of one `workflow` trace (see telemetry.py).
+    """
+    mode = (extraction_mode or EXTRACTION_MODE).strip().lower()
+    with span("workflow", extraction_mode=mode, streamed=False, query_chars=len(user_query or "")) as root:
+        result = await _workflow(user_query, df1, mode, combined_extractor)
+        root.set(result_type=result.get("result_type"))
+    record_workflow(result, root.attributes.get("path", mode), root.seconds)
+    return result
+
+
+async def _workflow(
+    user_query: str,
+    df1: pd.DataFrame,
+    mode: str,
+    combined_extractor: Optional[Callable[[str], Awaitable[CombinedExtraction]]] = None,
+) -> Dict[str, Any]:
+    timings: Dict[str, float] = {}
+    stage_timings.set(timings)
+
+    # Greetings / farewells are answered locally, without any LLM call
+    local_intent = _local_intent(user_query, timings)
+    if is_chitchat(local_intent):
+        return _templated_chat(user_query, local_intent.label, timings)
+
+    result = await _fast_paths(user_query, df1, timings)
+    if result is not None:
+        return result
+
+    # ------------------------
+    # Combined mode: one LLM call for everything
+    # ------------------------
+    if mode == "combined":
+        return await _combined_flow(user_query, df1, timings, combined_extractor)
+
+    # ------------------------
+    # Step 1: Intent + Fields + Hybrid query (parallel when the message is
+    # likely property related, otherwise fields / hybrid query wait for intent)
+    # ------------------------
+    fields = hybrid_query = None
+    with span("intent_fields_hybridQuery", timings, speculative=is_property_likely(local_intent)):
+        if is_property_likely(local_intent):
+            intent, fields, hybrid_query = await asyncio.gather(
+                afind_intent(user_query), afield_to_set_agent(user_query), aquery_maker_hybrid(user_query)
+            )
+        else:
+            intent = await afind_intent(user_query)
+            if bool(getattr(intent, "Property_Related", False)):
+                fields, hybrid_query = await asyncio.gather(
+                    afield_to_set_agent(user_query), aquery_maker_hybrid(user_query)
+                )
+    print("[INFO] Intent, Fields, and Hybrid Query computed.")
+
+    property_related = bool(getattr(intent, "Property_Related", False))
+
+    if property_related:
+        result = await _property_flow(user_query, df1, fields, hybrid_query, timings)
+    else:
+        result = await _chat_flow(user_query, timings, intent)
+
+    await asyncio.to_thread(
+        semantic_store, user_query, _to_extraction(intent, fields, hybrid_query, result)
+    )
+    return result
+
+
+async def _fast_paths(
+    user_query: str,
+    df1: pd.DataFrame,
+    timings: Dict[str, float],
+) -> Optional[Dict[str, Any]]:
+    """Rule-based parser, then semantic cache. None when neither can answer."""
+    # ------------------------
+    # Fast path: deterministic rule-based parser
+    # ------------------------
+    with span("rule_parser", timings) as current:
+        parsed = parse_query(user_query)
+        current.set(confidence=parsed.confidence, leftover=len(parsed.leftover))
+
+    if parsed.confidence >= RULE_PARSER_MIN_CONFIDENCE:
+        print(f"[INFO] Rule-based fast path (confidence={parsed.confidence}).")
+        set_root_attributes(path="rule_parser")
+        # Words the rules could not place may describe features / nearby
+        # places, which only the hybrid query maker can reform.
+        hybrid_query = "No_User_Query"
+        if parsed.leftover:
+            with span("hybrid_query", timings, "hybridQuery"):
+                hybrid_query = await aquery_maker_hybrid(user_query)
+        return await _property_flow(
+            user_query,
+            df1,
+            parsed.fields,
+            hybrid_query,
+            timings,
+            search_data=parsed.search_data.model_dump(exclude_none=True),
+            filter_on_columns=parsed.filter_on_columns,
+        )
+
+    # ------------------------
+    # Semantic cache: reuse the extraction of a near-duplicate query
+    # ------------------------
+    warm_retriever()  # no-op once started; also loads the semantic cache model
+    with span("semantic_cache", timings):
+        cached_extraction = await asyncio.to_thread(semantic_lookup, user_query)
+    if cached_extraction is not None:
+        set_root_attributes(path="semantic_cache")
+        return await _extraction_flow(user_query, df1, cached_extraction, timings)
+    return None
+
+
+async def _combined_flow(
+    user_query: str,
+    df1: pd.DataFrame,
+    timings: Dict[str, float],
+    combined_extractor: Optional[Callable[[str], Awaitable[CombinedExtraction]]] = None,
+) -> Dict[str, Any]:
+    with span("combined_extraction", timings):
+        extraction = await (combined_extractor or aextract_all)(user_query)
+    print("[INFO] Combined extraction computed.")
+
+    await asyncio.to_thread(semantic_store, user_query, extraction)
+    return await _extraction_flow(user_query, df1, extraction, timings)
+
+
+# ------------------------------------------------------
+# Streaming / incremental workflow
+# ------------------------------------------------------
+async def async_workflow_stream(
+    user_query: str,
+    df1: pd.DataFrame,
+    extraction_mode: Optional[str] = None,
+    combined_extractor: Optional[Callable[[str], Awaitable[CombinedExtraction]]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Incremental variant of `async_workflow`. All five extractions start at
+    once (search data and comparators speculatively, before intent is known)
+    and the candidate DataFrame is narrowed as each one lands:
+      fields + search_data -> top-floor / enum / text filters
+      + comparators        -> full deterministic filter
+      hybrid ids           -> strict intersection
+    Yields `{"partial": True, "stage": ..., "final_df": ...}` snapshots once
+    the query is known to be property-related, then one final result shaped
+    like `async_workflow`'s with `"partial": False`.
+    """
+    mode = (extraction_mode or EXTRACTION_MODE).strip().lower()
+    result: Dict[str, Any] = {}
+    updates = _workflow_stream(user_query, df1, mode, combined_extractor)
+    try:
+        with span("workflow", extraction_mode=mode, streamed=True, query_chars=len(user_query or "")) as root:
+            async for update in updates:
+                result = update
+                yield update
+            root.set(result_type=result.get("result_type"))
+        record_workflow(result, root.attributes.get("path", mode), root.seconds)
+    finally:
+        # A consumer that stops early must still cancel the in-flight extractions
+        await updates.aclose()
+
+
+async def _workflow_stream(
+    user_query: str,
+    df1: pd.DataFrame,
+    mode: str,
+    combined_extractor: Optional[Callable[[str], Awaitable[CombinedExtraction]]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    timings: Dict[str, float] = {}
+    stage_timings.set(timings)
+    workflow_start = time.time()
+
+    local_intent = _local_intent(user_query, timings)
+    if is_chitchat(local_intent):
+        yield {**_templated_chat(user_query, local_intent.label, timings), "partial": False}
+        return
+
+    result = await _fast_paths(user_query, df1, timings)
+    if result is None and mode == "combined":
+        # A single extraction call has nothing to stream
+        result = await _combined_flow(user_query, df1, timings, combined_extractor)
+    if result is not None:
+        yield {**result, "partial": False}
+        return
+
+    tasks = {asyncio.create_task(afind_intent(user_query)): "intent"}
+
+    def start_extractions() -> None:
+        tasks.update({
+            asyncio.create_task(afield_to_set_agent(user_query)): "fields",
+            asyncio.create_task(aquery_maker_hybrid(user_query)): "hybrid_query",
+            asyncio.create_task(aget_search_data(user_query)): "search_data",
+            asyncio.create_task(aget_filter_for_columns(user_query)): "filter_on_columns",
+        })
+
+    # Speculative extraction only when the message is likely property related;
+    # otherwise it starts once the intent call says so
+    extracting = is_property_likely(local_intent)
+    if extracting:
+        start_extractions()
+    known: Dict[str, Any] = {}
+    candidates = df1
+    narrowed = set()
+    csv_result = None
+    hybrid_result = None
+
+    try:
+        while tasks:
+            done, _ = await asyncio.wait(tasks.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                stage = tasks.pop(task)
+                known[stage] = task.result()
+                timings[stage] = time.time() - workflow_start
+                if (
+                    stage == "intent" and not extracting
+                    and bool(getattr(known[stage], "Property_Related", False))
+                ):
+                    extracting = True
+                    start_extractions()
+
+                if (
+                    stage == "hybrid_query" and not HYBRID_PREFILTER
+                    and _hybrid_possible() and not _no_hybrid(known[stage])
+                ):
+                    print("[INFO] Hybrid Working...")
+                    hybrid_task = asyncio.create_task(asyncio.to_thread(_hybrid_search, known[stage]))
+                    tasks[hybrid_task] = "hybrid_result"
+
+            intent = known.get("intent")
+            if intent is not None and not bool(getattr(intent, "Property_Related", False)):
+                # Not a property query: drop the speculative work
+                for task in tasks:
+                    task.cancel()
+                tasks = {}
+                result = await _chat_flow(user_query, timings, intent)
+                yield {**result, "partial": False}
+                return
+
+            # Narrow the candidates with whatever is known so far. CSV filters
+            # always run on the full frame (its column index is cached) and
+            # are then re-intersected with any hybrid ids already known.
+            start = time.time()
+            fields = known.get("fields")
+            if fields is not None and "search_data" in known:
+                if "filter_on_columns" in known and csv_result is None:
+                    csv_result = await _csv_filter(fields, df1, known["search_data"], known["filter_on_columns"])
+                    candidates = csv_result
+                    narrowed.discard("hybrid")
+                elif "categorical" not in narrowed and csv_result is None:
+                    with span("categorical_filter"):
+                        candidates = await asyncio.to_thread(
+                            run_csv_agent_partial, fields.model_dump(), df1, known["search_data"]
+                        )
+                        record_rows("categorical_filter", len(df1), len(candidates))
+                    narrowed.add("categorical")
+                    narrowed.discard("hybrid")
+            if (
+                HYBRID_PREFILTER and csv_result is not None and len(csv_result) > 0
+                and _hybrid_possible() and not _no_hybrid(known.get("hybrid_query"))
+                and "hybrid_result" not in known and "hybrid_result" not in tasks.values()
+            ):
+                print("[INFO] Hybrid Working...")
+                hybrid_task = asyncio.create_task(asyncio.to_thread(
+                    _prefiltered_hybrid_search, known["hybrid_query"], fields,
+                    relax_search_data(fields.model_dump(), known["search_data"], known["filter_on_columns"]),
+                    known["filter_on_columns"], len(csv_result), len(df1),
+                ))
+                tasks[hybrid_task] = "hybrid_result"
+            if known.get("hybrid_result") is not None and "hybrid" not in narrowed:
+                # (None: the retriever turned out to be unavailable -> CSV only)
+                hybrid_result = known["hybrid_result"]
+                candidates = _intersect_hybrid(df1, candidates, hybrid_result)
+                narrowed.add("hybrid")
+            timings["incremental_filter"] = timings.get("incremental_filter", 0.0) + (time.time() - start)
+
+            if intent is not None and tasks:
+                yield {
+                    "result_type": "property",
+                    "partial": True,
+                    "stage": ", ".join(sorted(known)),
+                    "final_df": candidates,
+                    "total_matches": len(candidates),
+                    "timings": dict(timings),
+                }
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    hybrid_query = known.get("hybrid_query")
+    used_hybrid = _hybrid_possible() and not _no_hybrid(hybrid_query)
+    if csv_result is None:
+        csv_result = candidates
+    if not used_hybrid or hybrid_result is None:
+        hybrid_result = None
+    fields = known.get("fields")
+    if fields is not None:
+        final_df, total_matches = _rank(
+            df1, candidates, fields, known.get("search_data"), known.get("filter_on_columns"), hybrid_result
+        )
+    else:
+        final_df, total_matches = candidates, len(candidates)
+
+    result = {
+        "result_type": "property",
+        "partial": False,
+        "final_df": final_df,
+        "total_matches": total_matches,
+        "csv_result": csv_result,
+        "hybrid_result": list(hybrid_result or []),
+        "hybrid_scores": hybrid_result or {},
+        "search_data": known.get("search_data"),
+        "filter_on_columns": known.get("filter_on_columns"),
+        "timings": timings,
+    }
+    await asyncio.to_thread(
+        semantic_store, user_query,
+        _to_extraction(known.get("intent"), known.get("fields"), hybrid_query, result),
+    )
+    yield result